@@ -0,0 +1,134 @@
+import argparse
+import json
+import multiprocessing
+import time
+
+import constants as const
+import headless as headless
+import seeding as seeding
+
+
+def run_world(task):
+    """
+    Running one headless world in a worker process
+    :param task: dict - seed, ticks, width, height and overrides of constants for this world
+    :return: dict - statistics of the world
+    """
+    for name, value in task["overrides"].items():
+        setattr(const, name, value)
+
+    return headless.run(task["ticks"], task["width"], task["height"], task["seed"])
+
+
+def mean(values):
+    """
+    :param values: list[float or None,...] - values of every world, None where a world has no value, e.g. no ticks
+    :return: float or None - mean of the known values, None if there are none
+    """
+    known = [value for value in values if value is not None]
+    return sum(known) / len(known) if known else None
+
+
+def positive_int(text):
+    """
+    Type of the command line arguments that count something that must happen at least once
+    :param text: string - value given in command line
+    :return: int - positive number
+    """
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return value
+
+
+def summarize(worlds):
+    """
+    Aggregating statistics of several worlds
+    :param worlds: list[dict,...] - statistics of every world
+    :return: dict - mean and extreme values over worlds
+    """
+    population = {}
+    for world in worlds:
+        for object_type, number in world["population"].items():
+            population[object_type] = population.get(object_type, 0) + number / len(worlds)
+
+    return {
+        "worlds": len(worlds),
+        "mean_ticks_per_second": mean([world["ticks_per_second"] for world in worlds]),
+        "mean_tick_time": mean([world["tick_time"]["mean"] for world in worlds]),
+        "max_tick_time": max((world["tick_time"]["max"] for world in worlds if world["tick_time"]["max"] is not None),
+                             default=None),
+        "mean_path_requests": sum(world["path_requests"] for world in worlds) / len(worlds),
+        "mean_animals": sum(world["animals"] for world in worlds) / len(worlds),
+        "mean_population": population
+    }
+
+
+def run_batch(seeds, ticks, width=80, height=42, processes=None, overrides=None):
+    """
+    Running independent seeded worlds in a pool of processes
+    :param seeds: list[int,...] - seed of every world
+    :param ticks: int - number of simulation ticks in every world
+    :param width: int - width of the map in tiles
+    :param height: int - height of the map in tiles
+    :param processes: int - number of worker processes, by default the number of cores
+    :param overrides: dict{string: object} - constants changed in every world, e.g. ANIMALS_LIMIT
+    :return: dict - report with statistics of every world and their summary
+    """
+    tasks = [{
+        "seed": seed,
+        "ticks": ticks,
+        "width": width,
+        "height": height,
+        "overrides": overrides or {}
+    } for seed in seeds]
+
+    start_time = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        worlds = pool.map(run_world, tasks, chunksize=1)
+    wall_time = time.perf_counter() - start_time
+
+    summary = summarize(worlds)
+    summary["wall_time"] = wall_time
+    summary["total_ticks_per_second"] = len(worlds) * ticks / wall_time
+
+    return {
+        "overrides": overrides or {},
+        "summary": summary,
+        "worlds": worlds
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Running many FrontierWorld simulations in parallel")
+    parser.add_argument("--worlds", type=positive_int, default=multiprocessing.cpu_count(), help="number of worlds")
+    parser.add_argument("--first-seed", type=seeding.parse_seed, default=0,
+                        help="seed of the first world, the next ones follow it")
+    parser.add_argument("--ticks", type=positive_int, default=60 * const.TICK_RATE,
+                        help="number of ticks in every world")
+    parser.add_argument("--width", type=int, default=80, help="width of the map in tiles")
+    parser.add_argument("--height", type=int, default=42, help="height of the map in tiles")
+    parser.add_argument("--processes", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--animals-limit", type=int, default=None, help="override of ANIMALS_LIMIT")
+    parser.add_argument("--spawn-probabilities", type=json.loads, default=None,
+                        help='override of SPAWN_PROBABILITIES, e.g. \'{"deer": 0.2, "wolf": 0.05, "turtle": 0.1}\'')
+    parser.add_argument("--output", default=None, help="file for the JSON report, by default it is printed")
+    args = parser.parse_args()
+    if args.first_seed + args.worlds - 1 > seeding.MAX_SEED:
+        parser.error("seed of the last world must be at most {}, start from a smaller --first-seed".format(
+            seeding.MAX_SEED))
+
+    constant_overrides = {}
+    if args.animals_limit is not None:
+        constant_overrides["ANIMALS_LIMIT"] = args.animals_limit
+    if args.spawn_probabilities is not None:
+        constant_overrides["SPAWN_PROBABILITIES"] = args.spawn_probabilities
+
+    report = run_batch(range(args.first_seed, args.first_seed + args.worlds), args.ticks, args.width, args.height,
+                       args.processes, constant_overrides)
+
+    if args.output is None:
+        print(json.dumps(report, indent=4))
+    else:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=4)
@@ -0,0 +1,100 @@
+import json
+import statistics
+import time
+
+
+def percentiles(times):
+    """
+    Describing the distribution of times
+    :param times: list[float,...] - measured times in seconds
+    :return: dict - median, 95th and 99th percentiles, mean and max
+    """
+    ordered = sorted(times)
+
+    def percentile(fraction):
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    return {
+        "median": percentile(0.5),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "mean": statistics.mean(ordered),
+        "max": ordered[-1]
+    }
+
+
+def measure(function, repeats=5, number=1):
+    """
+    Timing a function several times
+    :param function: callable - measured code without arguments
+    :param repeats: int - number of measurements
+    :param number: int - number of calls in every measurement
+    :return: dict - time of one call in seconds: median, mean, min and max over measurements
+    """
+    times = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        for _ in range(number):
+            function()
+        times.append((time.perf_counter() - start_time) / number)
+
+    return {
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "min": min(times),
+        "max": max(times),
+        "repeats": repeats,
+        "number": number
+    }
+
+
+def compare(results, baseline, threshold=0.1, key="median"):
+    """
+    Comparing results with a baseline
+    :param results: dict{string: dict} - current results of benchmarks
+    :param baseline: dict{string: dict} - results of the same benchmarks before the change
+    :param threshold: float - relative change that is considered significant
+    :param key: string - compared statistic
+    :return: dict{string: dict} - ratio of current time to baseline and verdict for every common benchmark
+    """
+    comparison = {}
+    for name, result in results.items():
+        if name not in baseline or not baseline[name][key]:
+            continue
+        ratio = result[key] / baseline[name][key]
+        if ratio > 1 + threshold:
+            verdict = "slower"
+        elif ratio < 1 - threshold:
+            verdict = "faster"
+        else:
+            verdict = "same"
+        comparison[name] = {"ratio": ratio, "verdict": verdict}
+    return comparison
+
+
+def report(results, output=None, baseline_path=None, threshold=0.1, key="median"):
+    """
+    Writing results to JSON and printing their comparison with a baseline
+    :param results: dict{string: dict} - results of benchmarks
+    :param output: string - path to the JSON file, None to print results
+    :param baseline_path: string - path to the JSON file with baseline results
+    :param threshold: float - relative change that is considered significant
+    :param key: string - compared statistic
+    :return: int - number of benchmarks that became slower
+    """
+    if output is None:
+        print(json.dumps(results, indent=4))
+    else:
+        with open(output, "w") as file:
+            json.dump(results, file, indent=4)
+
+    if baseline_path is None:
+        return 0
+
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+
+    comparison = compare(results, baseline, threshold, key)
+    for name, verdict in comparison.items():
+        print("{:<40} {:>7.3f}x  {}".format(name, verdict["ratio"], verdict["verdict"]))
+    return sum(verdict["verdict"] == "slower" for verdict in comparison.values())
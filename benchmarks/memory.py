@@ -0,0 +1,107 @@
+"""
+Memory benchmark of map objects: bytes taken by every object of a dense seeded map
+Started from the root of the repository: python -m benchmarks.memory [--output FILE] [--compare BASELINE]
+"""
+import argparse
+import random
+import tracemalloc
+
+import constants as const
+import creature as creature
+import game_map as game_map
+import map_objects as objects
+import seeding as seeding
+from benchmarks.common import report
+
+SEED = 2023
+MAP_SIZE = (80, 42)
+FOREST_DENSITY = 0.6  # part of free soil tiles that are planted with trees, as in the dense forest scenario
+OBJECTS_PER_CLASS = 1000
+FACTORIES = {
+    "tree": lambda coord: objects.Tree(None, coord),
+    "bush": lambda coord: objects.Bush(None, coord, time_from_harvest=0),
+    "cliff": lambda coord: objects.Cliff(None, coord),
+    "wall": lambda coord: objects.Wall(None, coord, 10.0, "wood"),
+    "door": lambda coord: objects.Door(None, coord, 10.0, "wood", []),
+    "resources": lambda coord: objects.Resources(None, coord, "wood", 10),
+    "corpse": lambda coord: objects.Corpse(None, coord, "deer"),
+    "settler": lambda coord: creature.Settler(None, coord),
+    "deer": lambda coord: creature.Deer(None, coord),
+    "wolf": lambda coord: creature.Wolf(None, coord),
+    "turtle": lambda coord: creature.Turtle(None, coord)
+}
+
+
+def dense_map_tiles(region_map, rng):
+    """
+    Placing objects as the world generator does and planting trees on most of the remaining soil
+    :param region_map: GameMap object - map of the game region
+    :param rng: Random object - source of planted trees
+    :return: list[tuple(string, list[int, int]),...] - type and coordinates of every object
+    """
+    tiles = []
+    pre_objects = region_map.store.read("object")
+    terrain = region_map.store.read("terrain")
+    for i in range(region_map.height):
+        for j in range(region_map.width):
+            pre_object = game_map.PRE_OBJECTS[pre_objects[i, j]]
+            if pre_object in FACTORIES:
+                tiles.append((pre_object, [j, i]))
+            elif terrain[i, j] == game_map.SOIL and rng.random() < FOREST_DENSITY:
+                tiles.append(("tree", [j, i]))
+    return tiles
+
+
+def measure_objects(tiles):
+    """
+    Creating objects while memory allocations are traced
+    :param tiles: list[tuple(string, list[int, int]),...] - type and coordinates of every object
+    :return: dict - number of objects, allocated bytes and bytes per object
+    """
+    created = [None] * len(tiles)  # the list itself is allocated before tracing
+    coords = [list(coord) for _, coord in tiles]
+    tracemalloc.start()
+    for index, (object_type, _) in enumerate(tiles):
+        created[index] = FACTORIES[object_type](coords[index])
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {
+        "objects": len(tiles),
+        "bytes": allocated,
+        "bytes_per_object": allocated / len(tiles)
+    }
+
+
+def run_benchmarks():
+    """
+    Measuring the memory of the objects of a dense map and of every class of map objects
+    Objects are created in headless mode, textures are shared by the whole class and are not measured
+    :return: dict{string: dict} - memory taken by the objects of the dense map and by objects of every class
+    """
+    with objects.headless_mode():
+        map_cache_directory = const.MAP_CACHE_DIRECTORY
+        const.MAP_CACHE_DIRECTORY = None
+        try:
+            region_map = game_map.GameMap(None, (MAP_SIZE[0] * const.TILE_SIZE,
+                                                 (MAP_SIZE[1] + const.INTERFACE_AMENDMENT) * const.TILE_SIZE),
+                                          seeding.WorldSeed(SEED))
+        finally:
+            const.MAP_CACHE_DIRECTORY = map_cache_directory
+        tiles = dense_map_tiles(region_map, random.Random(SEED))
+
+        results = {"dense_map": measure_objects(tiles)}
+        for object_type in FACTORIES:
+            results["class/{}".format(object_type)] = measure_objects([(object_type, coord)
+                                                                       for _, coord in tiles[:OBJECTS_PER_CLASS]])
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory benchmark of map objects of FrontierWorld")
+    parser.add_argument("--output", default=None, help="JSON file for results, by default they are printed")
+    parser.add_argument("--compare", default=None, help="JSON file with baseline results")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change that counts as significant")
+    args = parser.parse_args()
+
+    larger = report(run_benchmarks(), args.output, args.compare, args.threshold, key="bytes_per_object")
+    raise SystemExit(1 if larger else 0)
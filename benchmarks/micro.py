@@ -0,0 +1,122 @@
+"""
+Micro-benchmarks of map generation, pathfinding and rendering primitives
+Started from the root of the repository: python -m benchmarks.micro [--output FILE] [--compare BASELINE]
+"""
+import argparse
+import random
+import tempfile
+
+import numpy as np
+import pygame as pg
+
+import constants as const
+import dijkstra as dijkstra
+import game_map as game_map
+import map_objects as objects
+import perlin as perlin
+import seeding as seeding
+from benchmarks.common import measure, report
+
+SEED = 2023
+MAP_SIZES = {
+    "small": (40, 27),
+    "large": (80, 42)
+}
+ROUTE_LENGTHS = {
+    "short": (3, 8),
+    "medium": (15, 30),
+    "long": (45, 90)
+}
+MAX_ROUTE_ATTEMPTS = 100000  # pairs of free tiles tried before the route length is considered unreachable
+
+
+def map_size_in_pixels(size):
+    """
+    :param size: tuple(int, int) - width and height of the map in tiles
+    :return: tuple(int, int) - size of the game region in pixels
+    """
+    return size[0] * const.TILE_SIZE, (size[1] + const.INTERFACE_AMENDMENT) * const.TILE_SIZE
+
+
+def find_route(costs, length_range, rng):
+    """
+    Choosing start and goal among free tiles at a given distance
+    :param costs: numpy.ndarray - velocity multiplier matrix, shape (height, width)
+    :param length_range: tuple(int, int) - allowed Chebyshev distance between start and goal
+    :param rng: Random object - source of random tiles
+    :return: tuple(list[int, int], list[int, int]) - start and goal tiles [x, y]
+    """
+    free_tiles = [[int(x), int(y)] for y, x in np.argwhere(costs < 10000)]
+    for _ in range(MAX_ROUTE_ATTEMPTS if free_tiles else 0):
+        start, goal = rng.choice(free_tiles), rng.choice(free_tiles)
+        if length_range[0] <= max(abs(start[0] - goal[0]), abs(start[1] - goal[1])) <= length_range[1]:
+            return start, goal
+    raise ValueError("no free tiles at distance {} - {}".format(*length_range))
+
+
+def run_benchmarks(repeats):
+    """
+    Running every micro-benchmark on fixed seeds and map sizes
+    :param repeats: int - number of measurements of every benchmark
+    :return: dict{string: dict} - timing of every benchmark
+    """
+    results = {}
+
+    pnf = perlin.PerlinNoiseFactory(3, octaves=4, tile=(2, 2, 4), rng=random.Random(SEED))
+    results["perlin_1000_samples"] = measure(
+        lambda: [pnf(i / 40, i / 17, 0.95) for i in range(1000)], repeats)
+
+    map_cache_directory = const.MAP_CACHE_DIRECTORY
+    const.MAP_CACHE_DIRECTORY = None
+    try:
+        for size_name, size in MAP_SIZES.items():
+            pixels = map_size_in_pixels(size)
+            results["game_map_{}".format(size_name)] = measure(
+                lambda: game_map.GameMap(None, pixels, seeding.WorldSeed(SEED)), repeats)
+
+        with tempfile.TemporaryDirectory() as directory:
+            const.MAP_CACHE_DIRECTORY = directory
+            pixels = map_size_in_pixels(MAP_SIZES["large"])
+            game_map.GameMap(None, pixels, seeding.WorldSeed(SEED))
+            results["game_map_large_cached"] = measure(
+                lambda: game_map.GameMap(None, pixels, seeding.WorldSeed(SEED)), repeats)
+
+        const.MAP_CACHE_DIRECTORY = None  # make_grid writes to the map, the cache of the game is not touched
+        region_map = game_map.GameMap(None, map_size_in_pixels(MAP_SIZES["large"]), seeding.WorldSeed(SEED))
+    finally:
+        const.MAP_CACHE_DIRECTORY = map_cache_directory
+
+    cliff_tiles = np.argwhere(region_map.store.read("object") == game_map.PRE_OBJECTS.index("cliff"))
+    with objects.headless_mode():
+        list_solid_object = [objects.Cliff(None, [int(j), int(i)]) for i, j in cliff_tiles]
+
+    results["make_grid"] = measure(lambda: dijkstra.make_grid(region_map, list_solid_object), repeats)
+    grid = dijkstra.make_grid(region_map, list_solid_object)
+
+    rng = random.Random(SEED)
+    for route_name, length_range in ROUTE_LENGTHS.items():
+        start, goal = find_route(grid.read("cost"), length_range, rng)
+        results["dijkstra_{}".format(route_name)] = measure(
+            lambda: dijkstra.dijkstra_logic(start, goal, region_map, list_solid_object, grid), repeats)
+
+    results["create_texture"] = measure(
+        lambda: objects.create_texture({"default": [0.75, 1.5, "tree.png"]}, "default"), repeats, number=20)
+
+    surface = pg.Surface(map_size_in_pixels(MAP_SIZES["large"]))
+    region_map.surface = surface
+    region_map.draw()  # loading of landscape textures is not measured
+    results["game_map_draw"] = measure(region_map.draw, repeats)
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of FrontierWorld")
+    parser.add_argument("--repeats", type=int, default=5, help="number of measurements of every benchmark")
+    parser.add_argument("--output", default=None, help="JSON file for results, by default they are printed")
+    parser.add_argument("--compare", default=None, help="JSON file with baseline results")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change that counts as significant")
+    args = parser.parse_args()
+
+    slower = report(run_benchmarks(args.repeats), args.output, args.compare, args.threshold)
+    raise SystemExit(1 if slower else 0)
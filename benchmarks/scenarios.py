@@ -0,0 +1,168 @@
+"""
+End-to-end scenario benchmarks: seeded worlds with scripted orders run through the whole frame of main.py
+Started from the root of the repository: python -m benchmarks.scenarios [--output FILE] [--compare BASELINE]
+"""
+import argparse
+import tempfile
+import time
+
+import pygame as pg
+
+import constants as const
+import creature as creature
+import dijkstra as dijkstra
+import game_map as game_map
+import gameplay as gameplay
+import map_objects as objects
+from benchmarks.common import percentiles, report
+
+SEED = 2023
+MAP_SIZE = (80, 42)
+PHASES = ("draw_map", "draw_objects", "draw_interface",
+          "create_new_animal", "ai_acts", "update_timers", "do_tasks", "move_creatures")
+
+
+def create_game():
+    """
+    Building a seeded world that draws to an off-screen surface
+    :return: Gameplay object - new game
+    """
+    surface = pg.Surface((MAP_SIZE[0] * const.TILE_SIZE, (MAP_SIZE[1] + const.INTERFACE_AMENDMENT) * const.TILE_SIZE))
+    game = gameplay.Gameplay(surface, None, seed=SEED)
+    game.settler.is_chosen = True  # the path of the settler is drawn as in the real game
+    game.chosen_map_object = game.settler
+    return game
+
+
+def free_tile(game, rng):
+    """
+    :param game: Gameplay object - running game
+    :param rng: Random object - source of random tiles
+    :return: list[int, int] - random tile without solid objects
+    """
+    return gameplay.find_safe_tile(game.list_solid_object, [game.game_map.width - 1, game.game_map.height - 1],
+                                   rng=rng)
+
+
+def dense_forest(game, rng):
+    """
+    Planting trees on most of the soil and sending the settler through the forest
+    :param game: Gameplay object - new game
+    :param rng: Random object - random stream of the scenario
+    :return: callable - script called before every frame with its number
+    """
+    occupied = {(int(solid_object.coord[0]), int(solid_object.coord[1])) for solid_object in game.list_solid_object}
+    occupied.add(tuple(game.settler.coord))
+    terrain = game.game_map.store.read("terrain")
+    for i in range(game.game_map.height):
+        for j in range(game.game_map.width):
+            if terrain[i, j] == game_map.SOIL and (j, i) not in occupied and rng.random() < 0.6:
+                game.list_solid_object.append(objects.Tree(game.surface, [j, i]))
+    game.grid = dijkstra.make_grid(game.game_map, game.list_solid_object)
+
+    def script(frame):
+        if frame % 120 == 0:
+            game.settler.task = creature.TileTask("go_to", free_tile(game, rng))
+
+    return script
+
+
+def large_animal_population(game, rng):
+    """
+    Filling the map with wandering animals
+    :param game: Gameplay object - new game
+    :param rng: Random object - random stream of the scenario
+    :return: callable - script called before every frame with its number
+    """
+    const.ANIMALS_LIMIT = 60
+
+    def script(frame):
+        if frame % 5 == 0 and game.number_of_animals < const.ANIMALS_LIMIT:
+            animal_type = rng.choice(list(gameplay.ANIMALS))
+            new_animal = gameplay.ANIMALS[animal_type](game.surface, free_tile(game, rng))
+            game.add_animal(new_animal)
+            new_animal.task = creature.TileTask("go_to", free_tile(game, rng))
+            game.number_of_animals += 1
+
+    return script
+
+
+def long_distance_orders(game, rng):
+    """
+    Sending the settler between opposite corners of the map
+    :param game: Gameplay object - new game
+    :param rng: Random object - random stream of the scenario
+    :return: callable - script called before every frame with its number
+    """
+    corners = [[0, 0], [game.game_map.width - 1, game.game_map.height - 1],
+               [game.game_map.width - 1, 0], [0, game.game_map.height - 1]]
+
+    def script(frame):
+        if frame % 90 == 0:
+            corner = corners[frame // 90 % len(corners)]
+            goal = min((tile for tile in [free_tile(game, rng) for _ in range(20)]),
+                       key=lambda tile: abs(tile[0] - corner[0]) + abs(tile[1] - corner[1]))
+            game.settler.task = creature.TileTask("go_to", goal)
+
+    return script
+
+
+SCENARIOS = {
+    "dense_forest": dense_forest,
+    "large_animal_population": large_animal_population,
+    "long_distance_orders": long_distance_orders
+}
+
+
+def run_scenario(name, frames):
+    """
+    Running one scenario through the full frame sequence of main.py
+    :param name: string - name of scenario, key of SCENARIOS
+    :param frames: int - number of frames
+    :return: dict{string: dict} - distribution of frame time and of time of every phase
+    """
+    animals_limit = const.ANIMALS_LIMIT
+    try:
+        game = create_game()
+        script = SCENARIOS[name](game, game.world_seed["spawn"])
+
+        frame_times = []
+        phase_times = {phase: [] for phase in PHASES}
+        for frame in range(frames):
+            script(frame)
+            frame_start_time = time.perf_counter()
+            game.tick += 1
+
+            for phase in PHASES:
+                phase_start_time = time.perf_counter()
+                getattr(game, phase)()
+                phase_times[phase].append(time.perf_counter() - phase_start_time)
+
+            frame_times.append(time.perf_counter() - frame_start_time)
+    finally:
+        const.ANIMALS_LIMIT = animals_limit
+
+    results = {"{}/frame".format(name): percentiles(frame_times)}
+    for phase, times in phase_times.items():
+        results["{}/{}".format(name, phase)] = percentiles(times)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scenario benchmarks of FrontierWorld")
+    parser.add_argument("--frames", type=int, default=300, help="number of frames in every scenario")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="scenario to run, all by default")
+    parser.add_argument("--output", default=None, help="JSON file for results, by default they are printed")
+    parser.add_argument("--compare", default=None, help="JSON file with baseline results")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change that counts as significant")
+    args = parser.parse_args()
+
+    pg.font.init()
+    scenario_results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        const.MAP_CACHE_DIRECTORY = directory  # scenarios change the map, the cache of the game is not touched
+        for scenario_name in args.scenario or SCENARIOS:
+            scenario_results.update(run_scenario(scenario_name, args.frames))
+
+    slower = report(scenario_results, args.output, args.compare, args.threshold, key="p95")
+    raise SystemExit(1 if slower else 0)
@@ -1,10 +1,24 @@
 import pygame as pg
 
 FPS = 60
+FULL_UPDATE_AREA = 0.3  # part of the screen, if dirty regions cover more the whole display is updated
+TICK_RATE = 60  # simulation ticks per second at normal game speed
+METRICS_INTERVAL = 10 * TICK_RATE  # ticks between snapshots of metrics
+SAVE_PATH = "saves/quicksave.sav"
+AUTOSAVE_INTERVAL = 5 * 60 * TICK_RATE  # ticks between autosaves, 0 turns autosave off
+AUTOSAVE_SLOTS = 3  # number of rotating autosave files
+MAP_CACHE_DIRECTORY = "cache/maps"  # generated maps are kept here, None turns the cache off
+MAP_CACHE_LIMIT = 16  # number of cached maps, the least recently used ones are removed
 TILE_SIZE = 24
 FONT = "fonts/Montserrat-Medium.ttf"
 INTERFACE_AMENDMENT = 3
 ANIMALS_LIMIT = 5
+SPAWN_PROBABILITIES = {  # chance to spawn an animal of this type at every spawn attempt
+    "deer": 0.1,
+    "wolf": 0.1,
+    "turtle": 0.1
+}
+PATH_SMOOTHING = True
 
 COLORS = {
     "white": (255, 255, 255),
@@ -15,9 +29,16 @@ COLORS = {
 }
 
 LANDSCAPE = {
-    "soil": [0.9, pg.transform.scale(pg.image.load("assets/textures/soil.png"), (TILE_SIZE, TILE_SIZE))],
-    "sand": [0.5, pg.transform.scale(pg.image.load("assets/textures/sand.png"), (TILE_SIZE, TILE_SIZE))],
-    "rock": [0.7, pg.transform.scale(pg.image.load("assets/textures/rock.png"), (TILE_SIZE, TILE_SIZE))],
+    "soil": [0.9, "soil.png"],
+    "sand": [0.5, "sand.png"],
+    "rock": [0.7, "rock.png"],
+}
+
+GAME_SPEEDS = {
+    pg.K_1: 1,
+    pg.K_2: 2,
+    pg.K_3: 4,
+    pg.K_4: None  # maximum speed, rendering is skipped while the simulation is behind
 }
 
 TASKS = {
@@ -1,10 +1,32 @@
+import math
+
 import pygame as pg
-import numpy as np
 import random as rnd
 
 import constants as const
 import map_objects as objects
 import dijkstra as dijkstra
+import metrics as metrics
+
+WAYPOINTS_REACHED = metrics.registry.counter("creature.waypoints_reached")
+SPRITE_SWITCHES = metrics.registry.counter("creature.sprite_switches")
+sprite_sets = {}  # sprites of every orientation by class of creature and headless mode, shared by every instance
+
+
+def orientation(direction):
+    """
+    :param direction: list[float, float] - direction of movement, [0, 0] for a standing creature
+    :return: string - orientation of creature, horizontal movement takes precedence over vertical one
+    """
+    if direction[0] < 0:
+        return "west"
+    if direction[0] > 0:
+        return "east"
+    if direction[1] < 0:
+        return "north"
+    if direction[1] > 0:
+        return "south"
+    return "default"
 
 
 class Task:
@@ -12,6 +34,8 @@ class Task:
     Task for the colonist
     """
 
+    __slots__ = ("task_type", "is_started", "is_finished")
+
     def __init__(self, task_type):
         self.task_type = task_type
         self.is_started = False
@@ -23,6 +47,8 @@ class ObjectTask(Task):
     Task whose purpose is to interact with an object
     """
 
+    __slots__ = ("target_object",)
+
     def __init__(self, task_type, target_object):
         super().__init__(task_type)
         self.target_object = target_object
@@ -33,6 +59,8 @@ class TileTask(Task):
     Task whose goal is a tile
     """
 
+    __slots__ = ("target_tile",)
+
     def __init__(self, task_type, target_tile):
         super().__init__(task_type)
         self.target_tile = target_tile
@@ -43,6 +71,18 @@ class Creature(objects.SolidObject):
     Creature that can move and proceed more complex tasks
     """
 
+    __slots__ = ("speed", "damage", "melee_cooldown", "previous_coord", "path", "direction", "task",
+                 "orientation", "draw_offset", "draw_size")
+
+    draw_features = {
+        "default": [0.0, 0.0, "def_creature_west.png"],
+        "north": [0.0, 0.0, "def_creature_north.png"],
+        "south": [0.0, 0.0, "def_creature_south.png"],
+        "west": [0.0, 0.0, "def_creature_west.png"],
+        "east": [0.0, 0.0, "def_creature_east.png"]
+    }
+    type = "def_creature"
+
     def __init__(self, surface, coord, hit_points=10.0):
         """
         Universal constructor of creature
@@ -51,49 +91,62 @@ class Creature(objects.SolidObject):
         :param hit_points: int - current object hit points
         """
         super().__init__(surface, coord, hit_points)
-        self.draw_features = {
-            "default": [0.0, 0.0, "def_creature_west.png"],
-            "north": [0.0, 0.0, "def_creature_north.png"],
-            "south": [0.0, 0.0, "def_creature_south.png"],
-            "west": [0.0, 0.0, "def_creature_west.png"],
-            "east": [0.0, 0.0, "def_creature_east.png"]
-        }
-        self.draw_box = objects.create_draw_box(self.coord, self.draw_features, "default")
-        self.texture = objects.create_texture(self.draw_features, "default")
+        self.orientation = "default"
+        self.texture, self.draw_offset, self.draw_size = self.sprite_set()["default"]
         self.speed = 0.1  # Base value [tile/tick]
         self.damage = 1.0  # Base value [hit point]
         self.melee_cooldown = 60.0  # Base value [tick]
-        self.path = []
+        self.previous_coord = list(self.coord)  # coordinates at the previous tick, used for interpolation
+        self.path = dijkstra.Path()
         self.direction = [0, 0]
         self.task = None
-        self.type = "def_creature"
+
+    @classmethod
+    def sprite_set(cls):
+        """
+        Getting the sprites of every orientation of the class, they are made once and shared by every instance
+        :return: dict{string: tuple(Pygame Surface object, tuple(float, float), tuple(float, float))} - texture,
+                 offset of the draw box from the coordinates and size of the draw box in pixels by orientation
+        """
+        key = (cls, objects.is_headless)
+        if key not in sprite_sets:
+            sprite_sets[key] = {}
+            for name in cls.draw_features:
+                draw_box = objects.create_draw_box([0.0, 0.0], cls.draw_features, name)
+                sprite_sets[key][name] = (objects.create_texture(cls.draw_features, name), (-draw_box[0], -draw_box[1]),
+                                          (draw_box[2], draw_box[3]))
+        return sprite_sets[key]
 
     def update_image(self):
         """
         Updating the texture and draw box of creature in case it was moving
+        The texture is switched only when the orientation changes, otherwise the draw box is just shifted
         """
-        if self.direction is None:
-            pass
-
-        elif self.direction[0] < 0:
-            self.draw_box = objects.create_draw_box(self.coord, self.draw_features, "west")
-            self.texture = objects.create_texture(self.draw_features, "west")
+        if self.direction is not None and orientation(self.direction) != self.orientation:
+            self.orientation = orientation(self.direction)
+            self.texture, self.draw_offset, self.draw_size = self.sprite_set()[self.orientation]
+            SPRITE_SWITCHES.value += 1
 
-        elif self.direction[0] > 0:
-            self.draw_box = objects.create_draw_box(self.coord, self.draw_features, "east")
-            self.texture = objects.create_texture(self.draw_features, "east")
+        self.draw_box = (self.coord[0] * const.TILE_SIZE - self.draw_offset[0],
+                         self.coord[1] * const.TILE_SIZE - self.draw_offset[1]) + self.draw_size
 
-        elif self.direction[1] < 0:
-            self.draw_box = objects.create_draw_box(self.coord, self.draw_features, "north")
-            self.texture = objects.create_texture(self.draw_features, "north")
-
-        elif self.direction[1] > 0:
-            self.draw_box = objects.create_draw_box(self.coord, self.draw_features, "south")
-            self.texture = objects.create_texture(self.draw_features, "south")
+    def screen_box(self, alpha=1.0):
+        """
+        :param alpha: float - part of the tick passed since the last simulation step
+        :return: Pygame Rect object - part of the screen covered by the creature between its previous and current
+                 coordinates
+        """
+        shift = [(self.previous_coord[0] - self.coord[0]) * (1 - alpha) * const.TILE_SIZE,
+                 (self.previous_coord[1] - self.coord[1]) * (1 - alpha) * const.TILE_SIZE]
+        return pg.Rect(self.draw_box[0] + shift[0], self.draw_box[1] + shift[1], self.draw_box[2], self.draw_box[3])
 
-        else:
-            self.draw_box = objects.create_draw_box(self.coord, self.draw_features, "default")
-            self.texture = objects.create_texture(self.draw_features, "default")
+    def sprites(self, alpha=1.0):
+        """
+        :param alpha: float - part of the tick passed since the last simulation step
+        :return: list[tuple(Pygame Surface object, Pygame Rect object)] - image of the creature between its previous
+                 and current coordinates
+        """
+        return [(self.texture, self.screen_box(alpha))]
 
     def pathfinder(self, goal_coord, region_map, list_solid_object, grid):
         """
@@ -101,7 +154,7 @@ class Creature(objects.SolidObject):
         :param goal_coord: list[int, int] - coordinates' of target cell
         :param region_map: GameMap object - map of the game region
         :param list_solid_object: list[MapObject object,...] - list of all objects that can block a path
-        :return: list[list[float, float],...] - list of tiles to go through
+        :return: Path object - compact path of tiles to go through
         """
         path = dijkstra.dijkstra_logic([int(self.coord[0]),
                                         int(self.coord[1])],
@@ -109,7 +162,25 @@ class Creature(objects.SolidObject):
                                        region_map,
                                        list_solid_object,
                                        grid)
-        return path
+        return dijkstra.Path(path, smooth=const.PATH_SMOOTHING)
+
+    def next_tile(self):
+        """
+        Finding the tile the creature is stepping onto at the moment
+        :return: list[int, int] - coordinates of the tile [x, y]
+        """
+        if self.direction is None:  # the creature stands on its target
+            return [int(self.coord[0] + 0.5), int(self.coord[1] + 0.5)]
+
+        tile = []
+        for coord, direction in zip(self.coord, self.direction):
+            if direction > 0:
+                tile.append(math.ceil(coord))
+            elif direction < 0:
+                tile.append(math.floor(coord))
+            else:
+                tile.append(int(coord + 0.5))
+        return tile
 
     def define_direction(self, next_coord):
         """
@@ -142,21 +213,27 @@ class Creature(objects.SolidObject):
         Changing coordinates of the creature due to its movement
         :param region_map: GameMap object - map of the game region
         """
+        self.previous_coord[0] = self.coord[0]
+        self.previous_coord[1] = self.coord[1]
+
         if len(self.path) > 0:
+            target = self.path.target
             if self.direction == [0, 0]:
-                self.direction = self.define_direction(self.path[0])
+                self.direction = self.define_direction(target)
 
-            max_shift = self.speed * region_map.field[int(self.coord[1] + 0.5)][int(self.coord[0] + 0.5)].speed_mod
+            max_shift = self.speed * region_map.store.get("speed_mod",
+                                                          int(self.coord[0] + 0.5), int(self.coord[1] + 0.5))
             #                        checking speed modifier of current tile
 
-            next_tile_dist = ((self.coord[0] - self.path[0][0]) ** 2 + (self.coord[1] - self.path[0][1]) ** 2) ** 0.5
+            next_tile_dist = ((self.coord[0] - target[0]) ** 2 + (self.coord[1] - target[1]) ** 2) ** 0.5
 
             if max_shift >= next_tile_dist:
-                self.coord[0] = self.path[0][0]
-                self.coord[1] = self.path[0][1]
-                self.path.pop(0)
+                self.coord[0] = target[0]
+                self.coord[1] = target[1]
+                self.path.advance()
+                WAYPOINTS_REACHED.value += 1
                 if len(self.path) > 0:
-                    self.direction = self.define_direction(self.path[0])
+                    self.direction = self.define_direction(self.path.target)
 
             else:
                 self.coord[0] += max_shift * self.direction[0]
@@ -172,13 +249,15 @@ class Creature(objects.SolidObject):
         Moving to a given tile along a suitable path
         :param region_map: GameMap object - map of the game region
         :param list_solid_object: list[MapObject object,...] - list of all objects that can block a path
-        :param grid: list[list[float]] - velocity multiplier matrix
+        :param grid: WorldStore object - store of the map, its cost layer is the velocity multiplier matrix
         """
         if not self.task.is_started:
+            path = self.pathfinder(self.task.target_tile, region_map, list_solid_object, grid)
             if len(self.path) > 0:
-                self.path = [self.path[0]] + self.pathfinder(self.task.target_tile, region_map, list_solid_object, grid)
-            else:
-                self.path = self.pathfinder(self.task.target_tile, region_map, list_solid_object, grid)
+                tile = self.next_tile()
+                if tile != path.target and tile != self.coord:  # a path starts with the tile under the creature
+                    path = path.prepend(tile)
+            self.path = path
             self.task.is_started = True
 
         if len(self.path) == 0:
@@ -190,6 +269,10 @@ class Animal(Creature):
     Animals controlled by AI
     """
 
+    __slots__ = ("activity_rate", "was_attacked")
+
+    type = "def_animal"
+
     def __init__(self, surface, coord, hit_points=10.0, was_attacked=False):
         """
         Universal constructor of animal
@@ -200,11 +283,31 @@ class Animal(Creature):
         super().__init__(surface, coord, hit_points)
         self.activity_rate = 0.1  # Base value, some relative coefficient
         self.was_attacked = was_attacked
-        self.type = "def_animal"
 
-    def decide_to_move(self, game_map):
-        if (rnd.random() < 0.01 * self.activity_rate) and (len(self.path) == 0):
-            self.task = TileTask("go_to", [rnd.randint(0, game_map.width - 1), rnd.randint(0, game_map.height - 1)])
+    def next_decision_delay(self, rng=rnd):
+        """
+        Sampling the number of ticks until the next decision of animal
+        Every tick the animal decides with probability 0.01 * activity_rate, so the delay is geometric
+        :param rng: Random object - random stream of AI
+        :return: int or None - delay in ticks, None if the animal never decides
+        """
+        probability = 0.01 * self.activity_rate
+        if probability <= 0:
+            return None
+        if probability >= 1:
+            return 1
+        return int(math.log(1.0 - rng.random()) / math.log(1.0 - probability)) + 1
+
+    def decide_to_move(self, game_map, rng=rnd):
+        """
+        Choosing a random destination if the animal stands still, called by the AI scheduler when due
+        :param game_map: GameMap object - map of the game region
+        :param rng: Random object - random stream of AI
+        :return: int or None - delay in ticks until the next decision
+        """
+        if len(self.path) == 0:
+            self.task = TileTask("go_to", [rng.randint(0, game_map.width - 1), rng.randint(0, game_map.height - 1)])
+        return self.next_decision_delay(rng)
 
 
 class Settler(Creature):
@@ -212,6 +315,18 @@ class Settler(Creature):
     Settler controlled by player
     """
 
+    __slots__ = ()
+
+    draw_features = {
+        "default": [0.0, 0.5, "settler_south.png"],
+        "north": [0.0, 0.5, "settler_north.png"],
+        "south": [0.0, 0.5, "settler_south.png"],
+        "west": [0.0, 0.5, "settler_west.png"],
+        "east": [0.0, 0.5, "settler_east.png"]
+    }
+    full_hit_points = 20.0
+    type = "settler"
+
     def __init__(self, surface, coord, hit_points=20.0):
         """
         Constructor of settler
@@ -220,45 +335,7 @@ class Settler(Creature):
         :param hit_points: int - current object hit points
         """
         super().__init__(surface, coord, hit_points)
-        self.draw_features = {
-            "default": [0.0, 0.5, "settler_south.png"],
-            "north": [0.0, 0.5, "settler_north.png"],
-            "south": [0.0, 0.5, "settler_south.png"],
-            "west": [0.0, 0.5, "settler_west.png"],
-            "east": [0.0, 0.5, "settler_east.png"]
-        }
-        self.draw_box = objects.create_draw_box(self.coord, self.draw_features, "default")
-        self.texture = objects.create_texture(self.draw_features, "default")
-        self.full_hit_points = 20.0
-        if hit_points > self.full_hit_points:
-            self.hit_points = self.full_hit_points
-        else:
-            self.hit_points = hit_points
         self.damage = 2.0
-        self.type = "settler"
-
-    def draw(self):
-        """
-        Drawing settler and his path in the current window
-        """
-        if len(self.path) > 0 and self.is_chosen:
-            transparent_surface = pg.Surface(
-                (self.surface.get_size()),
-                pg.SRCALPHA
-            )
-
-            array_path = np.array(self.path, float)
-            array_path = np.insert(array_path, 0, [self.coord], axis=0)
-            pg.draw.aalines(
-                transparent_surface,
-                const.COLORS["white"] + (120,),
-                False,
-                array_path * const.TILE_SIZE + 12
-            )
-
-            self.surface.blit(transparent_surface, (0, 0))
-
-        super().draw()
 
 
 class Deer(Animal):
@@ -266,6 +343,18 @@ class Deer(Animal):
     Large herbivore animal
     """
 
+    __slots__ = ()
+
+    draw_features = {
+        "default": [0.5, 0.5, "deer_west.png"],
+        "north": [0.0, 0.5, "deer_north.png"],
+        "south": [0.0, 0.5, "deer_south.png"],
+        "west": [0.5, 0.5, "deer_west.png"],
+        "east": [0.5, 0.5, "deer_east.png"]
+    }
+    full_hit_points = 30.0
+    type = "deer"
+
     def __init__(self, surface, coord, hit_points=30.0):
         """
         Constructor of deer
@@ -274,25 +363,10 @@ class Deer(Animal):
         :param hit_points: int - current object hit points
         """
         super().__init__(surface, coord, hit_points)
-        self.draw_features = {
-            "default": [0.5, 0.5, "deer_west.png"],
-            "north": [0.0, 0.5, "deer_north.png"],
-            "south": [0.0, 0.5, "deer_south.png"],
-            "west": [0.5, 0.5, "deer_west.png"],
-            "east": [0.5, 0.5, "deer_east.png"]
-        }
-        self.draw_box = objects.create_draw_box(self.coord, self.draw_features, "default")
-        self.texture = objects.create_texture(self.draw_features, "default")
-        self.full_hit_points = 30.0
-        if hit_points > self.full_hit_points:
-            self.hit_points = self.full_hit_points
-        else:
-            self.hit_points = hit_points
         self.speed = 0.05
         self.damage = 0.5
         self.melee_cooldown = 120.0
         self.activity_rate = 0.2
-        self.type = "deer"
 
 
 class Wolf(Animal):
@@ -300,6 +374,18 @@ class Wolf(Animal):
     Medium size predatory animal
     """
 
+    __slots__ = ()
+
+    draw_features = {
+        "default": [0.25, 0.0, "wolf_west.png"],
+        "north": [0.0, 0.0, "wolf_north.png"],
+        "south": [0.0, 0.0, "wolf_south.png"],
+        "west": [0.25, 0.0, "wolf_west.png"],
+        "east": [0.25, 0.0, "wolf_east.png"]
+    }
+    full_hit_points = 16.0
+    type = "wolf"
+
     def __init__(self, surface, coord, hit_points=16.0):
         """
         Constructor of wolf
@@ -308,24 +394,9 @@ class Wolf(Animal):
         :param hit_points: int - current object hit points
         """
         super().__init__(surface, coord, hit_points)
-        self.draw_features = {
-            "default": [0.25, 0.0, "wolf_west.png"],
-            "north": [0.0, 0.0, "wolf_north.png"],
-            "south": [0.0, 0.0, "wolf_south.png"],
-            "west": [0.25, 0.0, "wolf_west.png"],
-            "east": [0.25, 0.0, "wolf_east.png"]
-        }
-        self.draw_box = objects.create_draw_box(self.coord, self.draw_features, "default")
-        self.texture = objects.create_texture(self.draw_features, "default")
         self.speed = 0.12
-        self.full_hit_points = 16.0
-        if hit_points > self.full_hit_points:
-            self.hit_points = self.full_hit_points
-        else:
-            self.hit_points = hit_points
         self.damage = 3.0
         self.activity_rate = 0.5
-        self.type = "wolf"
 
 
 class Turtle(Animal):
@@ -333,6 +404,17 @@ class Turtle(Animal):
     Small herbivore in a shell
     """
 
+    __slots__ = ()
+
+    draw_features = {
+        "default": [0.0, 0.0, "turtle_west.png"],
+        "north": [0.0, 0.0, "turtle_north.png"],
+        "south": [0.0, 0.0, "turtle_south.png"],
+        "west": [0.0, 0.0, "turtle_west.png"],
+        "east": [0.0, 0.0, "turtle_east.png"]
+    }
+    type = "turtle"
+
     def __init__(self, surface, coord, hit_points=10.0):
         """
         Constructor of turtle
@@ -341,17 +423,7 @@ class Turtle(Animal):
         :param hit_points: int - current object hit points
         """
         super().__init__(surface, coord, hit_points)
-        self.draw_features = {
-            "default": [0.0, 0.0, "turtle_west.png"],
-            "north": [0.0, 0.0, "turtle_north.png"],
-            "south": [0.0, 0.0, "turtle_south.png"],
-            "west": [0.0, 0.0, "turtle_west.png"],
-            "east": [0.0, 0.0, "turtle_east.png"]
-        }
-        self.draw_box = objects.create_draw_box(self.coord, self.draw_features, "default")
-        self.texture = objects.create_texture(self.draw_features, "default")
         self.speed = 0.03
         self.damage = 0.5
         self.melee_cooldown = 80.0
         self.activity_rate = 0.1
-        self.type = "turtle"
@@ -1,42 +1,98 @@
 import cmath
 import heapq
 
+import numpy as np
 
-def make_grid(region_map, list_solid_object):
+import metrics as metrics
+import worldstore as worldstore
+
+PATH_REQUESTS = metrics.registry.counter("dijkstra.path_requests")
+NODES_EXPANDED = metrics.registry.counter("dijkstra.nodes_expanded")
+BLOCKED_PATHS = metrics.registry.counter("dijkstra.blocked_paths")
+PATH_LENGTH = metrics.registry.histogram("dijkstra.path_length", [2, 4, 8, 16, 32, 64, 128])
+
+
+class Path:
     """
-    Making tile velocity multiplier matrix
-    :param region_map: GameMap object - map of the game region
-    :param list_solid_object: list[SolidObject object,...] - list of all objects that can block a path
-    :return: grid: list[list[float]] - velocity multiplier matrix
+    Compact path of creature: waypoints packed into int16 array with a read cursor
     """
-    grid = []
-    width = region_map.width
-    height = region_map.height
-
-    for i in range(0, height):
-        grid.append([])
-        for j in range(0, width):
-            grid[-1].append(1 / region_map.field[i][j].speed_mod)
 
-    for solid_object in list_solid_object:
-        grid[int(solid_object.coord[1] + 0.5)][int(solid_object.coord[0] + 0.5)] = 10000
+    def __init__(self, waypoints=(), smooth=False):
+        """
+        Constructor of path
+        :param waypoints: list[list[int, int],...] - list of tiles [x, y] to go through
+        :param smooth: bool - if true, collinear waypoints are removed
+        """
+        waypoints = np.asarray(waypoints, dtype=np.int16).reshape(-1, 2)
+        if smooth:
+            waypoints = smooth_path(waypoints)
+        self.waypoints = waypoints
+        self.cursor = 0
+        self.target = self.waypoints[0].tolist() if len(self.waypoints) > 0 else None
+
+    def __len__(self):
+        """
+        :return: int - number of waypoints that are not passed yet
+        """
+        return len(self.waypoints) - self.cursor
+
+    def advance(self):
+        """
+        Moving the cursor to the next waypoint
+        """
+        self.cursor += 1
+        if self.cursor < len(self.waypoints):
+            self.target = self.waypoints[self.cursor].tolist()
+        else:
+            self.target = None
+
+    def remaining(self):
+        """
+        :return: numpy.ndarray - waypoints [x, y] that are not passed yet, shape (n, 2)
+        """
+        return self.waypoints[self.cursor:]
+
+    def prepend(self, tile):
+        """
+        Creating a new path that goes through the given tile first
+        :param tile: list[int, int] - coordinates of tile [x, y]
+        :return: Path object - new path
+        """
+        path = Path()
+        path.waypoints = np.concatenate((np.array([tile], dtype=np.int16), self.remaining()))
+        path.target = path.waypoints[0].tolist()
+        return path
+
+
+def smooth_path(waypoints):
+    """
+    Removing waypoints that lie on a straight line between their neighbours
+    :param waypoints: numpy.ndarray - waypoints [x, y], shape (n, 2)
+    :return: numpy.ndarray - waypoints of turns with the first and the last ones, shape (m, 2)
+    """
+    if len(waypoints) < 3:
+        return waypoints
 
-    return grid
+    steps = np.diff(waypoints.astype(np.int32), axis=0)
+    cross = steps[:-1, 0] * steps[1:, 1] - steps[:-1, 1] * steps[1:, 0]
+    dot = steps[:-1, 0] * steps[1:, 0] + steps[:-1, 1] * steps[1:, 1]
+    is_turn = (cross != 0) | (dot <= 0)
+    keep = np.concatenate(([True], is_turn, [True]))
+    return waypoints[keep]
 
 
-def make_graph(region_map, grid):
+def make_grid(region_map, list_solid_object):
     """
-    Making a dict. The Key: tuple(int, int) - coordinates of any tile (x, y)
-                   Value: list[float, tuple(int, int)] - list of speed mods at the around tiles
+    Marking the tiles of solid objects as blocked in the cost layer of the world store
+    Only the chunks under the objects are written, they are flushed with the store
     :param region_map: GameMap object - map of the game region
-    :param grid: list[list[float]] - velocity multiplier matrix
-    :return: dict{tuple(int, int): list[float, tuple(int, int)]}: - speed of move to neighboring tiles for each file
+    :param list_solid_object: list[SolidObject object,...] - list of all objects that can block a path
+    :return: grid: WorldStore object - store of the map, its cost layer is the velocity multiplier matrix
     """
-    graph = {}
-    for y, row in enumerate(grid):
-        for x, col in enumerate(row):
-            graph[(x, y)] = graph.get((x, y), []) + get_next_nodes(x, y, region_map, grid)
-    return graph
+    for solid_object in list_solid_object:
+        region_map.store.set("cost", int(solid_object.coord[0] + 0.5), int(solid_object.coord[1] + 0.5), 10000)
+
+    return region_map.store
 
 
 def check_next_node(x_coord, y_coord, cols, rows):
@@ -51,14 +107,14 @@ def check_next_node(x_coord, y_coord, cols, rows):
     return 0 <= x_coord < cols and 0 <= y_coord < rows
 
 
-def get_next_nodes(x, y, region_map, grid):
+def get_next_nodes(x, y, region_map, costs):
     """
     Finding cell coordinates around the current in a certain direction
     :param x: int - x location coordinate
     :param y: int - y location coordinate
     :param region_map: GameMap object - map of the game region
-    :param grid: list[list[float]] - velocity multiplier matrix
-    :return: [int, int] - coordinate around the current in a certain direction
+    :param costs: LayerReader object - reader of the cost layer of the grid
+    :return: list[tuple(float, tuple(int, int)),...] - cost of move and coordinates of every neighbouring tile
     """
     cols = region_map.width
     rows = region_map.height
@@ -67,9 +123,9 @@ def get_next_nodes(x, y, region_map, grid):
     for dx, dy in ways:
         if check_next_node(x + dx, y + dy, cols, rows):
             if abs(dx) + abs(dy) == 2:
-                node.append((grid[y + dy][x + dx] * 2 ** 0.5, (x + dx, y + dy)))
+                node.append((costs.get(x + dx, y + dy) * 2 ** 0.5, (x + dx, y + dy)))
             else:
-                node.append((grid[y + dy][x + dx], (x + dx, y + dy)))
+                node.append((costs.get(x + dx, y + dy), (x + dx, y + dy)))
     return node
 
 
@@ -96,23 +152,26 @@ def dijkstra_logic(creature_coord, goal_coord, region_map, list_solid_object, gr
     :param goal_coord: [int, int] - finish coordinate
     :param region_map: GameMap object - map of the game region
     :param list_solid_object: list[SolidObject object,...] - list of all objects that can block a path
-    :param grid: list[list[float]] - velocity multiplier matrix
+    :param grid: WorldStore object - store of the map, its cost layer is the velocity multiplier matrix
     :return: list[list[int, int],...] - list of tiles [y, x] to go through
     """
-    graph = make_graph(region_map, grid)
+    PATH_REQUESTS.value += 1
+    costs = worldstore.LayerReader(grid, "cost")  # only the chunks around the searched tiles are read
     start = (int(creature_coord[0] + 0.5), int(creature_coord[1] + 0.5))
     goal = (goal_coord[0], goal_coord[1])
     queue_coords = []
     heapq.heappush(queue_coords, (0, start))
     cost_visited = {start: 0}
     visited = {start: None}
+    nodes_expanded = 0
 
     while queue_coords:
         cur_cost, cur_node = heapq.heappop(queue_coords)
+        nodes_expanded += 1
         if cur_node == goal:
             break
 
-        next_nodes = graph[cur_node]
+        next_nodes = get_next_nodes(cur_node[0], cur_node[1], region_map, costs)
         for next_node in next_nodes:
             neigh_cost, neigh_node = next_node
             new_cost = cost_visited[cur_node] + neigh_cost
@@ -134,9 +193,12 @@ def dijkstra_logic(creature_coord, goal_coord, region_map, list_solid_object, gr
         path.append(coordinates)
 
     path.reverse()
+    NODES_EXPANDED.value += nodes_expanded
     if checker_of_path(creature_coord, path, list_solid_object):
+        BLOCKED_PATHS.value += 1
         return []
 
+    PATH_LENGTH.observe(len(path))
     return path
 
 
@@ -155,5 +217,5 @@ def time_counter(path, region_map):
         x1 = path[number_element][0]
         y1 = path[number_element][1]
         facet = cmath.sqrt((x0 - x1) ** 2 + (y0 - y1) ** 2)
-        time += facet / region_map.field[y0][x0].speed_mod
+        time += facet / region_map.store.get("speed_mod", x0, y0)
     return time
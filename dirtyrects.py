@@ -0,0 +1,98 @@
+import pygame as pg
+
+import constants as const
+import metrics as metrics
+
+FULL_UPDATES = metrics.registry.counter("dirtyrects.full_updates")
+PARTIAL_UPDATES = metrics.registry.counter("dirtyrects.partial_updates")
+
+
+class DirtyRects:
+    """
+    Regions of the screen changed since the previous frame, only they are redrawn and pushed to the display
+    Every drawn element is tracked by its rect and state, a changed element makes dirty both its old and new rect
+    """
+
+    def __init__(self, size, full_update_area=const.FULL_UPDATE_AREA):
+        """
+        Constructor of dirty rects, the first frame is always updated whole
+        :param size: tuple(int, int) - size of the screen in pixels
+        :param full_update_area: float - part of the screen, if dirty regions cover more the whole screen is updated
+        """
+        self.screen_box = pg.Rect((0, 0), size)
+        self.full_update_area = full_update_area * size[0] * size[1]
+        self.states = {}  # rect and state of every element in the previous frame by key
+        self.current_states = {}
+        self.rects = []
+        self.regions = []
+        self.is_invalid = True  # the whole screen has to be redrawn in the next frame
+        self.is_full_update = False  # the whole screen is redrawn in the current frame
+
+    def track(self, key, rect, state=None):
+        """
+        Registering an element drawn in the current frame
+        :param key: hashable - key of the element that is the same in every frame, e.g. id of the object
+        :param rect: Pygame Rect object - part of the screen covered by the element
+        :param state: anything comparable - everything else that changes the look of the element, e.g. its texture
+        """
+        self.current_states[key] = (rect, state)
+
+    def add(self, rect):
+        """
+        Marking a part of the screen as dirty without tracking
+        :param rect: Pygame Rect object - dirty part of the screen
+        """
+        self.rects.append(pg.Rect(rect))
+
+    def invalidate(self):
+        """
+        Redrawing and updating the whole screen in the next frame, e.g. after the window was exposed
+        """
+        self.is_invalid = True
+
+    def collect(self):
+        """
+        Comparing the tracked elements with the previous frame and merging the dirty rects into regions
+        :return: list[Pygame Rect object,...] - regions of the screen to redraw, the whole screen for a full update
+        """
+        for key, (rect, state) in self.current_states.items():
+            previous = self.states.pop(key, None)
+            if previous is None:
+                self.rects.append(rect)
+            elif previous[0] != rect or previous[1] != state:
+                self.rects.append(previous[0])
+                self.rects.append(rect)
+        for rect, _ in self.states.values():
+            self.rects.append(rect)
+        self.states = self.current_states
+        self.current_states = {}
+
+        self.regions = []
+        for rect in self.rects:
+            rect = rect.clip(self.screen_box)
+            if rect.width == 0 or rect.height == 0:
+                continue
+            index = rect.collidelist(self.regions)
+            while index != -1:
+                rect.union_ip(self.regions.pop(index))
+                index = rect.collidelist(self.regions)
+            self.regions.append(rect)
+        self.rects = []
+
+        self.is_full_update = self.is_invalid or \
+            sum(region.width * region.height for region in self.regions) > self.full_update_area
+        self.is_invalid = False
+        if self.is_full_update:
+            self.regions = [self.screen_box.copy()]
+        return self.regions
+
+    def update(self):
+        """
+        Pushing the collected regions to the display
+        """
+        if self.is_full_update:
+            pg.display.update()
+            FULL_UPDATES.value += 1
+        elif self.regions:
+            pg.display.update(self.regions)
+            PARTIAL_UPDATES.value += 1
@@ -1,50 +1,73 @@
+import os
 import random as rnd
+import shutil
+import threading
 
 import numpy as np
-from PIL import Image
+import pygame as pg
 
 import constants as const
+import map_objects as objects
+import metrics as metrics
 import perlin as perlin
+import worldstore as worldstore
 
+LANDSCAPE_CACHE_HITS = metrics.registry.counter("game_map.landscape_cache_hits")
+LANDSCAPE_CACHE_MISSES = metrics.registry.counter("game_map.landscape_cache_misses")
+MAP_CACHE_HITS = metrics.registry.counter("game_map.map_cache_hits")
+MAP_CACHE_MISSES = metrics.registry.counter("game_map.map_cache_misses")
 
-class Tile:
+GENERATOR_VERSION = 2  # has to be increased after every change of generation or of the world store,
+#                         otherwise old cached maps are used
+BLOCKED_COST = 10000  # cost of moving through a tile with a solid object
+PROGRESS_STEP = 256  # number of tiles or objects between reports of progress
+
+LANDSCAPE_TYPES = tuple(const.LANDSCAPE)  # landscape of tile is stored as an index in this tuple
+SOIL, SAND, ROCK = (LANDSCAPE_TYPES.index(landscape_type) for landscape_type in ("soil", "sand", "rock"))
+SPEED_MODS = np.array([const.LANDSCAPE[landscape_type][0] for landscape_type in LANDSCAPE_TYPES])
+PRE_OBJECTS = (None, "tree", "bush", "cliff", "deer", "wolf", "turtle")  # objects prescribed for spawn on tiles
+
+
+landscape_textures = {}
+
+
+def get_landscape_texture(landscape_type):
     """
-    Tile that contains information about its surface type and prescribed for spawn objects
+    Getting the texture of landscape, it is loaded on the first use so the headless game never loads it
+    Cache hits are counted by the caller, which renders many tiles at once
+    :param landscape_type: string - the key of the corresponding landscape
+    :return: Pygame Surface object - texture of tile
     """
-
-    def __init__(self, surface, type, pre_object):
-        """
-        Constructor of tile
-        :param type: string - the key of the corresponding landscape
-        :param pre_object: string - the key of the corresponding map object
-        """
-        self.surface = surface
-        self.type = type
-        self.speed_mod, self.texture = const.LANDSCAPE[type]
-        self.pre_object = pre_object
+    if landscape_type not in landscape_textures:
+        LANDSCAPE_CACHE_MISSES.value += 1
+        landscape_textures[landscape_type] = pg.transform.scale(
+            objects.load_image(const.LANDSCAPE[landscape_type][1]),
+            (const.TILE_SIZE, const.TILE_SIZE)
+        )
+    return landscape_textures[landscape_type]
 
 
-def probability_tree():
-    if rnd.random() >= 0.91:
+def probability_tree(rng=rnd):
+    if rng.random() >= 0.91:
         return 'tree'
     else:
         return None
 
 
-def probability_bush():
-    if rnd.random() >= 0.95:
+def probability_bush(rng=rnd):
+    if rng.random() >= 0.95:
         return 'bush'
     else:
         return None
 
 
-def probability_cliff(field, coord, surface, rad):
+def probability_cliff(terrain, coord, size, rad):
     is_rock_nearby = True
 
     for i in range(max(coord[1] - rad, 0),
-                   min(surface.get_size()[1] // const.TILE_SIZE, coord[1] + rad + 1 - const.INTERFACE_AMENDMENT)):
-        for j in range(max(coord[0] - rad, 0), min(surface.get_size()[0] // const.TILE_SIZE, coord[0] + rad + 1)):
-            if field[i][j].type != "rock":
+                   min(size[1] // const.TILE_SIZE, coord[1] + rad + 1 - const.INTERFACE_AMENDMENT)):
+        for j in range(max(coord[0] - rad, 0), min(size[0] // const.TILE_SIZE, coord[0] + rad + 1)):
+            if terrain[i, j] != ROCK:
                 is_rock_nearby = False
 
     if is_rock_nearby:
@@ -53,18 +76,82 @@ def probability_cliff(field, coord, surface, rad):
         return None
 
 
+def skip_progress(stage, fraction):
+    """
+    Progress callback of generation that reports nothing
+    :param stage: string - stage of generation
+    :param fraction: float - part of the stage that is done
+    """
+    pass
+
+
+def map_cache_path(seed, width, height):
+    """
+    :param seed: int - seed of the world
+    :param width: int - width of the map in tiles
+    :param height: int - height of the map in tiles
+    :return: string - directory of the cached map, None if the cache is off
+    """
+    if const.MAP_CACHE_DIRECTORY is None:
+        return None
+    return os.path.join(const.MAP_CACHE_DIRECTORY, "{}_{}x{}_v{}".format(seed, width, height, GENERATOR_VERSION))
+
+
+def evict_maps():
+    """
+    Removing the least recently used maps from the cache of maps, so that at most MAP_CACHE_LIMIT are kept
+    A map is used when it is generated or opened, see GameMap
+    """
+    maps = []
+    for name in os.listdir(const.MAP_CACHE_DIRECTORY):
+        path = os.path.join(const.MAP_CACHE_DIRECTORY, name)
+        if not name.endswith(".tmp"):
+            try:
+                maps.append((os.path.getmtime(path), path))
+            except OSError:  # the map was removed by another process
+                pass
+    for _, path in sorted(maps, reverse=True)[const.MAP_CACHE_LIMIT:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def fill_store(store, terrain, pre_object):
+    """
+    Writing the landscape and the layers derived from it to the world store
+    :param store: WorldStore object - store of the map
+    :param terrain: numpy.ndarray - landscape indexes of tiles, shape (height, width)
+    :param pre_object: numpy.ndarray - indexes of objects prescribed for spawn, shape (height, width)
+    """
+    cost = 1 / SPEED_MODS[terrain]
+    cost[pre_object > 0] = BLOCKED_COST
+    store.write("terrain", terrain)
+    store.write("speed_mod", SPEED_MODS[terrain])
+    store.write("object", pre_object)
+    store.write("cost", cost)
+    store.flush()
+
+
 class GameMap:
     """
     GameMap consisting of tiles arranged in a grid
+    Tiles are kept in layers of the world store, there is no Python object per tile
     """
 
-    def __init__(self, surface, size):
-
+    def __init__(self, surface, size, world_seed, terrain=None, progress=None):
+        """
+        Constructor of game map
+        :param surface: Pygame Surface object - target window, None in headless mode
+        :param size: tuple(int, int) - size of the game region in pixels
+        :param world_seed: WorldSeed object - random streams of the world
+        :param terrain: numpy.ndarray - landscape indexes of tiles, shape (height, width), e.g. from a save file;
+                        if given, the map is not generated and nothing is prescribed for spawn
+        :param progress: callable - function taking the stage of generation and its done part, None if not reported
+        Generated maps of explicit seeds are stored in the cache of maps and opened from it writable if they were
+        generated before, the chunks changed in the game are written back at the next flush of the store
+        """
         self.surface = surface
         self.size = size
         self.width = size[0] // const.TILE_SIZE
         self.height = size[1] // const.TILE_SIZE - const.INTERFACE_AMENDMENT
-        self.field = []
         self.perlin_size = 100
         self.res = 40
         self.frames = 20
@@ -72,38 +159,114 @@ class GameMap:
         self.space_range = self.perlin_size // self.res
         self.frame_range = self.frames // self.framer
 
-        pnf = perlin.PerlinNoiseFactory(3, octaves=4, tile=(self.space_range, self.space_range, self.frame_range))
+        self.image = None  # landscape of the whole map, rendered at the first drawing
+
+        if terrain is not None:
+            self.store = worldstore.WorldStore(self.width, self.height)
+            fill_store(self.store, np.asarray(terrain, dtype=np.uint8),
+                       np.zeros((self.height, self.width), dtype=np.uint8))
+            return
+
+        cache_path = None if world_seed.is_random else map_cache_path(world_seed.seed, self.width, self.height)
+        if cache_path is not None and os.path.isdir(cache_path):
+            MAP_CACHE_HITS.value += 1
+            os.utime(cache_path)  # the map is used, so it is the last to be evicted
+            self.store = worldstore.WorldStore(self.width, self.height, cache_path, "r+")
+            return
 
-        img = Image.new('RGB', (self.height, self.width))
+        MAP_CACHE_MISSES.value += 1
+        terrain, pre_object = self.generate(world_seed, progress or skip_progress)
+        if cache_path is None:
+            self.store = worldstore.WorldStore(self.width, self.height)
+            fill_store(self.store, terrain, pre_object)
+            return
+
+        # the directory appears at once, so other processes never open a half of the map
+        temporary_path = "{}.{}.{}.tmp".format(cache_path, os.getpid(), threading.get_ident())
+        fill_store(worldstore.WorldStore(self.width, self.height, temporary_path, "w+"), terrain, pre_object)
+        try:
+            os.rename(temporary_path, cache_path)
+        except OSError:  # the same map was cached by another process
+            shutil.rmtree(temporary_path, ignore_errors=True)
+        evict_maps()
+        self.store = worldstore.WorldStore(self.width, self.height, cache_path, "r+")
+
+    def generate(self, world_seed, progress):
+        """
+        Generating the landscape from Perlin noise and prescribing trees, bushes and cliffs for spawn
+        :param world_seed: WorldSeed object - random streams of the world
+        :param progress: callable - function taking the stage of generation and its done part
+        :return: tuple(numpy.ndarray, numpy.ndarray) - landscape indexes of tiles and indexes of prescribed objects,
+                 shape (height, width)
+        """
+        pnf = perlin.PerlinNoiseFactory(3, octaves=4, tile=(self.space_range, self.space_range, self.frame_range),
+                                        rng=world_seed["noise"])
+        terrain_rng = world_seed["terrain"]
+
+        brightness = np.zeros((self.height, self.width), dtype=np.uint8)
         t = self.frames - 1
         for i in range(self.height):
+            progress("noise", i / self.height)
             for j in range(self.width):
                 n = pnf(i / self.res, j / self.res, t / self.framer)
-                img.putpixel((i, j), int((n + 1) / 2 * 255 + 0.5))
+                brightness[i, j] = int((n + 1) / 2 * 255 + 0.5) & 0xFF
 
-        for i in range(self.height):
-            self.field.append([])
-            for j in range(self.width):
-                pix = img.getpixel((i, j))
-                r = np.array(pix)[0]
-                if 144 > r > 116:
-                    self.field[-1].append(Tile(surface, 'soil', probability_tree() or probability_bush()))
-                elif 116 > r > 0:
-                    self.field[-1].append(Tile(surface, 'rock', None))
-                else:
-                    self.field[-1].append(Tile(surface, 'sand', None))
+        progress("classification", 0.0)
+        terrain = np.full((self.height, self.width), SAND, dtype=np.uint8)
+        terrain[(brightness > 116) & (brightness < 144)] = SOIL
+        terrain[(brightness > 0) & (brightness < 116)] = ROCK
 
-        for i in range(self.height):
-            for j in range(self.width):
-                if self.field[i][j].type == "rock":
-                    self.field[i][j].pre_object = probability_cliff(self.field, (j, i), self.surface, 2)
+        pre_object = np.zeros((self.height, self.width), dtype=np.uint8)
+        for i, j in np.argwhere(terrain == SOIL):
+            pre_object[i, j] = PRE_OBJECTS.index(probability_tree(terrain_rng) or probability_bush(terrain_rng))
 
-    def draw(self):
+        rocks = np.argwhere(terrain == ROCK)
+        for index, (i, j) in enumerate(rocks):
+            if index % PROGRESS_STEP == 0:
+                progress("cliffs", index / len(rocks))
+            pre_object[i, j] = PRE_OBJECTS.index(probability_cliff(terrain, (j, i), self.size, 2))
+
+        return terrain, pre_object
+
+    def tile_type(self, x, y):
         """
-        Drawing the whole map in the current window
+        :param x: int - x coordinate of tile
+        :param y: int - y coordinate of tile
+        :return: string - the key of the corresponding landscape
         """
-        for i in range(self.height):
-            for j in range(self.width):
-                tile_rect = (j * const.TILE_SIZE, i * const.TILE_SIZE, const.TILE_SIZE, const.TILE_SIZE)
-                landscape_texture = self.field[i][j].texture
-                self.surface.blit(landscape_texture, tile_rect)
+        return LANDSCAPE_TYPES[self.store.get("terrain", x, y)]
+
+    def render(self):
+        """
+        Rendering every map tile into one image
+        :return: Pygame Surface object - landscape of the whole map
+        """
+        image = pg.Surface((self.width * const.TILE_SIZE, self.height * const.TILE_SIZE))
+        cache_hits = 0
+        for top, terrain in self.store.bands("terrain"):
+            for i in range(terrain.shape[0]):
+                for j in range(self.width):
+                    tile_rect = (j * const.TILE_SIZE, (top + i) * const.TILE_SIZE, const.TILE_SIZE, const.TILE_SIZE)
+                    landscape_type = LANDSCAPE_TYPES[terrain[i, j]]
+                    cache_hits += landscape_type in landscape_textures
+                    image.blit(get_landscape_texture(landscape_type), tile_rect)
+        LANDSCAPE_CACHE_HITS.value += cache_hits
+        return image
+
+    def get_image(self):
+        """
+        :return: Pygame Surface object - landscape of the whole map, it is rendered at the first call
+        """
+        if self.image is None:
+            self.image = self.render()
+        return self.image
+
+    def draw(self, region=None):
+        """
+        Drawing the map in the current window from its rendered image
+        :param region: Pygame Rect object - part of the screen to redraw, the whole map by default
+        """
+        if region is None:
+            self.surface.blit(self.get_image(), (0, 0))
+        else:
+            self.surface.blit(self.get_image(), region, region)
@@ -1,12 +1,32 @@
+import time
+
+import numpy as np
 import pygame as pg
 import random as rnd
 
 import constants as const
-import dijkstra
 import interface as interface
 import game_map as game_map
 import map_objects as objects
 import creature as creature
+import dirtyrects as dirtyrects
+import metrics as metrics
+import overlay as overlay
+import profiler as profiler
+import renderer as renderer
+import savegame as savegame
+import scheduler as scheduler
+import seeding as seeding
+
+
+SPAWN_ATTEMPTS = metrics.registry.counter("gameplay.spawn_attempts")
+TICK_DURATION = metrics.registry.histogram("gameplay.tick_duration_ms", [0.25, 0.5, 1, 2, 4, 8, 16, 33, 66])
+
+ANIMALS = {
+    "deer": creature.Deer,
+    "wolf": creature.Wolf,
+    "turtle": creature.Turtle
+}
 
 
 def pixels2tiles(pixel_coords):
@@ -18,20 +38,23 @@ def pixels2tiles(pixel_coords):
     return [pixel_coords[0] // const.TILE_SIZE, pixel_coords[1] // const.TILE_SIZE]
 
 
-def find_safe_tile(list_solid_object, spawn_box, mode="anywhere"):
+def find_safe_tile(list_solid_object, spawn_box, mode="anywhere", rng=rnd):
     """
     Spawn creatures in a random guaranteed suitable tile
     :param list_solid_object: list[SolidObject object,...] - list of all solid objects
     :param spawn_box: list[int, int] - the size of the area where spawn is allowed
     :param mode: string - spawn mod (everywhere or only at the border)
+    :param rng: Random object - random stream of spawning
     :return: list[int, int] - coordinates of suitable tile
     """
     suitable_tile = [0, 0]
     is_found = False
+    attempts = 0
 
     while not is_found:
         is_found = True
-        rnd_coord = [rnd.randint(0, spawn_box[0]), rnd.randint(0, spawn_box[1])]
+        attempts += 1
+        rnd_coord = [rng.randint(0, spawn_box[0]), rng.randint(0, spawn_box[1])]
 
         if mode == "border":
             if (rnd_coord[0] * rnd_coord[1] != 0) and (rnd_coord[0] != spawn_box[0]) and (rnd_coord[1] != spawn_box[1]):
@@ -43,6 +66,7 @@ def find_safe_tile(list_solid_object, spawn_box, mode="anywhere"):
 
         suitable_tile = rnd_coord
 
+    SPAWN_ATTEMPTS.value += attempts
     return suitable_tile
 
 
@@ -51,141 +75,236 @@ class Gameplay:
     Gameplay itself
     """
 
-    def __init__(self, surface, main_menu):
+    def __init__(self, surface, main_menu, size=None, seed=None, save_path=None, progress=None):
         """
         Constructor of gameplay
-        :param surface: Pygame Surface object - target surface
-        """
+        :param surface: Pygame Surface object - target surface, None for the headless game without window
+        :param main_menu: Menu object - main menu of the game, None for the headless game
+        :param size: tuple(int, int) - size of the game region in pixels, by default the size of surface
+        :param seed: int - seed of the world, None for a random world
+        :param save_path: string - save file to load the game from, then the size and the seed are taken from it
+        :param progress: callable - function taking the stage of creation and its done part, see loader.STAGES;
+                         it may raise to abort the creation
+        """
+        progress = progress or game_map.skip_progress
+        saved_game = None
+        terrain = None
+        if save_path is not None:
+            saved_game = savegame.read(save_path)
+            seed = savegame.header(saved_game, "seed")
+            size = (savegame.header(saved_game, "width"), savegame.header(saved_game, "height"))
+            terrain = saved_game["terrain"]
+        elif surface is not None:
+            size = surface.get_size()
+
         self.surface = surface
         self.main_menu = main_menu
+        self.is_headless = surface is None
+        self.world_seed = seeding.WorldSeed(seed)
+        self.recorder = None
+        self.replayer = None
+        self.autosave = None
+        self.profiler = profiler.FrameProfiler()
         self.clock = pg.time.Clock()
-        self.interface = interface.InGameInterface(surface)
-        self.game_map = game_map.GameMap(surface, surface.get_size())
+        self.tick = 0
+        self.ai_scheduler = scheduler.TickScheduler()
+        self.timers = scheduler.TimerWheel(self.tick)
+        self.interface = interface.InGameInterface(surface, size)
+        self.dirty_rects = dirtyrects.DirtyRects(self.interface.size)
+        self.overlay = overlay.Overlay(surface)
+        self.renderer = None  # it is made at the first drawing, headless games never draw
+        self.game_map = game_map.GameMap(surface, size, self.world_seed, terrain, progress)
         self.list_solid_object = []
+        self.list_effects = []
 
-        for i in range(self.game_map.height):
-            for j in range(self.game_map.width):
-                if self.game_map.field[i][j].pre_object == "tree":
-                    self.list_solid_object.append(objects.Tree(self.surface, [j, i]))
-                elif self.game_map.field[i][j].pre_object == "bush":
-                    self.list_solid_object.append(objects.Bush(self.surface, [j, i]))
-                elif self.game_map.field[i][j].pre_object == "cliff":
-                    self.list_solid_object.append(objects.Cliff(self.surface, [j, i]))
-                elif self.game_map.field[i][j].pre_object == "deer":
-                    self.list_solid_object.append(creature.Deer(self.surface, [j, i]))
-                elif self.game_map.field[i][j].pre_object == "wolf":
-                    self.list_solid_object.append(creature.Wolf(self.surface, [j, i]))
-                elif self.game_map.field[i][j].pre_object == "turtle":
-                    self.list_solid_object.append(creature.Turtle(self.surface, [j, i]))
-
-        self.grid = dijkstra.make_grid(self.game_map, self.list_solid_object)
+        for top, pre_objects in self.game_map.store.bands("object"):  # one band of chunks is held at once
+            progress("objects", top / self.game_map.height)
+            for i, j in np.argwhere(pre_objects):
+                pre_object = game_map.PRE_OBJECTS[pre_objects[i, j]]
+                coord = [int(j), int(top + i)]
+                if pre_object == "tree":
+                    self.list_solid_object.append(objects.Tree(self.surface, coord))
+                elif pre_object == "bush":
+                    bush = objects.Bush(self.surface, coord,
+                                        time_from_harvest=self.world_seed["vegetation"].randint(0, 3600))
+                    bush.plan_ripening(self.tick)
+                    self.list_solid_object.append(bush)
+                elif pre_object == "cliff":
+                    self.list_solid_object.append(objects.Cliff(self.surface, coord))
+                elif pre_object in ANIMALS:
+                    self.add_animal(ANIMALS[pre_object](self.surface, coord))
+
+        progress("nav_grid", 0.0)
+        self.grid = self.game_map.store  # its cost layer is read by chunks, objects of the generated world are in it
         self.settler = creature.Settler(self.surface, find_safe_tile(
             self.list_solid_object,
             [self.game_map.width - 1, self.game_map.height - 1],
+            rng=self.world_seed["spawn"]
         ))
-        self.list_effects = []
+        self.schedule_world_timers()
         self.list_loot = []
         self.number_of_animals = 0
-        self.scan_time = 0
+        self.scan_tick = 0
+        self.game_speed = 1
         self.interface_mod = "default"
         self.chosen_map_object = None
         self.picked_task = None
         self.is_finished = False
+        if saved_game is not None:
+            savegame.restore(self, saved_game)
+
+    def count_objects(self):
+        """
+        Counting the population of the world
+        :return: dict{string: int} - number of objects of every type
+        """
+        population = {}
+        for map_object in self.list_solid_object + self.list_loot + self.list_effects + [self.settler]:
+            population[map_object.type] = population.get(map_object.type, 0) + 1
+        return population
+
+    def schedule_world_timers(self):
+        """
+        Rebuilding the world timer wheel from the timer ticks stored in objects, e.g. after loading
+        """
+        self.timers = scheduler.TimerWheel(self.tick)
+
+        for solid_object in self.list_solid_object:
+            if solid_object.type == "bush" and not solid_object.is_riped and solid_object.ripening_tick is not None:
+                self.timers.schedule(solid_object.ripening_tick, solid_object, "ripe")
+
+        for effect in self.list_effects:
+            self.timers.schedule(effect.expiration_tick, effect, "expire")
+
+    def harvest_bush(self, bush):
+        """
+        Harvesting a ripe bush and planning its next ripening
+        :param bush: Bush object - ripe bush
+        """
+        self.timers.schedule(bush.harvest(self.tick), bush, "ripe")
+
+    def add_effect(self, effect):
+        """
+        Adding an effect to the map and planning its expiration
+        :param effect: Effect object - new effect
+        """
+        self.list_effects.append(effect)
+        self.timers.schedule(effect.plan_expiration(self.tick), effect, "expire")
+
+    def update_timers(self):
+        """
+        Firing the world timers that are due at the current tick
+        """
+        is_effect_expired = False
+
+        for map_object, action in self.timers.pop_due(self.tick):
+            getattr(map_object, action)()
+            if map_object.type == "effect":
+                is_effect_expired = True
+
+        if is_effect_expired:
+            self.list_effects = [effect for effect in self.list_effects if not effect.is_expired]
+
+    def add_animal(self, animal):
+        """
+        Adding an animal to the map and planning its first decision in the AI scheduler
+        :param animal: Animal object - new animal
+        """
+        self.list_solid_object.append(animal)
+
+        delay = animal.next_decision_delay(self.world_seed["ai"])
+        if delay is not None:
+            self.ai_scheduler.schedule(self.tick + delay, animal, "decide_to_move")
 
     def create_new_animal(self):
         """
         Randomly spawn new animal on the border of the map
         """
-        if (pg.time.get_ticks() > self.scan_time + 1000) and (self.number_of_animals < const.ANIMALS_LIMIT):
-            rand_num = rnd.random()
-            if rand_num < 0.1:
-                new_dear = creature.Deer(
-                    self.surface,
-                    find_safe_tile(self.list_solid_object,
-                                   [self.game_map.width - 1, self.game_map.height - 1],
-                                   "border"),
-                )
-                self.list_solid_object.append(new_dear)
-                new_dear.path = new_dear.pathfinder(
-                    find_safe_tile(self.list_solid_object,
-                                   [self.game_map.width - 1, self.game_map.height - 1]),
-                    self.game_map,
-                    self.list_solid_object,
-                    self.grid
-                )
-                self.number_of_animals += 1
-
-            elif rand_num < 0.2:
-                new_wolf = creature.Wolf(
-                    self.surface,
-                    find_safe_tile(self.list_solid_object,
-                                   [self.game_map.width - 1, self.game_map.height - 1],
-                                   "border"),
-                )
-                self.list_solid_object.append(new_wolf)
-                new_wolf.path = new_wolf.pathfinder(
-                    find_safe_tile(self.list_solid_object,
-                                   [self.game_map.width - 1, self.game_map.height - 1]),
-                    self.game_map,
-                    self.list_solid_object,
-                    self.grid
-                )
-                self.number_of_animals += 1
-
-            elif rand_num < 0.3:
-                new_turtle = creature.Turtle(
-                    self.surface,
-                    find_safe_tile(self.list_solid_object,
-                                   [self.game_map.width - 1, self.game_map.height - 1],
-                                   "border"),
-                )
-                self.list_solid_object.append(new_turtle)
-                new_turtle.path = new_turtle.pathfinder(
-                    find_safe_tile(self.list_solid_object,
-                                   [self.game_map.width - 1, self.game_map.height - 1]),
-                    self.game_map,
-                    self.list_solid_object,
-                    self.grid
-                )
-                self.number_of_animals += 1
-
-            self.scan_time = pg.time.get_ticks()
+        if (self.tick > self.scan_tick + const.TICK_RATE) and (self.number_of_animals < const.ANIMALS_LIMIT):
+            spawn_rng = self.world_seed["spawn"]
+            rand_num = spawn_rng.random()
+            for animal_type, probability in const.SPAWN_PROBABILITIES.items():
+                if rand_num < probability:
+                    new_animal = ANIMALS[animal_type](
+                        self.surface,
+                        find_safe_tile(self.list_solid_object,
+                                       [self.game_map.width - 1, self.game_map.height - 1],
+                                       "border",
+                                       spawn_rng),
+                    )
+                    self.add_animal(new_animal)
+                    new_animal.path = new_animal.pathfinder(
+                        find_safe_tile(self.list_solid_object,
+                                       [self.game_map.width - 1, self.game_map.height - 1],
+                                       rng=spawn_rng),
+                        self.game_map,
+                        self.list_solid_object,
+                        self.grid
+                    )
+                    self.number_of_animals += 1
+                    break
+                rand_num -= probability
+
+            self.scan_tick = self.tick
 
     def draw_interface(self):
         """
         Drawing in-game interface
         """
         self.interface.draw()
+        if self.profiler.is_enabled:
+            self.interface.draw_profiler(self.profiler)
 
-    def draw_map(self):
+    def track_changes(self, alpha=1.0):
         """
-        Drawing every map tile
+        Registering every drawn object and interface element, the changed ones make their regions of the screen dirty
+        :param alpha: float - part of the tick passed since the last simulation step, moving objects are interpolated
         """
-        self.game_map.draw()
+        if self.renderer is None:
+            self.renderer = renderer.SpriteRenderer(self.surface, self.game_map.get_image())
 
-    def draw_objects(self):
-        """
-        Drawing every object
-        """
-        for solid_object in self.list_solid_object:
-            solid_object.draw()
+        static_objects = [solid_object for solid_object in self.list_solid_object
+                          if not isinstance(solid_object, creature.Creature)] + self.list_loot
+        dynamic_objects = [solid_object for solid_object in self.list_solid_object
+                           if isinstance(solid_object, creature.Creature)] + self.list_effects + [self.settler]
+        self.renderer.track(self.dirty_rects, static_objects, dynamic_objects, alpha)
 
-        for loot_item in self.list_loot:
-            loot_item.draw()
+        selected = [self.chosen_map_object] if self.chosen_map_object is not None else []
+        for key, box, state in self.overlay.collect(selected, alpha):
+            self.dirty_rects.track(key, box, state)
 
-        for effect in self.list_effects:
-            effect.draw()
+        for element in self.interface.frames + self.interface.buttons:
+            self.dirty_rects.track(id(element), pg.Rect(element.draw_box).inflate(2, 2), element.draw_state())
 
-        self.settler.draw()
+        if self.profiler.is_enabled:
+            self.dirty_rects.invalidate()
 
-        if self.chosen_map_object is not None:
-            self.chosen_map_object.draw_frame()
+    def draw_map(self, alpha=1.0):
+        """
+        Drawing the map with the static objects under the dirty regions of the screen
+        :param alpha: float - part of the tick passed since the last simulation step, moving objects are interpolated
+        """
+        self.track_changes(alpha)
+        for region in self.dirty_rects.collect():
+            self.renderer.draw_static(region)
+
+    def draw_objects(self, alpha=1.0):
+        """
+        Drawing the dynamic objects and the overlay over the dirty regions
+        Each region is clipped, so the rest of the screen is kept
+        :param alpha: float - part of the tick passed since the last simulation step, moving objects are interpolated
+        """
+        for region in self.dirty_rects.regions:
+            self.surface.set_clip(region)
+            self.renderer.draw_dynamic(region, alpha)
+            self.overlay.draw(region)
+        self.surface.set_clip(None)
 
     def update_display(self):
         """
-        Updating display to reflect changes of objects
+        Updating the dirty regions of display to reflect changes of objects
         """
-        pg.display.update()
+        self.dirty_rects.update()
         self.clock.tick(const.FPS)
 
     def _process_quit(self, event):
@@ -207,6 +326,21 @@ class Gameplay:
                 self.chosen_map_object.is_chosen = False
                 self.chosen_map_object = None
 
+        elif event.key in const.GAME_SPEEDS:
+            self.game_speed = const.GAME_SPEEDS[event.key]
+
+        elif event.key == pg.K_F5:
+            savegame.save(self, const.SAVE_PATH)  # the time of saving goes to the metrics
+
+        elif event.key == pg.K_F3:
+            self.profiler.toggle()
+
+        elif event.key == pg.K_F7:
+            self.profiler.start_function_profile()
+
+        elif event.key == pg.K_F8:
+            self.profiler.snapshot_memory()
+
     def _process_interface(self, event):
         """
         Processing click on the interface buttons
@@ -222,8 +356,8 @@ class Gameplay:
                     self.picked_task = "go_to"
                 elif button.key == "interface_menu":
                     self.interface_mod = "menu"
-                elif button.key == "interface_main_menu":
-                    self.main_menu.is_active = True
+                elif button.key == "interface_main_menu" and self.main_menu is not None:
+                    self.main_menu.show()
 
         for frame in self.interface.frames:
             if interface.is_hovered(event, frame.draw_box):
@@ -295,9 +429,23 @@ class Gameplay:
 
     def process_input(self):
         """
-        Processing all player input
+        Processing all player input, while replaying only closing of the window is taken from the player
+        """
+        events = pg.event.get()
+
+        if self.replayer is not None:
+            events = [event for event in events if event.type == pg.QUIT]
+        elif self.recorder is not None:
+            self.recorder.record(self.tick, events)
+
+        self.process_events(events)
+
+    def process_events(self, events):
+        """
+        Processing the given input events
+        :param events: list[Pygame event object,...] - events from queue or from replay
         """
-        for event in pg.event.get():
+        for event in events:
             if event.type == pg.QUIT:
                 self._process_quit(event)
 
@@ -307,6 +455,9 @@ class Gameplay:
             elif event.type == pg.MOUSEMOTION:
                 self.interface.activate(event)
 
+            elif event.type == pg.WINDOWEXPOSED:
+                self.dirty_rects.invalidate()
+
             elif event.type == pg.MOUSEBUTTONDOWN:
                 if self._process_interface(event):
                     continue
@@ -358,9 +509,31 @@ class Gameplay:
     def ai_acts(self):
         """
         Acting of artificial intelligence of animals
-        """
-        for solid_object in self.list_solid_object:
-            if hasattr(solid_object, 'decide_to_move'):
-                solid_object.decide_to_move(self.game_map)
-            if hasattr(solid_object, 'decide_to_attack'):
-                solid_object.decide_to_attack()
+        Only the animals whose decisions are due at this tick are woken up,
+        every action returns the delay until its next call or None
+        """
+        for animal, action in self.ai_scheduler.pop_due(self.tick):
+            delay = getattr(animal, action)(self.game_map, self.world_seed["ai"])
+            if delay is not None:
+                self.ai_scheduler.schedule(self.tick + delay, animal, action)
+
+    def simulate(self):
+        """
+        Running one simulation tick of the world
+        """
+        if self.replayer is not None:
+            self.process_events(self.replayer.events_for(self.tick))
+            self.update_interface()
+
+        start_time = time.perf_counter()
+        self.tick += 1
+        self.profiler.call("create_new_animal", self.create_new_animal)
+        self.profiler.call("ai_acts", self.ai_acts)
+        self.profiler.call("update_timers", self.update_timers)
+        self.profiler.call("do_tasks", self.do_tasks)
+        self.profiler.call("move_creatures", self.move_creatures)
+        if self.autosave is not None and self.autosave.update(self):
+            self.interface.show_notice(
+                "Автосохранение: пауза {:.1f} мс".format(self.autosave.last_pause))
+        TICK_DURATION.observe((time.perf_counter() - start_time) * 1000)
+        metrics.registry.flush_if_due(self.tick)
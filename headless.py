@@ -0,0 +1,102 @@
+import argparse
+import json
+import time
+
+import constants as const
+import dijkstra as dijkstra
+import gameplay as gameplay
+import map_objects as objects
+import metrics as metrics
+import replay as replay
+import seeding as seeding
+
+
+def create_world(width, height, seed=None):
+    """
+    Building the world without window, textures and interface, it is called in objects.headless_mode
+    :param width: int - width of the map in tiles
+    :param height: int - height of the map in tiles
+    :param seed: int - seed of the random generator, None for a random world
+    :return: Gameplay object - headless game
+    """
+    size = (width * const.TILE_SIZE, (height + const.INTERFACE_AMENDMENT) * const.TILE_SIZE)
+    return gameplay.Gameplay(None, None, size, seed)
+
+
+def run(ticks, width=80, height=42, seed=None, replay_path=None):
+    """
+    Running the headless simulation for a given number of ticks
+    :param ticks: int - number of simulation ticks, None to run until the end of the replay
+    :param width: int - width of the map in tiles
+    :param height: int - height of the map in tiles
+    :param seed: int - seed of the world, None for a random world
+    :param replay_path: string - path to the recorded input, its seed and size replace the given ones
+    :return: dict - statistics of the run
+    """
+    metrics.registry.reset()
+
+    replayer = None
+    if replay_path is not None:
+        replayer = replay.InputReplayer(replay_path)
+        seed = replayer.seed
+        width = replayer.size[0] // const.TILE_SIZE
+        height = replayer.size[1] // const.TILE_SIZE - const.INTERFACE_AMENDMENT
+        if ticks is None:
+            ticks = replayer.last_tick + 1
+
+    with objects.headless_mode():  # animals born during the simulation are headless too
+        start_time = time.perf_counter()
+        game = create_world(width, height, seed)
+        game.replayer = replayer
+        build_time = time.perf_counter() - start_time
+
+        tick_times = []
+        start_time = time.perf_counter()
+        metrics.registry.gauge("gameplay.objects", game.count_objects)
+        try:
+            for _ in range(ticks):
+                tick_start_time = time.perf_counter()
+                game.simulate()
+                tick_times.append(time.perf_counter() - tick_start_time)
+                if game.is_finished:
+                    break
+        finally:
+            metrics.registry.remove_gauge("gameplay.objects")  # the registry must not keep the finished world alive
+        simulation_time = time.perf_counter() - start_time
+
+    return {
+        "seed": game.world_seed.seed,
+        "size": [width, height],
+        "ticks": game.tick,
+        "build_time": build_time,
+        "simulation_time": simulation_time,
+        "ticks_per_second": game.tick / simulation_time if simulation_time > 0 else None,
+        "tick_time": {
+            "mean": sum(tick_times) / len(tick_times) if tick_times else None,
+            "max": max(tick_times, default=None)
+        },
+        "path_requests": dijkstra.PATH_REQUESTS.value,
+        "animals": game.number_of_animals,
+        "population": game.count_objects(),
+        "metrics": metrics.registry.snapshot()["counters"]
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Running FrontierWorld simulation without window")
+    parser.add_argument("--ticks", type=int, default=None,
+                        help="number of simulation ticks, by default 10 seconds of game or the whole replay")
+    parser.add_argument("--width", type=int, default=80, help="width of the map in tiles")
+    parser.add_argument("--height", type=int, default=42, help="height of the map in tiles")
+    parser.add_argument("--seed", type=seeding.parse_seed, default=None, help="seed of the world")
+    parser.add_argument("--replay", default=None, help="replay file recorded by main.py --record")
+    parser.add_argument("--metrics", default=None, help="JSON-lines file for periodic snapshots of metrics")
+    args = parser.parse_args()
+
+    if args.metrics is not None:
+        metrics.registry.configure(args.metrics, const.METRICS_INTERVAL)
+
+    if args.ticks is None and args.replay is None:
+        args.ticks = 10 * const.TICK_RATE
+
+    print(json.dumps(run(args.ticks, args.width, args.height, args.seed, args.replay), indent=4))
@@ -1,6 +1,13 @@
+import math
+import os
+
 import pygame as pg
 
 import constants as const
+import dirtyrects as dirtyrects
+import textcache as textcache
+
+UI_COLORKEY = (255, 0, 255)  # transparent color of the in-game interface layer
 
 
 def tone_change(initial_color, amendment):
@@ -60,19 +67,22 @@ class Button:
         self.text = text
         self.key = key
         self.fontsize = fontsize
-        self.font = pg.font.Font(const.FONT, self.fontsize)
         self.original_color = color
         self.color = color
         self.is_selected = False
+        self.image = None
+        self.image_state = None  # label and color the image was rendered with
 
-    def draw(self):
+    def render(self):
         """
-        Drawing button in the current window
+        Rendering button into its own image
+        :return: Pygame Surface object - image of button
         """
-        box = self.draw_box
+        box = (0, 0, self.draw_box[2], self.draw_box[3])
+        image = pg.Surface((math.ceil(box[2]), math.ceil(box[3])), pg.SRCALPHA)
 
         pg.draw.polygon(
-            self.surface,
+            image,
             tone_change(self.color, 30),
             ([box[0], box[1]],
              [box[0] + box[2], box[1]],
@@ -80,7 +90,7 @@ class Button:
         )
 
         pg.draw.polygon(
-            self.surface,
+            image,
             tone_change(self.color, -30),
             ([box[0], box[1]],
              [box[0], box[1] + box[3]],
@@ -95,16 +105,33 @@ class Button:
         )
 
         pg.draw.rect(
-            self.surface,
+            image,
             self.color,
             smaller_box
         )
 
-        self.surface.blit(
-            self.font.render(self.text, True, const.COLORS["white"]),
+        image.blit(
+            textcache.render_text(self.text, self.fontsize),
             [box[0] + 0.15 * box[2],
              box[1] + 0.4 * (box[3] - self.fontsize)]
         )
+        return image
+
+    def draw(self):
+        """
+        Drawing button in the current window, it is rendered again only after its label or color changes
+        """
+        if self.image_state != (self.text, self.color):
+            self.image = self.render()
+            self.image_state = (self.text, self.color)
+
+        self.surface.blit(self.image, self.draw_box[:2])
+
+    def draw_state(self):
+        """
+        :return: tuple(string, tuple(int, int, int)) - label and color of button, compared between frames
+        """
+        return self.text, self.color
 
     def hover(self, event):
         """
@@ -119,34 +146,39 @@ class Button:
 
 
 class SimplifiedButton(Button):
-    def draw(self):
+    def render(self):
         """
-        Drawing button in the current window
+        Rendering button into its own image
+        :return: Pygame Surface object - image of button
         """
+        box = (0, 0, self.draw_box[2], self.draw_box[3])
+        image = pg.Surface((math.ceil(box[2]), math.ceil(box[3])), pg.SRCALPHA)
+
         pg.draw.rect(
-            self.surface,
+            image,
             tone_change(self.color, 70),
-            self.draw_box
+            box
         )
 
         smaller_box = (
-            self.draw_box[0] + 4,
-            self.draw_box[1] + 4,
-            self.draw_box[2] - 4,
-            self.draw_box[3] - 8
+            box[0] + 4,
+            box[1] + 4,
+            box[2] - 4,
+            box[3] - 8
         )
 
         pg.draw.rect(
-            self.surface,
+            image,
             self.color,
             smaller_box
         )
 
-        self.surface.blit(
-            self.font.render(self.text, True, const.COLORS["white"]),
-            [self.draw_box[0] + 0.05 * self.draw_box[2],
-             self.draw_box[1] + 0.4 * (self.draw_box[3] - self.fontsize)]
+        image.blit(
+            textcache.render_text(self.text, self.fontsize),
+            [box[0] + 0.05 * box[2],
+             box[1] + 0.4 * (box[3] - self.fontsize)]
         )
+        return image
 
 
 class Frame:
@@ -165,6 +197,12 @@ class Frame:
         self.draw_box = draw_box
         self.colors = colors
 
+    def draw_state(self):
+        """
+        :return: None - look of frame never changes
+        """
+        return None
+
     def draw(self):
         """
         Drawing button in the current window
@@ -189,6 +227,97 @@ class Frame:
         )
 
 
+class ProgressBar(Frame):
+    """
+    Frame filled in proportion to the done part of a long operation, with a caption
+    """
+
+    def __init__(self, surface, draw_box, colors, fontsize):
+        """
+        Constructor of progress bar
+        :param surface: Pygame Surface object - target window
+        :param draw_box: Pygame Rect object - position and size
+        :param colors: list[tuple(int, int, int)x3] - colors of frame, of its background and of the filled part in RGB
+        :param fontsize: int - font height in pixels
+        """
+        super().__init__(surface, draw_box, colors)
+        self.fontsize = fontsize
+        self.fraction = 0.0
+        self.text = ""
+
+    def draw_state(self):
+        """
+        :return: tuple(string, float) - caption and filled part of progress bar, compared between frames
+        """
+        return self.text, self.fraction
+
+    def draw(self):
+        """
+        Drawing progress bar in the current window
+        """
+        super().draw()
+
+        pg.draw.rect(
+            self.surface,
+            self.colors[2],
+            (self.draw_box[0] + 4,
+             self.draw_box[1] + 4,
+             (self.draw_box[2] - 8) * self.fraction,
+             self.draw_box[3] - 8)
+        )
+
+        self.surface.blit(
+            textcache.render_text(self.text, self.fontsize),
+            [self.draw_box[0] + 0.05 * self.draw_box[2],
+             self.draw_box[1] + 0.4 * (self.draw_box[3] - self.fontsize)]
+        )
+
+
+class Notice(Frame):
+    """
+    Frame with one line of text reporting an event of the game
+    """
+
+    def __init__(self, surface, draw_box, colors, fontsize):
+        """
+        Constructor of notice
+        :param surface: Pygame Surface object - target window
+        :param draw_box: Pygame Rect object - position and size
+        :param colors: list[tuple(int, int, int)x2] - colors of frame in RGB
+        :param fontsize: int - font height in pixels
+        """
+        super().__init__(surface, draw_box, colors)
+        self.fontsize = fontsize
+        self.text = ""
+
+    def draw_state(self):
+        """
+        :return: string - text of notice, compared between frames
+        """
+        return self.text
+
+    def draw(self):
+        """
+        Drawing notice in the current window
+        """
+        super().draw()
+
+        if self.text:
+            self.surface.blit(
+                textcache.render_text(self.text, self.fontsize),
+                [self.draw_box[0] + 8, self.draw_box[1] + 0.5 * (self.draw_box[3] - self.fontsize)]
+            )
+
+
+LOADING_STAGES = {
+    "noise": "Генерация рельефа",
+    "classification": "Разметка ландшафта",
+    "cliffs": "Скалы",
+    "objects": "Расстановка объектов",
+    "nav_grid": "Сетка путей"
+}
+
+
 class Menu:
     """
     Main menu with a selection of basic options
@@ -241,10 +370,12 @@ class Menu:
                 const.COLORS["cream"]
             )
         ]
+        self.dirty_rects = dirtyrects.DirtyRects(self.size)
         self.menu_mod = "main_menu"
         self.is_background_drawn = False
         self.is_in_need_of_update = False
         self.is_active = True
+        self.is_load_requested = False
         self.is_finished = False
 
     def activate(self):
@@ -253,13 +384,18 @@ class Menu:
         """
         for event in pg.event.get():
             if event.type == pg.KEYDOWN:
-                if event.key == pg.K_ESCAPE:
+                if event.key == pg.K_ESCAPE and self.menu_mod == "loading":
+                    self.cancel_loading()
+                elif event.key == pg.K_ESCAPE:
                     self.is_finished = True
 
             elif event.type == pg.MOUSEMOTION:
                 for button in self.buttons:
                     button.hover(event)
 
+            elif event.type == pg.WINDOWEXPOSED:
+                self.dirty_rects.invalidate()
+
             elif event.type == pg.MOUSEBUTTONDOWN:
                 for button in self.buttons:
                     if is_hovered(event, button.draw_box):
@@ -267,13 +403,58 @@ class Menu:
                             self.is_active = False
                             return False
                         elif button.key == "main_menu_download_game":
-                            self.is_active = False
-                            return True
+                            if os.path.exists(const.SAVE_PATH):
+                                self.is_active = False
+                                self.is_load_requested = True
+                                return False
                         elif button.key == "main_menu_exit":
                             self.is_finished = True
                         elif button.key == "download_menu_back":
                             self.menu_mod = "main_menu"
                             self.is_in_need_of_update = True
+                        elif button.key == "loading_menu_cancel":
+                            self.cancel_loading()
+
+    def show(self):
+        """
+        Returning to the menu from the game, the whole screen is drawn again
+        """
+        self.is_active = True
+        self.dirty_rects.invalidate()
+
+    def start_loading(self):
+        """
+        Showing the progress of world creation instead of the main menu
+        """
+        self.show()
+        self.menu_mod = "loading"
+        self.is_in_need_of_update = True
+
+    def show_progress(self, stage, fraction):
+        """
+        Updating the shown progress of world creation
+        :param stage: string - current stage of creation, key of LOADING_STAGES
+        :param fraction: float - part of the whole creation that is done, from 0 to 1
+        """
+        for frame in self.frames:
+            if isinstance(frame, ProgressBar):
+                frame.text = LOADING_STAGES[stage]
+                frame.fraction = fraction
+
+    def cancel_loading(self):
+        """
+        Returning to the main menu from the loading, the loader notices it by the mod of the menu
+        """
+        self.menu_mod = "main_menu"
+        self.is_in_need_of_update = True
+
+    def finish_loading(self):
+        """
+        Hiding the menu when the world is created
+        """
+        self.is_active = False
+        self.menu_mod = "main_menu"
+        self.is_in_need_of_update = True
 
     def update_menu(self):
         """
@@ -320,6 +501,33 @@ class Menu:
                 ]
                 self.is_in_need_of_update = False
 
+            elif self.menu_mod == "loading":
+                self.frames = [
+                    ProgressBar(
+                        self.surface,
+                        (0.1 * self.size[0],
+                         0.15 * self.size[1],
+                         0.4 * self.size[0],
+                         0.05 * self.size[1]),
+                        [const.COLORS["light_blue"], const.COLORS["dark_blue"], const.COLORS["cream"]],
+                        int(0.02 * self.size[1])
+                    )
+                ]
+                self.buttons = [
+                    Button(
+                        self.surface,
+                        (0.1 * self.size[0],
+                         0.25 * self.size[1],
+                         0.2 * self.size[0],
+                         0.05 * self.size[1]),
+                        "Отмена",
+                        "loading_menu_cancel",
+                        int(0.02 * self.size[1]),
+                        const.COLORS["cream"]
+                    )
+                ]
+                self.is_in_need_of_update = False
+
     def draw_background(self):
         """
         Drawing a high resolution picture on the background
@@ -339,9 +547,12 @@ class Menu:
 
     def update_display(self):
         """
-        Updating display to reflect changes of objects
+        Updating the parts of display where the menu elements changed
         """
-        pg.display.update()
+        for element in self.frames + self.buttons:
+            self.dirty_rects.track(id(element), pg.Rect(element.draw_box).inflate(2, 2), element.draw_state())
+        self.dirty_rects.collect()
+        self.dirty_rects.update()
         self.clock.tick(const.FPS)
 
 
@@ -350,81 +561,41 @@ class InGameInterface:
     The interface that the player sees during gameplay
     """
 
-    def __init__(self, surface):
+    def __init__(self, surface, size=None):
         """
-        Constructor of in-game interface
-        :param surface: Pygame Surface object - target surface
+        Constructor of in-game interface, every panel is built once and later only shown or hidden
+        :param surface: Pygame Surface object - target surface, None in headless mode
+        :param size: tuple(int, int) - size of the screen in pixels, by default the size of surface
         """
         self.surface = surface
         self.clock = pg.time.Clock()
-        self.size = surface.get_size()
-        self.frames = [
-            Frame(
-                self.surface,
-                (0,
-                 self.size[1] - const.TILE_SIZE * const.INTERFACE_AMENDMENT,
-                 self.size[0],
-                 const.TILE_SIZE * const.INTERFACE_AMENDMENT),
-                [const.COLORS["light_blue"], const.COLORS["dark_blue"]]
-            )
-        ]
-        self.buttons = [
-            SimplifiedButton(
-                surface,
-                (self.size[0] - 0.15 * self.size[0],
-                 self.size[1] - const.TILE_SIZE * const.INTERFACE_AMENDMENT,
-                 0.15 * self.size[0] + 1,
-                 const.TILE_SIZE * const.INTERFACE_AMENDMENT),
-                "Меню",
-                "in-game_interface_menu",
-                int(0.03 * self.size[1]),
-                const.COLORS["dark_blue"]
-            )
-        ]
-        self.interface_mod = "default"
-        self.is_finished = False
-
-    def draw(self):
-        """
-        Drawing all functional elements of in-game interface
-        """
-        for frame in self.frames:
-            frame.draw()
-        for button in self.buttons:
-            button.draw()
-
-    def activate(self, event):
-        """
-        Processing hover on the menu buttons
-        """
-        if event.type == pg.MOUSEMOTION:
-            for button in self.buttons:
-                button.hover(event)
-
-    def update_interface(self, mod):
-        """
-        Updating the interface state according to the required mode
-        :param mod: string - desired interface mode
-        """
-        self.interface_mod = mod
+        self.size = surface.get_size() if surface is not None else size
+        self.canvas = None  # elements are drawn here
+        self.layer = None  # run-length encoded copy of the canvas, it is blitted to the screen at once
+        if surface is not None:
+            self.canvas = pg.Surface(self.size)
+        self.notice = Notice(
+            self.canvas,
+            (0.55 * self.size[0],
+             self.size[1] - const.TILE_SIZE * const.INTERFACE_AMENDMENT + 4,
+             0.3 * self.size[0] - 4,
+             const.TILE_SIZE * const.INTERFACE_AMENDMENT - 8),
+            [const.COLORS["dark_blue"], const.COLORS["dark_blue"]],
+            int(0.02 * self.size[1])
+        )
 
-        if self.interface_mod == "default" or self.interface_mod == "tree" or self.interface_mod == "bush" or \
-                self.interface_mod == "cliff" or self.interface_mod == "deer":
-            self.frames.clear()
-            self.buttons.clear()
-            self.frames = [
-                Frame(
-                    self.surface,
+        self.panels = {
+            "default": (
+                [Frame(
+                    self.canvas,
                     (0,
                      self.size[1] - const.TILE_SIZE * const.INTERFACE_AMENDMENT,
                      self.size[0],
                      const.TILE_SIZE * const.INTERFACE_AMENDMENT),
                     [const.COLORS["light_blue"], const.COLORS["dark_blue"]]
-                )
-            ]
-            self.buttons = [
-                SimplifiedButton(
-                    self.surface,
+                ), self.notice],
+                [SimplifiedButton(
+                    self.canvas,
                     (0.85 * self.size[0],
                      self.size[1] - const.TILE_SIZE * const.INTERFACE_AMENDMENT,
                      0.15 * self.size[0] + 1,
@@ -433,23 +604,19 @@ class InGameInterface:
                     "interface_menu",
                     int(0.03 * self.size[1]),
                     const.COLORS["dark_blue"]
-                )
-            ]
-
-        elif self.interface_mod == "menu":
-            self.frames.append(
-                Frame(
-                    self.surface,
+                )]
+            ),
+            "menu": (
+                [Frame(
+                    self.canvas,
                     (0.85 * self.size[0],
                      0.5 * self.size[1],
                      0.15 * self.size[0] - 10,
                      0.5 * self.size[1] - const.TILE_SIZE * const.INTERFACE_AMENDMENT - 10),
                     [const.COLORS["light_blue"], const.COLORS["dark_blue"]]
-                )
-            )
-            self.buttons.append(
-                Button(
-                    self.surface,
+                )],
+                [Button(
+                    self.canvas,
                     (0.86 * self.size[0],
                      0.52 * self.size[1],
                      0.13 * self.size[0] - 10,
@@ -458,13 +625,12 @@ class InGameInterface:
                     "interface_main_menu",
                     int(0.02 * self.size[1]),
                     const.COLORS["cream"]
-                )
-            )
-
-        elif self.interface_mod == "settler":
-            self.buttons.append(
-                Button(
-                    self.surface,
+                )]
+            ),
+            "settler": (
+                [],
+                [Button(
+                    self.canvas,
                     (0.01 * self.size[0],
                      self.size[1] - const.TILE_SIZE * const.INTERFACE_AMENDMENT + 0.01 * self.size[0],
                      0.10 * self.size[0],
@@ -473,5 +639,115 @@ class InGameInterface:
                     "interface_go_to",
                     int(0.02 * self.size[1]),
                     const.COLORS["cream"]
-                )
+                )]
             )
+        }
+        self.shown_panels = []
+        self.frames = []
+        self.buttons = []
+        self.layer_box = None  # part of the layer covered by the shown elements
+        self.is_dirty = True  # the layer has to be drawn again, set on hover, mode change or data change
+        self.show_panels(["default"])
+
+        self.interface_mod = "default"
+        self.profiler_font = None
+        self.profiler_overlay = None
+        self.is_finished = False
+
+    def show_panels(self, panels):
+        """
+        Changing the shown panels, the elements of the retained panels are reused
+        :param panels: list[string,...] - names of panels in the drawing order, keys of self.panels
+        """
+        self.shown_panels = panels
+        self.frames = [frame for panel in panels for frame in self.panels[panel][0]]
+        self.buttons = [button for panel in panels for button in self.panels[panel][1]]
+        for button in self.buttons:
+            button.color = button.original_color
+        self.layer_box = pg.Rect(self.frames[0].draw_box).unionall([element.draw_box
+                                                                   for element in self.frames + self.buttons])
+        self.layer_box = self.layer_box.clip((0, 0) + tuple(self.size))
+        self.is_dirty = True
+
+    def show_notice(self, text):
+        """
+        Showing a line of text on the bottom panel until the next notice
+        :param text: string - text of notice
+        """
+        self.notice.text = text
+        self.is_dirty = True
+
+    def draw(self):
+        """
+        Drawing the in-game interface, the layer is drawn again only if it is dirty and then blitted at once
+        """
+        if self.is_dirty:
+            self.canvas.fill(UI_COLORKEY)
+            for frame in self.frames:
+                frame.draw()
+            for button in self.buttons:
+                button.draw()
+            # drawing on a run-length encoded surface decodes it on every call, so only the copy is encoded
+            self.layer = self.canvas.subsurface(self.layer_box).copy()
+            self.layer.set_colorkey(UI_COLORKEY, pg.RLEACCEL)
+            self.is_dirty = False
+
+        self.surface.blit(self.layer, self.layer_box)
+
+    def draw_profiler(self, profiler):
+        """
+        Drawing the overlay with timings of the main loop phases and the report of the last capture,
+        the text is updated 4 times per second
+        :param profiler: FrameProfiler object - profiler of the game
+        """
+        if profiler.frame % (const.FPS // 4) == 0 or self.profiler_overlay is None:
+            if self.profiler_font is None:
+                self.profiler_font = textcache.get_font(14)
+
+            lines = [(self.profiler_font.render(phase, True, const.COLORS["white"]),
+                      self.profiler_font.render("mean {:6.2f} ms   p95 {:6.2f} ms".format(stats["mean"], stats["p95"]),
+                                                True, const.COLORS["white"]))
+                     for phase, stats in profiler.summary().items()]
+            messages = [self.profiler_font.render(message, True, const.COLORS["white"])
+                        for message in profiler.messages]
+            if not lines and not messages:
+                return
+
+            name_width = max((name.get_width() for name, _ in lines), default=0) + 20
+            line_height = self.profiler_font.get_linesize()
+            self.profiler_overlay = pg.Surface((max([name_width + values.get_width() for _, values in lines] +
+                                                    [message.get_width() + 10 for message in messages]) + 10,
+                                                line_height * (len(lines) + len(messages)) + 20), pg.SRCALPHA)
+            self.profiler_overlay.fill(const.COLORS["dark_blue"] + (180,))
+            for number, (name, values) in enumerate(lines):
+                self.profiler_overlay.blit(name, (10, 10 + number * line_height))
+                self.profiler_overlay.blit(values, (name_width, 10 + number * line_height))
+            for number, message in enumerate(messages, len(lines)):
+                self.profiler_overlay.blit(message, (10, 10 + number * line_height))
+
+        self.surface.blit(self.profiler_overlay, (10, 10))
+
+    def activate(self, event):
+        """
+        Processing hover on the menu buttons, the layer becomes dirty if any button changed its color
+        """
+        if event.type == pg.MOUSEMOTION:
+            for button in self.buttons:
+                color = button.color
+                button.hover(event)
+                if button.color != color:
+                    self.is_dirty = True
+
+    def update_interface(self, mod):
+        """
+        Updating the interface state according to the required mode
+        :param mod: string - desired interface mode
+        """
+        self.interface_mod = mod
+
+        if self.interface_mod == "default" or self.interface_mod == "tree" or self.interface_mod == "bush" or \
+                self.interface_mod == "cliff" or self.interface_mod == "deer":
+            self.show_panels(["default"])
+
+        elif self.interface_mod in ("menu", "settler") and self.interface_mod not in self.shown_panels:
+            self.show_panels(self.shown_panels + [self.interface_mod])
@@ -0,0 +1,80 @@
+import threading
+
+STAGES = ("noise", "classification", "cliffs", "objects", "nav_grid")  # stages of world creation in their order
+
+
+class LoadingCancelled(Exception):
+    """
+    Raised inside the worker at the next progress report after the loading is cancelled
+    """
+
+
+class WorldLoader:
+    """
+    Creation of the game world in a background thread with staged progress, the window stays responsive meanwhile
+    """
+
+    def __init__(self, create):
+        """
+        Constructor of loader, the worker is started at once
+        :param create: callable - function that takes the progress callback and returns the created game
+        """
+        self.create = create
+        self.stage = STAGES[0]
+        self.fraction = 0.0  # part of the current stage that is done
+        self.game = None
+        self.error = None
+        self.is_cancelled = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def report(self, stage, fraction):
+        """
+        Publishing the progress, called by the worker; it is also the point where a cancelled loading stops
+        :param stage: string - current stage, one of STAGES
+        :param fraction: float - part of the stage that is done, from 0 to 1
+        """
+        if self.is_cancelled:
+            raise LoadingCancelled()
+        self.stage = stage
+        self.fraction = fraction
+
+    def _run(self):
+        """
+        Creating the game, runs in the worker thread
+        """
+        try:
+            self.game = self.create(self.report)
+        except LoadingCancelled:
+            pass
+        except Exception as error:
+            self.error = error
+
+    def progress(self):
+        """
+        :return: float - part of the whole creation that is done, from 0 to 1
+        """
+        return (STAGES.index(self.stage) + self.fraction) / len(STAGES)
+
+    def cancel(self):
+        """
+        Aborting the creation, the worker stops at its next progress report
+        """
+        self.is_cancelled = True
+
+    def is_finished(self):
+        """
+        :return: bool - has the worker finished
+        """
+        return not self.thread.is_alive()
+
+    def result(self):
+        """
+        Taking the created game, an error of the worker is raised here in the main thread
+        :return: Gameplay object - created game
+        """
+        if self.error is not None:
+            raise self.error
+        if self.game is None:
+            raise RuntimeError("the world loader finished without creating a game")
+        return self.game
@@ -1,41 +1,167 @@
+import startup as startup  # must stay the first import, it takes the startup time
+
+import argparse
+import functools
+import importlib
+import threading
+import time
+
 import pygame as pg
 
-import gameplay as gameplay
+import constants as const
 import interface as interface
+import loader as loader
+import map_objects as objects
+import metrics as metrics
+import replay as replay
+import seeding as seeding
+import timestep as timestep
+
+parser = argparse.ArgumentParser(description="FrontierWorld")
+parser.add_argument("--seed", type=seeding.parse_seed, default=None, help="seed of the world, random by default")
+parser.add_argument("--record", default=None, help="file to record the player input into")
+parser.add_argument("--replay", default=None, help="file with the recorded player input to replay")
+parser.add_argument("--metrics", default=None, help="JSON-lines file for periodic snapshots of metrics")
+parser.add_argument("--measure-startup", action="store_true",
+                    help="report the time to the first frame of the menu and of every new game")
+args = parser.parse_args()
+
+if args.metrics is not None:
+    metrics.registry.configure(args.metrics, const.METRICS_INTERVAL)
 
 pg.init()
 
 screen = pg.display.set_mode((pg.display.Info().current_w, pg.display.Info().current_h))
 
+
+def import_world_modules():
+    """
+    Importing the modules of the game world, numpy is the heaviest of them
+    It is done in the background while the menu is shown, so the menu does not wait for them
+    """
+    importlib.import_module("gameplay")
+    importlib.import_module("savegame")
+
+
+def report_time(event, start_time):
+    """
+    Printing the time passed since the start of an event if startup is measured
+    :param event: string - description of the event
+    :param start_time: float - time of the start in seconds of time.perf_counter
+    """
+    if args.measure_startup:
+        print("{}: {:.1f} ms".format(event, (time.perf_counter() - start_time) * 1000))
+
+
+def open_replay():
+    """
+    Reading the replay requested in command line, it is checked in the main thread before the world is created
+    :return: InputReplayer object - recorded input, None if no replay is requested
+    """
+    if args.replay is None:
+        return None
+    replayer = replay.InputReplayer(args.replay)
+    if replayer.size != screen.get_size():
+        parser.error("the replay was recorded on a screen of size {}x{}".format(*replayer.size))
+    return replayer
+
+
+def create_game(progress, replayer=None):
+    """
+    Loading the saved game if it is requested in the menu,
+    otherwise creating a new game with the seed, record and replay requested in command line
+    Runs in the worker of the loader
+    :param progress: callable - function taking the stage of creation and its done part
+    :param replayer: InputReplayer object - recorded input for a new game, None to play without replay
+    :return: Gameplay object - new game
+    """
+    gameplay = importlib.import_module("gameplay")
+
+    if menu.is_load_requested:
+        menu.is_load_requested = False
+        new_game = gameplay.Gameplay(screen, menu, save_path=const.SAVE_PATH, progress=progress)
+        new_game.autosave = autosave
+        return new_game
+
+    if replayer is not None:
+        new_game = gameplay.Gameplay(screen, menu, seed=replayer.seed, progress=progress)
+        new_game.replayer = replayer
+    else:
+        new_game = gameplay.Gameplay(screen, menu, seed=args.seed, progress=progress)
+
+    if args.record is not None:
+        new_game.recorder = replay.InputRecorder(args.record, new_game.world_seed.seed, screen.get_size())
+
+    new_game.autosave = autosave
+    return new_game
+
+
 menu = interface.Menu(screen)
-game = gameplay.Gameplay(screen, menu)
+objects.start_preloading()
+threading.Thread(target=import_world_modules, daemon=True).start()
+autosave = None
+game = None  # the world is created only when the player starts or loads a game
+world_loader = None
+clock = timestep.FixedTimestep(const.TICK_RATE, const.FPS)
 is_finished = False
-game_preset = "new_game"
 is_game_ready = False
+is_menu_shown = False
+game_request_time = None
 
 while not is_finished:
     if menu.is_active:
         is_game_ready = menu.activate()
+        if world_loader is not None:
+            if menu.menu_mod != "loading":
+                world_loader.cancel()
+                world_loader = None
+            elif world_loader.is_finished():
+                game = world_loader.result()
+                metrics.registry.gauge("gameplay.objects", game.count_objects)  # replaces the gauge of the old game
+                world_loader = None
+                menu.finish_loading()
+                is_game_ready = True
+                clock.reset()
+                continue
+            else:
+                menu.show_progress(world_loader.stage, world_loader.progress())
         menu.update_menu()
         menu.draw_background()
         menu.draw()
         menu.update_display()
+        if not is_menu_shown:
+            report_time("Time to the first frame of the menu", startup.STARTUP_TIME)
+            is_menu_shown = True
         is_finished = menu.is_finished
+        clock.reset()
 
     else:
         if not is_game_ready:
-            game = gameplay.Gameplay(screen, menu)
-            is_game_ready = True
-        game.process_input()
-        game.update_interface()
-        game.draw_map()
-        game.draw_objects()
-        game.draw_interface()
-        game.create_new_animal()
-        game.ai_acts()
-        game.do_tasks()
-        game.move_creatures()
-        game.update_display()
+            game_request_time = time.perf_counter()
+            if game is not None and game.recorder is not None:
+                game.recorder.close()
+            if autosave is None and const.AUTOSAVE_INTERVAL > 0:
+                autosave = importlib.import_module("savegame").Autosave(const.AUTOSAVE_INTERVAL, const.AUTOSAVE_SLOTS)
+            game_replayer = None if menu.is_load_requested else open_replay()
+            world_loader = loader.WorldLoader(functools.partial(create_game, replayer=game_replayer))
+            menu.start_loading()
+            continue
+        game.profiler.call("process_input", game.process_input)
+        game.profiler.call("update_interface", game.update_interface)
+        if clock.run(game.simulate, game.game_speed):
+            game.profiler.call("draw_map", game.draw_map, clock.alpha)
+            game.profiler.call("draw_objects", game.draw_objects, clock.alpha)
+            game.profiler.call("draw_interface", game.draw_interface)
+            game.profiler.call("update_display", game.update_display)
+            if game_request_time is not None:
+                report_time("Time to the first frame of the game", game_request_time)
+                game_request_time = None
+        game.profiler.end_frame()
         is_finished = game.is_finished
 
+if game is not None and game.recorder is not None:
+    game.recorder.close()
+if autosave is not None:
+    autosave.finish()
+
 pg.quit()
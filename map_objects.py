@@ -1,8 +1,66 @@
+import contextlib
+import os
 import random as rnd
+import threading
 
 import pygame as pg
 
 import constants as const
+import metrics as metrics
+import textcache as textcache
+
+is_headless = False  # in headless mode textures are never loaded, objects are not drawn, see headless_mode
+TEXTURE_LOADS = metrics.registry.counter("map_objects.texture_loads")
+TEXTURES_DIRECTORY = "assets/textures"
+RESOURCES_FONTSIZE = 12  # font height of the quantity drawn on resource stacks
+images = {}  # loaded images by file name, shared by the whole game
+images_lock = threading.Lock()  # images are loaded both by the preloading thread and by the main thread
+textures = {}  # scaled textures by file name and size, shared by every object
+
+
+def load_image(file):
+    """
+    Getting an image from the shared cache, it is loaded on the first use
+    :param file: string - name of the file in the directory of textures
+    :return: Pygame Surface object - image in its original size
+    """
+    with images_lock:
+        if file not in images:
+            images[file] = pg.image.load(os.path.join(TEXTURES_DIRECTORY, file))
+        return images[file]
+
+
+def preload_images():
+    """
+    Loading every image of the directory of textures into the shared cache
+    """
+    for file in sorted(os.listdir(TEXTURES_DIRECTORY)):
+        if file.endswith(".png"):
+            load_image(file)
+
+
+def start_preloading():
+    """
+    Loading images in a background thread, e.g. while the menu is shown
+    :return: Thread object - started thread
+    """
+    thread = threading.Thread(target=preload_images, daemon=True)
+    thread.start()
+    return thread
+
+
+@contextlib.contextmanager
+def headless_mode():
+    """
+    Creating objects without textures inside the block, the previous mode is restored when the block is left
+    """
+    global is_headless
+    was_headless = is_headless
+    is_headless = True
+    try:
+        yield
+    finally:
+        is_headless = was_headless
 
 
 def create_draw_box(coord, draw_features, orientation):
@@ -24,11 +82,18 @@ def create_texture(draw_features, orientation):
     Creating texture according to draw features of object
     :param draw_features:additional size that extend the image of the object beyond the limits of the tile
     :param orientation: string - orientation of object
-    :return: Pygame Surface object - image of map object
+    :return: Pygame Surface object - image of map object shared with other objects, None in headless mode
     """
-    return pg.transform.scale(pg.image.load("assets/textures/{}".format(draw_features[orientation][2])),
-                              ((1 + 2 * draw_features[orientation][0]) * const.TILE_SIZE,
-                               (1 + draw_features[orientation][1]) * const.TILE_SIZE))
+    if is_headless:
+        return None
+
+    key = (draw_features[orientation][2],
+           int((1 + 2 * draw_features[orientation][0]) * const.TILE_SIZE),
+           int((1 + draw_features[orientation][1]) * const.TILE_SIZE))
+    if key not in textures:
+        TEXTURE_LOADS.value += 1
+        textures[key] = pg.transform.scale(load_image(key[0]), key[1:])
+    return textures[key]
 
 
 def is_picked(event, coord):
@@ -46,35 +111,57 @@ def is_picked(event, coord):
 class MapObject:
     """
     Any changeable map object
+    Objects keep their attributes in slots, everything that is the same for the whole class is a class attribute
     """
 
-    def __init__(self, surface, coord):
+    __slots__ = ("surface", "coord", "draw_box", "texture")
+
+    draw_layer = 1  # objects of a lower layer are drawn first, inside a layer they are sorted by the bottom of box
+    draw_features = {
+        "default": [0.0, 0.0, "def_object.png"]
+    }
+    type = "def_object"
+
+    def __init__(self, surface, coord, orientation="default"):
         """
         Universal basic constructor of map object
         :param surface: Pygame Surface object - target window
         :param coord: list[float, float] - coordinates of object
+        :param orientation: string - key of the draw features the object starts with
         """
         self.surface = surface
         self.coord = coord
-        self.draw_features = {
-            "default": [0.0, 0.0, "def_object.png"]
-        }
-        self.draw_box = create_draw_box(self.coord, self.draw_features, "default")
-        self.texture = create_texture(self.draw_features, "default")
-        self.type = "def_object"
+        self.draw_box = create_draw_box(self.coord, self.draw_features, orientation)
+        self.texture = create_texture(self.draw_features, orientation)
 
-    def draw(self):
+    def screen_box(self, alpha=1.0):
         """
-        Drawing object in the current window
+        :param alpha: float - part of the tick passed since the last simulation step, used by moving objects
+        :return: Pygame Rect object - part of the screen covered by the drawn object
         """
-        self.surface.blit(self.texture, self.draw_box)
+        return pg.Rect(self.draw_box)
 
-    def safe(self, file):
+    def draw_state(self, alpha=1.0):
         """
-        Writing information about an object to a save file
-        :param file: TextIO object - Output stream to an external save file
+        :param alpha: float - part of the tick passed since the last simulation step, used by moving objects
+        :return: everything besides the screen box that changes the look of the object, compared between frames
         """
-        file.write("type: " + self.type + ", coord: " + self.coord + " ")
+        return self.texture
+
+    def sprites(self, alpha=1.0):
+        """
+        :param alpha: float - part of the tick passed since the last simulation step, used by moving objects
+        :return: list[tuple(Pygame Surface object, Pygame Rect object),...] - images of the object and their places,
+                 ready for Surface.blits
+        """
+        return [(self.texture, self.draw_box)]
+
+    def draw(self, alpha=1.0):
+        """
+        Drawing object in the current window
+        :param alpha: float - part of the tick passed since the last simulation step, used by moving objects
+        """
+        self.surface.blits(self.sprites(alpha), doreturn=False)
 
 
 class SolidObject(MapObject):
@@ -82,21 +169,25 @@ class SolidObject(MapObject):
     Material object with limited hit points
     """
 
-    def __init__(self, surface, coord, hit_points=10.0):
+    __slots__ = ("hit_points", "is_chosen")
+
+    full_hit_points = 10.0
+    type = "def_solid_object"
+
+    def __init__(self, surface, coord, hit_points=10.0, orientation="default"):
         """
         Universal constructor of solid object
         :param surface: Pygame Surface object - target window
         :param coord: list[float, float] - coordinates of object
-        :param hit_points: int - current object hit points
+        :param hit_points: int - current object hit points, no more than the full hit points of the class
+        :param orientation: string - key of the draw features the object starts with
         """
-        super().__init__(surface, coord)
-        self.full_hit_points = 10.0
+        super().__init__(surface, coord, orientation)
         if hit_points > self.full_hit_points:
             self.hit_points = self.full_hit_points
         else:
             self.hit_points = hit_points
         self.is_chosen = False
-        self.type = "def_solid_object"
 
     def choose(self, event):
         """
@@ -107,24 +198,6 @@ class SolidObject(MapObject):
         self.is_chosen = is_picked(event, self.coord)
         return self.is_chosen
 
-    def draw_frame(self):
-        """
-        Drawing frame around the chosen object
-        """
-        tile_box = (self.coord[0] * const.TILE_SIZE,
-                    self.coord[1] * const.TILE_SIZE,
-                    const.TILE_SIZE,
-                    const.TILE_SIZE)
-        pg.draw.rect(self.surface, const.COLORS["white"], tile_box, 3)
-
-    def safe(self, file):
-        """
-        Writing information about an object to a save file
-        :param file: TextIO object - Output stream to an external save file
-        """
-        super().safe(file)
-        file.write("hit_points: " + str(self.hit_points) + " ")
-
     def take_damage(self, damage):
         """
         Taking damage by creature
@@ -139,6 +212,10 @@ class NatureObject(SolidObject):
     Solid object of flora or inanimate nature, impassable
     """
 
+    __slots__ = ("res_type", "res_quantity")
+
+    type = "def_nature_object"
+
     def __init__(self, surface, coord, hit_points=10.0):
         """
         Universal constructor of nature object
@@ -149,7 +226,6 @@ class NatureObject(SolidObject):
         super().__init__(surface, coord, hit_points)
         self.res_type = None
         self.res_quantity = 0
-        self.type = "def_nature_object"
 
     def destroy(self):
         """
@@ -164,6 +240,14 @@ class Cliff(NatureObject):
     Part of the rock that rises above the map
     """
 
+    __slots__ = ()
+
+    draw_features = {
+        "default": [0.0, 0.0, "cliff.png"]
+    }
+    full_hit_points = 30.0
+    type = "cliff"
+
     def __init__(self, surface, coord, hit_points=30.0):
         """
         Constructor of cliff
@@ -172,19 +256,8 @@ class Cliff(NatureObject):
         :param hit_points: int - current object hit points
         """
         super().__init__(surface, coord, hit_points)
-        self.draw_features = {
-            "default": [0.0, 0.0, "cliff.png"]
-        }
-        self.draw_box = create_draw_box(self.coord, self.draw_features, "default")
-        self.texture = create_texture(self.draw_features, "default")
-        self.full_hit_points = 30.0
-        if hit_points > self.full_hit_points:
-            self.hit_points = self.full_hit_points
-        else:
-            self.hit_points = hit_points
         self.res_type = "stone"
         self.res_quantity = 30
-        self.type = "cliff"
 
 
 class Plant(NatureObject):
@@ -192,6 +265,10 @@ class Plant(NatureObject):
     Representative of the local flora
     """
 
+    __slots__ = ()
+
+    type = "def_plant"
+
     def __init__(self, surface, coord, hit_points=10.0):
         """
         Universal constructor of plant
@@ -201,7 +278,6 @@ class Plant(NatureObject):
         """
         super().__init__(surface, coord, hit_points)
         self.res_type = "wood"
-        self.type = "def_plant"
 
 
 class Tree(Plant):
@@ -209,6 +285,14 @@ class Tree(Plant):
     Large plant, contains a lot of wood
     """
 
+    __slots__ = ()
+
+    draw_features = {
+        "default": [0.75, 1.5, "tree.png"]
+    }
+    full_hit_points = 20.0
+    type = "tree"
+
     def __init__(self, surface, coord, hit_points=20.0):
         """
         Constructor of tree
@@ -217,18 +301,7 @@ class Tree(Plant):
         :param hit_points: int - current object hit points
         """
         super().__init__(surface, coord, hit_points)
-        self.draw_features = {
-            "default": [0.75, 1.5, "tree.png"]
-        }
-        self.draw_box = create_draw_box(self.coord, self.draw_features, "default")
-        self.texture = create_texture(self.draw_features, "default")
-        self.full_hit_points = 20.0
-        if hit_points > self.full_hit_points:
-            self.hit_points = self.full_hit_points
-        else:
-            self.hit_points = hit_points
         self.res_quantity = 150
-        self.type = "tree"
 
 
 class Bush(Plant):
@@ -236,47 +309,60 @@ class Bush(Plant):
     Low-growing plant that contains berries
     """
 
-    def __init__(self, surface, coord, hit_points=10.0):
+    __slots__ = ("time_from_harvest", "ripening_tick", "is_riped")
+
+    draw_features = {
+        "default": [0.125, 0.25, "bush.png"],
+        "riped": [0.125, 0.25, "bush_riped.png"]
+    }
+    ripening_time = 3600
+    type = "bush"
+
+    def __init__(self, surface, coord, hit_points=10.0, time_from_harvest=None):
         """
         Constructor of tree
         :param surface: Pygame Surface object - target window
         :param coord: list[float, float] - coordinates of object
         :param hit_points: int - current object hit points
+        :param time_from_harvest: int - ticks passed since the last harvest, random by default
         """
         super().__init__(surface, coord, hit_points)
-        self.draw_features = {
-            "default": [0.125, 0.25, "bush.png"],
-            "riped": [0.125, 0.25, "bush_riped.png"]
-        }
-        self.draw_box = create_draw_box(self.coord, self.draw_features, "default")
-        self.texture = create_texture(self.draw_features, "default")
         self.res_quantity = 25
-        self.ripening_time = 3600
-        self.time_from_harvest = rnd.randint(0, 3600)
+        if time_from_harvest is None:
+            time_from_harvest = rnd.randint(0, self.ripening_time)
+        self.time_from_harvest = time_from_harvest
+        self.ripening_tick = None
         self.is_riped = False
-        self.type = "bush"
 
-    def harvest(self):
+    def plan_ripening(self, tick):
         """
-        Harvesting berries ripened on a bush
-        :return: Resources object - harvested berries
+        Calculating the tick when berries ripen
+        :param tick: int - current tick
+        :return: int - tick of ripening
+        """
+        self.ripening_tick = tick + self.ripening_time - self.time_from_harvest
+        return self.ripening_tick
+
+    def harvest(self, tick):
+        """
+        Harvesting berries ripened on a bush, the next ripening is planned at once
+        :param tick: int - current tick
+        :return: int - tick of the next ripening, it has to be scheduled in the world timers
         """
         self.time_from_harvest = 0
         self.is_riped = False
         self.draw_box = create_draw_box(self.coord, self.draw_features, "default")
         self.texture = create_texture(self.draw_features, "default")
-        # need to return berries
+        return self.plan_ripening(tick)  # need to return berries too
 
     def ripe(self):
         """
-        Ripening of berries through time
+        Ripening of berries, called by the world timer at the ripening tick
         """
-        if self.time_from_harvest < self.ripening_time:
-            self.time_from_harvest += 1
-        elif (self.time_from_harvest == self.ripening_time) and not self.is_riped:
-            self.is_riped = True
-            self.draw_box = create_draw_box(self.coord, self.draw_features, "riped")
-            self.texture = create_texture(self.draw_features, "riped")
+        self.time_from_harvest = self.ripening_time
+        self.is_riped = True
+        self.draw_box = create_draw_box(self.coord, self.draw_features, "riped")
+        self.texture = create_texture(self.draw_features, "riped")
 
 
 class Construction(SolidObject):
@@ -284,17 +370,21 @@ class Construction(SolidObject):
     Constructions built by player
     """
 
-    def __init__(self, surface, coord, hit_points=10.0):
+    __slots__ = ("res_type", "res_quantity")
+
+    type = "def_construction"
+
+    def __init__(self, surface, coord, hit_points=10.0, orientation="default"):
         """
         Universal constructor of construction
         :param surface: Pygame Surface object - target window
         :param coord: list[float, float] - coordinates of object
         :param hit_points: int - current object hit points
+        :param orientation: string - key of the draw features the construction starts with
         """
-        super().__init__(surface, coord, hit_points)
+        super().__init__(surface, coord, hit_points, orientation)
         self.res_type = None
         self.res_quantity = 0
-        self.type = "def_construction"
 
 
 class Wall(Construction):
@@ -302,6 +392,13 @@ class Wall(Construction):
     Basic impassable construction
     """
 
+    __slots__ = ()
+
+    draw_features = {
+        "default": [0.0, 0.0, "wall.png"]
+    }
+    type = "wall"
+
     def __init__(self, surface, coord, hit_points, res_type):
         """
         Constructor of wall
@@ -311,14 +408,8 @@ class Wall(Construction):
         :param res_type: string - type of resource the wall is made up of
         """
         super().__init__(surface, coord, hit_points)
-        self.draw_features = {
-            "default": [0.0, 0.0, "wall.png"]
-        }
-        self.draw_box = create_draw_box(self.coord, self.draw_features, "default")
-        self.texture = create_texture(self.draw_features, "default")
         self.res_type = res_type
         self.res_quantity = 20
-        self.type = "wall"
 
 
 class Door(Construction):
@@ -326,6 +417,18 @@ class Door(Construction):
     Basic passable construction
     """
 
+    __slots__ = ("draw_features", "is_opened")  # draw features depend on the walls around the door
+
+    n2s_draw_features = {
+        "closed": [0.0, 0.0, "door_n2s_closed.png"],
+        "opened": [0.0, 0.0, "door_n2s_opened.png"]
+    }
+    e2w_draw_features = {
+        "closed": [0.0, 0.0, "door_e2w_closed.png"],
+        "opened": [0.0, 0.0, "door_e2w_opened.png"]
+    }
+    type = "door"
+
     def __init__(self, surface, coord, hit_points, res_type, list_solid_object):
         """
         Constructor of door
@@ -334,33 +437,23 @@ class Door(Construction):
         :param hit_points: int - current object hit points
         :param res_type: string - type of resource the door is made up of
         """
-        super().__init__(surface, coord, hit_points)
-
         is_wall_n_or_s_ward = False  # is there a wall south or north of the door
 
         for solid_object in list_solid_object:
             if solid_object.type == "wall" or solid_object.type == "door":
-                if abs(int(solid_object.coord[1]) - int(self.coord[1])) == 1:
+                if abs(int(solid_object.coord[1]) - int(coord[1])) == 1:
                     is_wall_n_or_s_ward = True
 
         if is_wall_n_or_s_ward:
-            self.draw_features = {
-                "closed": [0.0, 0.0, "door_n2s_closed.png"],
-                "opened": [0.0, 0.0, "door_n2s_opened.png"]
-            }
+            self.draw_features = self.n2s_draw_features
 
         else:
-            self.draw_features = {
-                "closed": [0.0, 0.0, "door_e2w_closed.png"],
-                "opened": [0.0, 0.0, "door_e2w_opened.png"]
-            }
+            self.draw_features = self.e2w_draw_features
 
-        self.draw_box = create_draw_box(self.coord, self.draw_features, "closed")
-        self.texture = create_texture(self.draw_features, "closed")
+        super().__init__(surface, coord, hit_points, "closed")
         self.res_type = res_type
         self.res_quantity = 10
         self.is_opened = False
-        self.type = "door"
 
     def open(self):
         """
@@ -384,23 +477,41 @@ class Effect(MapObject):
     Intangible effect that exists for a limited time
     """
 
-    def __init__(self, surface, coord, texture, lifetime):
+    __slots__ = ("texture_file", "lifetime", "expiration_tick", "is_expired")
+
+    draw_layer = 2  # effects are drawn over the objects
+    type = "effect"
+
+    def __init__(self, surface, coord, texture_file, lifetime):
         """
         Constructor of any effect
         :param surface: Pygame Surface object - target window
         :param coord: list[float, float] - coordinates of object
+        :param texture_file: string - name of the image of effect in the directory of textures, it is saved instead
+                             of the texture
+        :param lifetime: int - lifetime of effect in ticks
         """
         super().__init__(surface, coord)
-        self.texture = texture
+        self.texture_file = texture_file
+        self.texture = create_texture({"default": [0.0, 0.0, texture_file]}, "default")
         self.lifetime = lifetime
-        self.age = 0
-        self.type = "effect"
+        self.expiration_tick = None
+        self.is_expired = False
 
-    def aging(self):
+    def plan_expiration(self, tick):
         """
-        Increasing the age of effect
+        Calculating the tick when the effect disappears
+        :param tick: int - current tick
+        :return: int - tick of expiration
         """
-        self.age += 1
+        self.expiration_tick = tick + self.lifetime
+        return self.expiration_tick
+
+    def expire(self):
+        """
+        End of the effect life, called by the world timer at the expiration tick
+        """
+        self.is_expired = True
 
 
 class Loot(MapObject):
@@ -408,15 +519,20 @@ class Loot(MapObject):
     Indestructible material object that can be taken into inventory
     """
 
-    def __init__(self, surface, coord):
+    __slots__ = ("is_chosen",)
+
+    draw_layer = 0  # loot lies on the ground under the objects
+    type = "def_loot"
+
+    def __init__(self, surface, coord, orientation="default"):
         """
         Universal constructor of loot
         :param surface: Pygame Surface object - target window
         :param coord: list[int, int] - coordinates of object
+        :param orientation: string - key of the draw features the loot starts with
         """
-        super().__init__(surface, coord)
+        super().__init__(surface, coord, orientation)
         self.is_chosen = False
-        self.type = "def_loot"
 
     def choose(self, event):
         """
@@ -427,22 +543,28 @@ class Loot(MapObject):
         self.is_chosen = is_picked(event, self.coord)
         return self.is_chosen
 
-    def draw_frame(self):
-        """
-        Drawing frame around the chosen object
-        """
-        tile_box = (self.coord[0] * const.TILE_SIZE,
-                    self.coord[1] * const.TILE_SIZE,
-                    const.TILE_SIZE,
-                    const.TILE_SIZE)
-        pg.draw.rect(self.surface, const.COLORS["white"], tile_box, 3)
-
 
 class Corpse(Loot):
     """
     Corpse that remains after the death of a living creature
     """
 
+    __slots__ = ("meat_quantity", "creation_type")
+
+    draw_features = {
+        "settler": [0.0, 0.5, "corpse_settler.png"],
+        "deer": [0.25, 0.0, "corpse_deer.png"],
+        "wolf": [0.5, 0.5, "corpse_wolf.png"],
+        "turtle": [0.0, 0.0, "corpse_turtle.png"]
+    }
+    entrails_features = {
+        "settler": 125,
+        "deer": 200,
+        "wolf": 75,
+        "turtle": 25
+    }
+    type = "corpse"
+
     def __init__(self, surface, coord, creature_type):
         """
         Constructor of corpse
@@ -450,24 +572,9 @@ class Corpse(Loot):
         :param coord: list[int, int] - coordinates of object
         :param creature_type: string - type of dead creature
         """
-        super().__init__(surface, coord)
-        self.draw_features = {
-            "settler": [0.0, 0.5, "corpse_settler.png"],
-            "deer": [0.25, 0.0, "corpse_deer.png"],
-            "wolf": [0.5, 0.5, "corpse_wolf.png"],
-            "turtle": [0.0, 0.0, "corpse_turtle.png"]
-        }
-        self.draw_box = create_draw_box(self.coord, self.draw_features, creature_type)
-        self.texture = create_texture(self.draw_features, creature_type)
-        self.entrails_features = {
-            "settler": 125,
-            "deer": 200,
-            "wolf": 75,
-            "turtle": 25
-        }
+        super().__init__(surface, coord, creature_type)
         self.meat_quantity = self.entrails_features[creature_type]
         self.creation_type = creature_type
-        self.type = "corpse"
 
 
 class Resources(Loot):
@@ -475,6 +582,17 @@ class Resources(Loot):
     Resources that remain after the destruction of a natural object or structure
     """
 
+    __slots__ = ("res_quantity", "resource_type")
+
+    draw_features = {
+        "wood": [0.0, 0.0, "resources_wood.png"],
+        "stone": [0.0, 0.0, "resources_stone.png"],
+        "berries": [0.0, 0.0, "resources_berries.png"],
+        "meet": [0.0, 0.0, "resources_meet.png"]
+    }
+    full_res_quantity = 75
+    type = "resources"
+
     def __init__(self, surface, coord, resource_type, res_quantity):
         """
         Constructor of corpse
@@ -483,23 +601,26 @@ class Resources(Loot):
         :param resource_type: string - type of dropped resource
         :param res_quantity: int - type of dropped resources
         """
-        super().__init__(surface, coord)
-        self.draw_features = {
-            "wood": [0.0, 0.0, "resources_wood.png"],
-            "stone": [0.0, 0.0, "resources_stone.png"],
-            "berries": [0.0, 0.0, "resources_berries.png"],
-            "meet": [0.0, 0.0, "resources_meet.png"]
-        }
-        self.draw_box = create_draw_box(self.coord, self.draw_features, resource_type)
-        self.texture = create_texture(self.draw_features, resource_type)
-        self.full_res_quantity = 75
+        super().__init__(surface, coord, resource_type)
         self.res_quantity = res_quantity
         self.resource_type = resource_type
-        self.type = "resources"
 
-    def draw(self):
-        super().draw()
-        # need to draw the quantity of resources in this stack
+    def sprites(self, alpha=1.0):
+        """
+        Stack with the quantity of resources in its corner, the number comes from the text cache
+        :param alpha: float - part of the tick passed since the last simulation step, used by moving objects
+        :return: list[tuple(Pygame Surface object, tuple),...] - images of the stack and their places
+        """
+        return [(self.texture, self.draw_box),
+                (textcache.render_text(str(self.res_quantity), RESOURCES_FONTSIZE),
+                 (self.coord[0] * const.TILE_SIZE + 2, self.coord[1] * const.TILE_SIZE))]
+
+    def draw_state(self, alpha=1.0):
+        """
+        :param alpha: float - part of the tick passed since the last simulation step, used by moving objects
+        :return: tuple(Pygame Surface object, int) - texture and drawn quantity of resources
+        """
+        return self.texture, self.res_quantity
 
     def take(self, res_quantity):
         """
@@ -0,0 +1,149 @@
+import bisect
+import json
+import time
+
+
+class Counter:
+    """
+    Monotonic counter, its value is increased directly, e.g. COUNTER.value += 1
+    In hot loops the amount is accumulated in a local variable and added once
+    """
+
+    __slots__ = ("name", "value")
+
+    def __init__(self, name):
+        """
+        Constructor of counter
+        :param name: string - name of the measure
+        """
+        self.name = name
+        self.value = 0
+
+
+class Histogram:
+    """
+    Distribution of values over fixed buckets
+    """
+
+    __slots__ = ("name", "bounds", "counts", "total", "count")
+
+    def __init__(self, name, bounds):
+        """
+        Constructor of histogram
+        :param name: string - name of the measure
+        :param bounds: list[float,...] - upper bounds of buckets in ascending order, the last bucket is unbounded
+        """
+        self.name = name
+        self.bounds = list(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """
+        :param value: float - observed value
+        """
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class Registry:
+    """
+    Registry of simulation metrics that subsystems increment and that is flushed to a JSON-lines file
+    """
+
+    def __init__(self):
+        """
+        Constructor of empty registry, flushing is off until configure is called
+        """
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}  # callables evaluated only at flush
+        self.path = None
+        self.interval = 0
+
+    def counter(self, name):
+        """
+        :param name: string - name of the measure
+        :return: Counter object - existing or new counter
+        """
+        if name not in self.counters:
+            self.counters[name] = Counter(name)
+        return self.counters[name]
+
+    def histogram(self, name, bounds):
+        """
+        :param name: string - name of the measure
+        :param bounds: list[float,...] - upper bounds of buckets, used if the histogram is new
+        :return: Histogram object - existing or new histogram
+        """
+        if name not in self.histograms:
+            self.histograms[name] = Histogram(name, bounds)
+        return self.histograms[name]
+
+    def gauge(self, name, function):
+        """
+        Registering a value that is computed at flush, e.g. number of objects by type
+        :param name: string - name of the measure
+        :param function: callable - function without arguments returning a JSON-compatible value
+        """
+        self.gauges[name] = function
+
+    def remove_gauge(self, name):
+        """
+        Unregistering a value, e.g. when the object computing it is replaced, so the registry does not keep it alive
+        :param name: string - name of the measure
+        """
+        self.gauges.pop(name, None)
+
+    def reset(self):
+        """
+        Zeroing every counter and histogram
+        """
+        for counter in self.counters.values():
+            counter.value = 0
+        for histogram in self.histograms.values():
+            histogram.counts = [0] * len(histogram.counts)
+            histogram.total = 0.0
+            histogram.count = 0
+
+    def snapshot(self):
+        """
+        :return: dict - current values of every measure
+        """
+        return {
+            "time": time.time(),
+            "counters": {name: counter.value for name, counter in self.counters.items()},
+            "histograms": {name: {"bounds": histogram.bounds,
+                                  "counts": list(histogram.counts),
+                                  "sum": histogram.total,
+                                  "count": histogram.count}
+                           for name, histogram in self.histograms.items()},
+            "gauges": {name: function() for name, function in self.gauges.items()}
+        }
+
+    def configure(self, path, interval):
+        """
+        Turning on periodic flushing
+        :param path: string - JSON-lines file, snapshots are appended to it
+        :param interval: int - number of ticks between snapshots
+        """
+        self.path = path
+        self.interval = interval
+
+    def flush_if_due(self, tick):
+        """
+        Appending a snapshot to the file every interval ticks
+        :param tick: int - current tick
+        """
+        if self.path is None or tick % self.interval != 0:
+            return
+
+        snapshot = self.snapshot()
+        snapshot["tick"] = tick
+        with open(self.path, "a") as file:
+            file.write(json.dumps(snapshot) + "\n")
+
+
+registry = Registry()
@@ -0,0 +1,111 @@
+import numpy as np
+import pygame as pg
+
+import constants as const
+import creature as creature
+import metrics as metrics
+
+PATH_COLOR = const.COLORS["white"] + (120,)
+FRAME_WIDTH = 3  # width of selection frame in pixels
+PATH_RENDERS = metrics.registry.counter("overlay.path_renders")
+
+
+def path_box(points):
+    """
+    :param points: numpy.ndarray - points of a line in pixels, shape (n, 2)
+    :return: Pygame Rect object - box covering the antialiased line
+    """
+    low, high = points.min(axis=0), points.max(axis=0)
+    return pg.Rect(int(low[0]) - 1, int(low[1]) - 1, int(high[0] - low[0]) + 4, int(high[1] - low[1]) + 4)
+
+
+def draw_line(points):
+    """
+    Drawing a translucent antialiased line on its own surface of the size of its box
+    :param points: numpy.ndarray - points of the line in pixels, shape (n, 2)
+    :return: tuple(Pygame Surface object, Pygame Rect object) - image of the line and its place on the screen
+    """
+    box = path_box(points)
+    image = pg.Surface(box.size, pg.SRCALPHA)
+    if len(points) > 1:
+        pg.draw.aalines(image, PATH_COLOR, False, points - box.topleft)
+    return image, box
+
+
+class Overlay:
+    """
+    Path previews and selection frames of the selected objects, drawn over the map objects
+    The path of every selected settler is rendered once into an image clipped to its box and is rendered again only
+    after the path changes, in every frame only the short line from the settler to his next waypoint is drawn
+    """
+
+    def __init__(self, surface):
+        """
+        Constructor of overlay
+        :param surface: Pygame Surface object - target window
+        """
+        self.surface = surface
+        self.path_images = {}  # rendered paths by id of the unit: path, waypoints left, image and its box
+        self.elements = []  # key, screen box, state and data for drawing of every element in the current frame
+
+    def path_image(self, unit):
+        """
+        Getting the rendered remaining path of the unit, it is rendered again only after the path changes
+        :param unit: Settler object - selected unit with a path
+        :return: tuple(Pygame Surface object, Pygame Rect object) - image of the path and its place on the screen
+        """
+        rendered = self.path_images.get(id(unit))
+        if rendered is None or rendered[0] is not unit.path or rendered[1] != len(unit.path):
+            PATH_RENDERS.value += 1
+            image, box = draw_line(unit.path.remaining() * const.TILE_SIZE + 12.0)
+            rendered = (unit.path, len(unit.path), image, box)
+            self.path_images[id(unit)] = rendered
+        return rendered[2], rendered[3]
+
+    def collect(self, selected, alpha=1.0):
+        """
+        Finding the elements of overlay in the current frame
+        :param selected: list[MapObject object,...] - selected objects
+        :param alpha: float - part of the tick passed since the last simulation step, moving units are interpolated
+        :return: list[tuple(tuple, Pygame Rect object, tuple),...] - key, screen box and state of every element
+        """
+        self.elements = []
+        for map_object in selected:
+            if isinstance(map_object, creature.Settler) and len(map_object.path) > 0:
+                image, box = self.path_image(map_object)
+                coord = [map_object.previous_coord[0] + (map_object.coord[0] - map_object.previous_coord[0]) * alpha,
+                         map_object.previous_coord[1] + (map_object.coord[1] - map_object.previous_coord[1]) * alpha]
+                head = np.array([coord, map_object.path.remaining()[0]]) * const.TILE_SIZE + 12.0
+                self.elements.append((("path", id(map_object)), box.union(path_box(head)),
+                                      (image, tuple(head[0])), (image, box, head)))
+
+            frame_box = pg.Rect(map_object.coord[0] * const.TILE_SIZE, map_object.coord[1] * const.TILE_SIZE,
+                                const.TILE_SIZE, const.TILE_SIZE)
+            self.elements.append((("frame", id(map_object)), frame_box, None, None))
+
+        paths = {key[1] for key, _, _, _ in self.elements if key[0] == "path"}
+        for unit_id in list(self.path_images):
+            if unit_id not in paths:
+                del self.path_images[unit_id]
+        return [(key, box, state) for key, box, state, _ in self.elements]
+
+    def draw(self, region=None):
+        """
+        Drawing the elements of the current frame
+        :param region: Pygame Rect object - part of the screen that is redrawn, elements outside it are skipped
+        """
+        for key, box, _, data in self.elements:
+            if region is not None and not region.colliderect(box):
+                continue
+
+            if key[0] == "path":
+                image, image_box, head = data
+                self.surface.blit(image, image_box)
+                self.surface.blit(*draw_line(head))
+            else:
+                # pg.draw.rect with a width fills more than the border when the surface is clipped, so sides are filled
+                for side in ((box.left, box.top, box.width, FRAME_WIDTH),
+                             (box.left, box.bottom - FRAME_WIDTH, box.width, FRAME_WIDTH),
+                             (box.left, box.top, FRAME_WIDTH, box.height),
+                             (box.right - FRAME_WIDTH, box.top, FRAME_WIDTH, box.height)):
+                    self.surface.fill(const.COLORS["white"], side)
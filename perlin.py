@@ -30,7 +30,7 @@ class PerlinNoiseFactory:
     There is no limit to the coordinates used; new gradients are generated on the fly as necessary
     """
 
-    def __init__(self, dimension, octaves=1, tile=(), unbias=False):
+    def __init__(self, dimension, octaves=1, tile=(), unbias=False, rng=random):
         """
         Create a new Perlin noise factory in the given number of dimensions,
         which should be an integer and at least 1.
@@ -38,12 +38,14 @@ class PerlinNoiseFactory:
         :param octaves: int - create a foggier and more-detailed noise pattern, better less than 4
         :param unbias: bool - if true apply smoothstep function counteract some of
                               Perlin noise's significant bias towards the center of its output range
+        :param rng: Random object - source of random gradients, by default the global random module
         """
         self.dimension = dimension
         self.octaves = octaves
         self.tile = tile + (0,) * dimension
         self.unbias = unbias
         self.scale_factor = 2 * dimension ** -0.5
+        self.rng = rng
 
         self.gradient = {}
 
@@ -52,9 +54,9 @@ class PerlinNoiseFactory:
         Creating gradient
         """
         if self.dimension == 1:
-            return random.uniform(-1, 1),
+            return self.rng.uniform(-1, 1),
 
-        random_point = [random.gauss(0, 1) for _ in range(self.dimension)]
+        random_point = [self.rng.gauss(0, 1) for _ in range(self.dimension)]
         scale = sum(n * n for n in random_point) ** -0.5
         return tuple(coord * scale for coord in random_point)
 
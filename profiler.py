@@ -0,0 +1,181 @@
+import cProfile
+import csv
+import json
+import os
+import time
+import tracemalloc
+
+import numpy as np
+
+PHASES = ("process_input", "update_interface", "draw_map", "draw_objects", "draw_interface",
+          "create_new_animal", "ai_acts", "update_timers", "do_tasks", "move_creatures", "update_display")
+MODULES = ("map_objects", "creature", "dijkstra", "interface", "gameplay", "game_map", "perlin", "scheduler")
+
+
+class FrameProfiler:
+    """
+    Rolling per-phase timings of the main loop, switched off by default
+    """
+
+    def __init__(self, phases=PHASES, window=240, directory="profiles"):
+        """
+        Constructor of profiler
+        :param phases: tuple(string,...) - names of measured phases
+        :param window: int - number of last frames kept in memory
+        :param directory: string - directory of CSV and JSON dumps
+        """
+        self.phases = phases
+        self.phase_index = {phase: index for index, phase in enumerate(phases)}
+        self.window = window
+        self.directory = directory
+        self.timings = np.zeros((window, len(phases)))  # ring buffer of frames in seconds
+        self.current = np.zeros(len(phases))
+        self.frame = 0
+        self.dumped_frame = 0
+        self.is_enabled = False
+        self.function_profile = None  # cProfile.Profile object while frames are captured
+        self.captured_frames_left = 0
+        self.memory_snapshot = None
+        self.messages = []  # report of the last capture, shown under the timings in the overlay
+
+    def toggle(self):
+        """
+        Switching profiling on or off, collected timings are forgotten
+        """
+        self.is_enabled = not self.is_enabled
+        self.timings[:] = 0
+        self.current[:] = 0
+        self.frame = 0
+        self.dumped_frame = 0
+
+    def call(self, phase, function, *args):
+        """
+        Calling a function of the main loop and adding its time to the phase
+        :param phase: string - name of the phase
+        :param function: callable - measured function
+        :param args: arguments of the function
+        :return: result of the function
+        """
+        if not self.is_enabled:
+            return function(*args)
+
+        start_time = time.perf_counter()
+        result = function(*args)
+        self.current[self.phase_index[phase]] += time.perf_counter() - start_time
+        return result
+
+    def end_frame(self):
+        """
+        Closing the frame, timings of its phases go to the ring buffer and periodically to dump files
+        """
+        if self.function_profile is not None:
+            self.captured_frames_left -= 1
+            if self.captured_frames_left <= 0:
+                self.finish_function_profile()
+
+        if not self.is_enabled:
+            return
+
+        self.timings[self.frame % self.window] = self.current
+        self.current[:] = 0
+        self.frame += 1
+
+        if self.frame - self.dumped_frame >= self.window:
+            self.dump()
+
+    def last_frames(self):
+        """
+        :return: numpy.ndarray - timings of the kept frames in seconds, shape (frames, phases)
+        """
+        return self.timings[:min(self.frame, self.window)]
+
+    def summary(self):
+        """
+        :return: dict{string: dict} - mean, 95th percentile and max of every phase over the kept frames in ms
+        """
+        frames = self.last_frames() * 1000
+        if len(frames) == 0:
+            return {}
+
+        totals = frames.sum(axis=1)
+        summary = {"frame": {"mean": totals.mean(), "p95": np.percentile(totals, 95), "max": totals.max()}}
+        for phase, index in self.phase_index.items():
+            column = frames[:, index]
+            summary[phase] = {"mean": column.mean(), "p95": np.percentile(column, 95), "max": column.max()}
+        return summary
+
+    def dump(self):
+        """
+        Appending frames collected since the last dump to the CSV file and rewriting the JSON summary
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        csv_path = os.path.join(self.directory, "frames.csv")
+        is_new_file = not os.path.exists(csv_path)
+
+        with open(csv_path, "a", newline="") as file:
+            writer = csv.writer(file)
+            if is_new_file:
+                writer.writerow(("frame",) + self.phases)
+            for frame in range(max(self.dumped_frame, self.frame - self.window), self.frame):
+                writer.writerow([frame] + ["{:.6f}".format(value) for value in self.timings[frame % self.window]])
+
+        with open(os.path.join(self.directory, "summary.json"), "w") as file:
+            json.dump({phase: {key: float(value) for key, value in stats.items()}
+                       for phase, stats in self.summary().items()}, file, indent=4)
+
+        self.dumped_frame = self.frame
+
+    def start_function_profile(self, frames=120):
+        """
+        Profiling functions with cProfile during the next frames
+        :param frames: int - number of captured frames
+        """
+        if self.function_profile is not None:
+            return
+
+        self.captured_frames_left = frames
+        self.function_profile = cProfile.Profile()
+        self.function_profile.enable()
+
+    def finish_function_profile(self):
+        """
+        Stopping cProfile and writing its statistics to a pstats file
+        :return: string - path to the pstats file
+        """
+        self.function_profile.disable()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, "frames_{}.pstats".format(time.strftime("%Y%m%d_%H%M%S")))
+        self.function_profile.dump_stats(path)
+        self.function_profile = None
+        self.messages = ["Profile of frames is written to {}".format(path)]
+        return path
+
+    def snapshot_memory(self):
+        """
+        Taking a tracemalloc snapshot and reporting the allocation growth since the previous one by module
+        The first call only takes the baseline snapshot, tracing is started if nobody has started it yet
+        :return: dict{string: int} - growth of allocated memory in bytes for every module, None on the first call
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.memory_snapshot is None:
+            self.memory_snapshot = tracemalloc.take_snapshot()
+            self.messages = ["Memory tracing started, the next snapshot shows the growth"]
+            return None
+
+        snapshot = tracemalloc.take_snapshot()
+        growth = {}
+        for stat in snapshot.compare_to(self.memory_snapshot, "filename"):
+            module = os.path.splitext(os.path.basename(stat.traceback[0].filename))[0]
+            if module not in MODULES:
+                module = "other"
+            growth[module] = growth.get(module, 0) + stat.size_diff
+        self.memory_snapshot = snapshot
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, "memory_{}.json".format(time.strftime("%Y%m%d_%H%M%S")))
+        with open(path, "w") as file:
+            json.dump(growth, file, indent=4)
+        self.messages = ["Memory growth by module is written to {}".format(path)] + \
+            ["{} {:+d} B".format(module, size) for module, size in sorted(growth.items())]
+        return growth
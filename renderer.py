@@ -0,0 +1,175 @@
+import heapq
+
+import metrics as metrics
+
+LAYER_COMPOSITIONS = metrics.registry.counter("renderer.layer_compositions")
+SORT_SWAPS = metrics.registry.counter("renderer.sort_swaps")
+
+
+def sort_key(map_object, box):
+    """
+    :param map_object: MapObject object - drawn object
+    :param box: Pygame Rect object - part of the screen covered by the object
+    :return: tuple(int, int, int) - drawing order: layer of the object, bottom and center of its box
+    """
+    return map_object.draw_layer, box.bottom, box.centerx
+
+
+class SpriteRenderer:
+    """
+    Drawing of map objects in layers
+    Static objects are composited with the map into a cached layer that is changed only where they change,
+    dynamic objects are kept sorted by depth and drawn over it with Surface.blits, mixed with the static objects
+    where some of those stand in front of them
+    """
+
+    def __init__(self, surface, background):
+        """
+        Constructor of renderer
+        :param surface: Pygame Surface object - target window
+        :param background: Pygame Surface object - image of the map under every object
+        """
+        self.surface = surface
+        self.background = background
+        self.layer = None  # background with the static objects, made at the first tracking
+        self.static_states = {}  # draw box, state and screen box of every static object by its id
+        self.static_objects = []  # static objects in the drawing order, with their boxes and sort keys
+        self.static_boxes = []
+        self.static_keys = []
+        self.dynamic_objects = []  # dynamic objects in the drawing order of the current frame
+        self.dynamic_boxes = []
+        self.dynamic_keys = []
+
+    def track(self, dirty_rects, static_objects, dynamic_objects, alpha=1.0):
+        """
+        Updating the static layer where static objects changed and the order of dynamic objects, every change is
+        registered in the dirty rects
+        :param dirty_rects: DirtyRects object - dirty regions of the screen
+        :param static_objects: list[MapObject object,...] - objects that do not move
+        :param dynamic_objects: list[MapObject object,...] - moving and short-living objects
+        :param alpha: float - part of the tick passed since the last simulation step, moving objects are interpolated
+        """
+        self.track_static(dirty_rects, static_objects)
+        self.track_dynamic(dirty_rects, dynamic_objects, alpha)
+
+    def track_static(self, dirty_rects, static_objects):
+        """
+        Finding added, removed and changed static objects, the static layer is composited again only under them
+        :param dirty_rects: DirtyRects object - dirty regions of the screen
+        :param static_objects: list[MapObject object,...] - objects that do not move
+        """
+        changed_boxes = []
+        is_order_changed = False
+        for map_object in static_objects:
+            state = (map_object.draw_box, map_object.draw_state())
+            previous = self.static_states.get(id(map_object))
+            if previous is None:
+                is_order_changed = True
+                changed_boxes.append(map_object.screen_box())
+            elif previous[0] != state[0] or previous[1] != state[1]:
+                is_order_changed = is_order_changed or previous[0] != state[0]
+                changed_boxes.append(previous[2])
+                changed_boxes.append(map_object.screen_box())
+            else:
+                continue
+            self.static_states[id(map_object)] = state + (map_object.screen_box(),)
+
+        if len(self.static_states) != len(static_objects):
+            alive = {id(map_object) for map_object in static_objects}
+            for object_id in [object_id for object_id in self.static_states if object_id not in alive]:
+                changed_boxes.append(self.static_states.pop(object_id)[2])
+            is_order_changed = True
+
+        if is_order_changed:
+            boxes = [map_object.screen_box() for map_object in static_objects]
+            order = sorted(range(len(static_objects)), key=lambda index: sort_key(static_objects[index],
+                                                                                  boxes[index]))
+            self.static_objects = [static_objects[index] for index in order]
+            self.static_boxes = [boxes[index] for index in order]
+            self.static_keys = [sort_key(static_objects[index], boxes[index]) for index in order]
+
+        if self.layer is None:
+            self.layer = self.background.copy()
+            self.layer.blits([sprite for map_object in self.static_objects for sprite in map_object.sprites()],
+                             doreturn=False)
+            LAYER_COMPOSITIONS.value += 1
+            return
+
+        for box in changed_boxes:
+            self.compose(box)
+            dirty_rects.add(box)
+
+    def compose(self, box):
+        """
+        Compositing the static layer again inside the box
+        :param box: Pygame Rect object - changed part of the layer
+        """
+        self.layer.set_clip(box)
+        self.layer.blit(self.background, box, box)
+        self.layer.blits([sprite for index in box.collidelistall(self.static_boxes)
+                          for sprite in self.static_objects[index].sprites()], doreturn=False)
+        self.layer.set_clip(None)
+        LAYER_COMPOSITIONS.value += 1
+
+    def track_dynamic(self, dirty_rects, dynamic_objects, alpha=1.0):
+        """
+        Updating the drawing order of dynamic objects
+        The order of the previous frame is kept and repaired by insertion sort, which takes linear time while
+        creatures change their places in it only rarely
+        :param dirty_rects: DirtyRects object - dirty regions of the screen
+        :param dynamic_objects: list[MapObject object,...] - moving and short-living objects
+        :param alpha: float - part of the tick passed since the last simulation step, moving objects are interpolated
+        """
+        alive = {id(map_object) for map_object in dynamic_objects}
+        kept = {id(map_object) for map_object in self.dynamic_objects}
+        order = [map_object for map_object in self.dynamic_objects if id(map_object) in alive] + \
+                [map_object for map_object in dynamic_objects if id(map_object) not in kept]
+        boxes = [map_object.screen_box(alpha) for map_object in order]
+        keys = [sort_key(map_object, box) for map_object, box in zip(order, boxes)]
+
+        swaps = 0
+        for i in range(1, len(order)):
+            j = i
+            while j > 0 and keys[j - 1] > keys[j]:
+                order[j - 1], order[j] = order[j], order[j - 1]
+                boxes[j - 1], boxes[j] = boxes[j], boxes[j - 1]
+                keys[j - 1], keys[j] = keys[j], keys[j - 1]
+                j -= 1
+                swaps += 1
+        SORT_SWAPS.value += swaps
+
+        self.dynamic_objects = order
+        self.dynamic_boxes = boxes
+        self.dynamic_keys = keys
+        for map_object, box in zip(order, boxes):
+            dirty_rects.track(id(map_object), box, map_object.draw_state(alpha))
+
+    def draw_static(self, region):
+        """
+        Drawing the static layer in the region
+        :param region: Pygame Rect object - part of the screen to redraw
+        """
+        self.surface.blit(self.layer, region, region)
+
+    def draw_dynamic(self, region, alpha=1.0):
+        """
+        Drawing the dynamic objects in the region over the static layer in one batch
+        If some static object stands in front of a dynamic one, the region is drawn from the background with every
+        static object in it, because translucent edges of sprites drawn twice would become darker
+        :param region: Pygame Rect object - part of the screen to redraw, the surface has to be clipped to it
+        :param alpha: float - part of the tick passed since the last simulation step, moving objects are interpolated
+        """
+        dynamic = region.collidelistall(self.dynamic_boxes)
+        if not dynamic:
+            return
+
+        static = region.collidelistall(self.static_boxes)
+        if static and self.static_keys[static[-1]] > self.dynamic_keys[dynamic[0]]:
+            self.surface.blit(self.background, region, region)
+        else:
+            static = []
+        order = heapq.merge(((self.dynamic_keys[index], 1, self.dynamic_objects[index]) for index in dynamic),
+                            ((self.static_keys[index], 0, self.static_objects[index]) for index in static),
+                            key=lambda item: item[:2])
+        self.surface.blits([sprite for _, _, map_object in order for sprite in map_object.sprites(alpha)],
+                           doreturn=False)
@@ -0,0 +1,100 @@
+import struct
+
+import pygame as pg
+
+HEADER = struct.Struct("<4sHQHH")  # magic, version, world seed, width and height of the game region in pixels
+RECORD = struct.Struct("<IBihh")  # tick, event code, key or mouse button, x and y of the cursor
+MAGIC = b"FWRP"
+VERSION = 1
+
+EVENT_CODES = {
+    pg.QUIT: 0,
+    pg.KEYDOWN: 1,
+    pg.MOUSEMOTION: 2,
+    pg.MOUSEBUTTONDOWN: 3
+}
+EVENT_TYPES = {code: event_type for event_type, code in EVENT_CODES.items()}
+
+
+class InputRecorder:
+    """
+    Recorder of player input, every event processed by the gameplay is written with its tick
+    """
+
+    def __init__(self, path, seed, size):
+        """
+        Constructor of recorder, the file is created at once
+        :param path: string - path to the replay file
+        :param seed: int - seed of the recorded world
+        :param size: tuple(int, int) - size of the game region in pixels
+        """
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed, size[0], size[1]))
+
+    def record(self, tick, events):
+        """
+        Writing events processed at the given tick
+        :param tick: int - current tick of simulation
+        :param events: list[Pygame event object,...] - events from queue
+        """
+        for event in events:
+            if event.type not in EVENT_CODES:
+                continue
+
+            key = 0
+            pos = (0, 0)
+            if event.type == pg.KEYDOWN:
+                key = event.key
+            elif event.type == pg.MOUSEMOTION:
+                pos = event.pos
+            elif event.type == pg.MOUSEBUTTONDOWN:
+                key = event.button
+                pos = event.pos
+            self.file.write(RECORD.pack(tick, EVENT_CODES[event.type], key, pos[0], pos[1]))
+
+    def close(self):
+        """
+        Finishing the record
+        """
+        self.file.close()
+
+
+class InputReplayer:
+    """
+    Source of recorded player input that returns events of every tick
+    """
+
+    def __init__(self, path):
+        """
+        Constructor of replayer, the whole file is read at once
+        :param path: string - path to the replay file
+        """
+        with open(path, "rb") as file:
+            data = file.read()
+
+        magic, version, self.seed, width, height = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("{} is not a replay of version {}".format(path, VERSION))
+        self.size = (width, height)
+
+        self.events = {}
+        self.last_tick = 0
+        for tick, code, key, x, y in RECORD.iter_unpack(data[HEADER.size:]):
+            event_type = EVENT_TYPES[code]
+            if event_type == pg.KEYDOWN:
+                event = pg.event.Event(event_type, key=key)
+            elif event_type == pg.MOUSEMOTION:
+                event = pg.event.Event(event_type, pos=(x, y))
+            elif event_type == pg.MOUSEBUTTONDOWN:
+                event = pg.event.Event(event_type, pos=(x, y), button=key)
+            else:
+                event = pg.event.Event(event_type)
+            self.events.setdefault(tick, []).append(event)
+            self.last_tick = tick
+
+    def events_for(self, tick):
+        """
+        :param tick: int - current tick of simulation
+        :return: list[Pygame event object,...] - events recorded at this tick
+        """
+        return self.events.get(tick, [])
@@ -0,0 +1,370 @@
+import math
+import os
+import threading
+import time
+
+import numpy as np
+
+import creature as creature
+import dijkstra as dijkstra
+import map_objects as objects
+import metrics as metrics
+import scheduler as scheduler
+import seeding as seeding
+
+VERSION = 2
+HEADER = ("version", "seed", "tick", "width", "height", "number_of_animals", "scan_tick")
+SOLID_TYPES = ("tree", "bush", "cliff", "deer", "wolf", "turtle")
+ANIMALS = {
+    "deer": creature.Deer,
+    "wolf": creature.Wolf,
+    "turtle": creature.Turtle
+}
+PLANTS = {
+    "tree": objects.Tree,
+    "bush": objects.Bush,
+    "cliff": objects.Cliff
+}
+CREATURE_TYPES = ("settler", "deer", "wolf", "turtle")  # creature types of corpses
+RESOURCE_TYPES = ("wood", "stone", "berries", "meet")
+AI_ACTIONS = ("decide_to_move",)
+NO_TICK = -1  # timer that is not planned
+
+AUTOSAVE_PAUSE = metrics.registry.histogram("savegame.autosave_pause_ms", [0.5, 1, 2, 4, 8, 16, 33, 66])
+SAVE_TIME = metrics.registry.histogram("savegame.save_ms", [4, 8, 16, 33, 66, 125, 250, 500])
+
+
+def pack_creatures(prefix, creatures, arrays):
+    """
+    Adding columns of moving creatures: coordinates, direction, path and task
+    :param prefix: string - type of creatures, prefix of the columns
+    :param creatures: list[Creature object,...] - creatures of this type
+    :param arrays: dict{string: numpy.ndarray} - columns of the save file
+    """
+    paths = [creature_object.path.remaining() for creature_object in creatures]
+    arrays[prefix + ".coord"] = np.array([creature_object.coord for creature_object in creatures],
+                                         dtype=np.float64).reshape(-1, 2)
+    arrays[prefix + ".previous_coord"] = np.array([creature_object.previous_coord for creature_object in creatures],
+                                                  dtype=np.float64).reshape(-1, 2)
+    arrays[prefix + ".direction"] = np.array([creature_object.direction for creature_object in creatures],
+                                             dtype=np.float64).reshape(-1, 2)
+    arrays[prefix + ".hit_points"] = np.array([creature_object.hit_points for creature_object in creatures],
+                                              dtype=np.float32)
+    arrays[prefix + ".path_length"] = np.array([len(path) for path in paths], dtype=np.int32)
+    arrays[prefix + ".path"] = np.concatenate(paths + [np.zeros((0, 2), dtype=np.int16)]).astype(np.int16)
+
+    task_target = np.full((len(creatures), 2), -1, dtype=np.int32)
+    task_state = np.zeros(len(creatures), dtype=np.int8)  # 0 - no task, 1 - planned, 2 - started
+    for index, creature_object in enumerate(creatures):
+        if isinstance(creature_object.task, creature.TileTask):
+            task_target[index] = creature_object.task.target_tile
+            task_state[index] = 2 if creature_object.task.is_started else 1
+    arrays[prefix + ".task_target"] = task_target
+    arrays[prefix + ".task_state"] = task_state
+
+
+def unpack_creatures(prefix, saved_game, create):
+    """
+    Restoring moving creatures from their columns
+    :param prefix: string - type of creatures, prefix of the columns
+    :param saved_game: dict{string: numpy.ndarray} - columns of the save file
+    :param create: callable - constructor of creature from coordinates and hit points
+    :return: list[Creature object,...] - restored creatures
+    """
+    creatures = []
+    path_ends = np.cumsum(saved_game[prefix + ".path_length"])
+    for index, coord in enumerate(saved_game[prefix + ".coord"].tolist()):
+        creature_object = create(coord, float(saved_game[prefix + ".hit_points"][index]))
+        creature_object.previous_coord = saved_game[prefix + ".previous_coord"][index].tolist()
+        creature_object.direction = saved_game[prefix + ".direction"][index].tolist()
+
+        path = dijkstra.Path()
+        path.waypoints = saved_game[prefix + ".path"][path_ends[index] - saved_game[prefix + ".path_length"][index]:
+                                                      path_ends[index]]
+        path.target = path.waypoints[0].tolist() if len(path) > 0 else None
+        creature_object.path = path
+
+        if saved_game[prefix + ".task_state"][index] > 0:
+            creature_object.task = creature.TileTask("go_to", saved_game[prefix + ".task_target"][index].tolist())
+            creature_object.task.is_started = saved_game[prefix + ".task_state"][index] == 2
+
+        creature_object.update_image()
+        creatures.append(creature_object)
+    return creatures
+
+
+def snapshot(game):
+    """
+    Taking the full state of the game at the tick boundary
+    Terrain is copied as an array and objects as columns of every type, the snapshot shares nothing with the game,
+    so it can be written while the game keeps running
+    :param game: Gameplay object - running game
+    :return: dict{string: numpy.ndarray} - columns of the save file
+    """
+    arrays = {
+        "header": np.array([VERSION, game.world_seed.seed, game.tick, game.game_map.size[0], game.game_map.size[1],
+                            game.number_of_animals, game.scan_tick], dtype=np.int64),
+        "terrain": game.game_map.store.read("terrain"),
+        "solid_types": np.array([SOLID_TYPES.index(solid_object.type) for solid_object in game.list_solid_object],
+                                dtype=np.uint8)
+    }
+
+    solid_objects = {solid_type: [] for solid_type in SOLID_TYPES}
+    for solid_object in game.list_solid_object:
+        solid_objects[solid_object.type].append(solid_object)
+
+    for plant_type in PLANTS:
+        arrays[plant_type + ".coord"] = np.array([plant.coord for plant in solid_objects[plant_type]],
+                                                 dtype=np.int16).reshape(-1, 2)
+        arrays[plant_type + ".hit_points"] = np.array([plant.hit_points for plant in solid_objects[plant_type]],
+                                                      dtype=np.float32)
+    bushes = solid_objects["bush"]
+    arrays["bush.time_from_harvest"] = np.array([bush.time_from_harvest for bush in bushes], dtype=np.int32)
+    arrays["bush.ripening_tick"] = np.array([NO_TICK if bush.ripening_tick is None else bush.ripening_tick
+                                             for bush in bushes], dtype=np.int64)
+    arrays["bush.is_riped"] = np.array([bush.is_riped for bush in bushes], dtype=bool)
+
+    for animal_type in ANIMALS:
+        pack_creatures(animal_type, solid_objects[animal_type], arrays)
+        arrays[animal_type + ".was_attacked"] = np.array([animal.was_attacked for animal in solid_objects[animal_type]],
+                                                         dtype=bool)
+    pack_creatures("settler", [game.settler], arrays)
+
+    arrays["effect.coord"] = np.array([effect.coord for effect in game.list_effects], dtype=np.float64).reshape(-1, 2)
+    arrays["effect.texture_file"] = np.array([effect.texture_file for effect in game.list_effects], dtype=str)
+    arrays["effect.lifetime"] = np.array([effect.lifetime for effect in game.list_effects], dtype=np.int32)
+    arrays["effect.expiration_tick"] = np.array([effect.expiration_tick for effect in game.list_effects],
+                                                dtype=np.int64)
+
+    loot = {"corpse": [], "resources": []}
+    for loot_item in game.list_loot:
+        loot[loot_item.type].append(loot_item)
+    arrays["corpse.coord"] = np.array([corpse.coord for corpse in loot["corpse"]], dtype=np.int16).reshape(-1, 2)
+    arrays["corpse.creature_type"] = np.array([CREATURE_TYPES.index(corpse.creation_type) for corpse in loot["corpse"]],
+                                              dtype=np.uint8)
+    arrays["corpse.meat_quantity"] = np.array([corpse.meat_quantity for corpse in loot["corpse"]], dtype=np.int32)
+    arrays["resources.coord"] = np.array([resources.coord for resources in loot["resources"]],
+                                         dtype=np.int16).reshape(-1, 2)
+    arrays["resources.resource_type"] = np.array([RESOURCE_TYPES.index(resources.resource_type)
+                                                  for resources in loot["resources"]], dtype=np.uint8)
+    arrays["resources.res_quantity"] = np.array([resources.res_quantity for resources in loot["resources"]],
+                                                dtype=np.int32)
+
+    object_index = {id(solid_object): index for index, solid_object in enumerate(game.list_solid_object)}
+    ai_entries = game.ai_scheduler.entries()
+    arrays["ai.tick"] = np.array([tick for tick, _, _ in ai_entries], dtype=np.int64)
+    arrays["ai.object"] = np.array([object_index[id(animal)] for _, animal, _ in ai_entries], dtype=np.int32)
+    arrays["ai.action"] = np.array([AI_ACTIONS.index(action) for _, _, action in ai_entries], dtype=np.uint8)
+
+    rng_state = game.world_seed.get_state()
+    arrays["rng.state"] = np.array([rng_state[name][1] for name in seeding.STREAMS], dtype=np.uint32)
+    arrays["rng.gauss_next"] = np.array([math.nan if rng_state[name][2] is None else rng_state[name][2]
+                                         for name in seeding.STREAMS], dtype=np.float64)
+    return arrays
+
+
+def write(arrays, path):
+    """
+    Compressing a snapshot to a save file, the file is replaced at once so a crash never leaves a broken save
+    :param arrays: dict{string: numpy.ndarray} - columns of the save file
+    :param path: string - path to the save file
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path + ".tmp", "wb") as file:
+        np.savez_compressed(file, **arrays)
+    os.replace(path + ".tmp", path)
+
+
+def save(game, path):
+    """
+    Writing the full state of the game to a binary save file
+    Terrain is written as an array and objects as columns of every type, so no text is formatted or parsed
+    :param game: Gameplay object - running game
+    :param path: string - path to the save file
+    """
+    start_time = time.perf_counter()
+    game.game_map.store.flush()  # the changed chunks of the map are written back at every save
+    write(snapshot(game), path)
+    SAVE_TIME.observe((time.perf_counter() - start_time) * 1000)
+
+
+def read(path):
+    """
+    Reading a save file
+    :param path: string - path to the save file
+    :return: dict{string: numpy.ndarray} - columns of the save file
+    """
+    with np.load(path) as file:
+        saved_game = dict(file)
+
+    if saved_game["header"][HEADER.index("version")] != VERSION:
+        raise ValueError("{} is not a save of version {}".format(path, VERSION))
+    return saved_game
+
+
+def header(saved_game, field):
+    """
+    :param saved_game: dict{string: numpy.ndarray} - columns of the save file
+    :param field: string - name of the field, one of HEADER
+    :return: int - value of the field
+    """
+    return int(saved_game["header"][HEADER.index(field)])
+
+
+def restore(game, saved_game):
+    """
+    Replacing objects, timers and random streams of the game with the saved ones
+    The game has to be created from the saved terrain, see Gameplay
+    :param game: Gameplay object - game with the saved world seed and terrain
+    :param saved_game: dict{string: numpy.ndarray} - columns of the save file
+    """
+    game.tick = header(saved_game, "tick")
+    game.number_of_animals = header(saved_game, "number_of_animals")
+    game.scan_tick = header(saved_game, "scan_tick")
+
+    solid_objects = {}
+    for plant_type, plant_class in PLANTS.items():
+        coords = saved_game[plant_type + ".coord"].tolist()
+        hit_points = saved_game[plant_type + ".hit_points"].tolist()
+        if plant_type == "bush":
+            solid_objects[plant_type] = [plant_class(game.surface, coord, hit_points[index], time_from_harvest)
+                                         for index, (coord, time_from_harvest)
+                                         in enumerate(zip(coords, saved_game["bush.time_from_harvest"].tolist()))]
+        else:
+            solid_objects[plant_type] = [plant_class(game.surface, coord, hit_points[index])
+                                         for index, coord in enumerate(coords)]
+
+    for bush, ripening_tick, is_riped in zip(solid_objects["bush"], saved_game["bush.ripening_tick"].tolist(),
+                                             saved_game["bush.is_riped"].tolist()):
+        bush.ripening_tick = None if ripening_tick == NO_TICK else ripening_tick
+        if is_riped:
+            bush.ripe()
+
+    for animal_type, animal_class in ANIMALS.items():
+        solid_objects[animal_type] = unpack_creatures(
+            animal_type, saved_game,
+            lambda coord, hit_points: animal_class(game.surface, coord, hit_points)
+        )
+        for animal, was_attacked in zip(solid_objects[animal_type], saved_game[animal_type + ".was_attacked"].tolist()):
+            animal.was_attacked = was_attacked
+
+    game.settler = unpack_creatures(
+        "settler", saved_game,
+        lambda coord, hit_points: creature.Settler(game.surface, coord, hit_points)
+    )[0]
+
+    next_object = {solid_type: iter(solid_objects[solid_type]) for solid_type in SOLID_TYPES}
+    game.list_solid_object = [next(next_object[SOLID_TYPES[type_index]])
+                              for type_index in saved_game["solid_types"].tolist()]
+
+    game.list_effects = []
+    for coord, texture_file, lifetime, expiration_tick in zip(saved_game["effect.coord"].tolist(),
+                                                              saved_game["effect.texture_file"].tolist(),
+                                                              saved_game["effect.lifetime"].tolist(),
+                                                              saved_game["effect.expiration_tick"].tolist()):
+        effect = objects.Effect(game.surface, coord, texture_file, lifetime)
+        effect.expiration_tick = expiration_tick
+        game.list_effects.append(effect)
+
+    game.list_loot = []
+    for coord, creature_type, meat_quantity in zip(saved_game["corpse.coord"].tolist(),
+                                                   saved_game["corpse.creature_type"].tolist(),
+                                                   saved_game["corpse.meat_quantity"].tolist()):
+        corpse = objects.Corpse(game.surface, coord, CREATURE_TYPES[creature_type])
+        corpse.meat_quantity = meat_quantity
+        game.list_loot.append(corpse)
+    for coord, resource_type, res_quantity in zip(saved_game["resources.coord"].tolist(),
+                                                  saved_game["resources.resource_type"].tolist(),
+                                                  saved_game["resources.res_quantity"].tolist()):
+        game.list_loot.append(objects.Resources(game.surface, coord, RESOURCE_TYPES[resource_type], res_quantity))
+
+    game.ai_scheduler = scheduler.TickScheduler()
+    for tick, object_index, action in zip(saved_game["ai.tick"].tolist(), saved_game["ai.object"].tolist(),
+                                          saved_game["ai.action"].tolist()):
+        game.ai_scheduler.schedule(tick, game.list_solid_object[object_index], AI_ACTIONS[action])
+
+    game.world_seed.set_state({
+        name: (3, tuple(saved_game["rng.state"][index].tolist()),
+               None if math.isnan(saved_game["rng.gauss_next"][index]) else float(saved_game["rng.gauss_next"][index]))
+        for index, name in enumerate(seeding.STREAMS)
+    })
+
+    # the cost layer of the restored store holds only the objects of the generated world, creatures are not in it
+    game.grid = dijkstra.make_grid(game.game_map, [solid_object for solid_object in game.list_solid_object
+                                                   if solid_object.type in PLANTS])
+    game.schedule_world_timers()
+
+
+class Autosave:
+    """
+    Periodic saving of the game into rotating slots
+    Only the snapshot is taken in the main loop, compressing and writing are done by a background thread
+    """
+
+    def __init__(self, interval, slots, directory="saves"):
+        """
+        Constructor of autosave
+        :param interval: int - number of ticks between autosaves
+        :param slots: int - number of rotating save files, the oldest one is overwritten
+        :param directory: string - directory of save files
+        """
+        self.interval = interval
+        self.slots = slots
+        self.directory = directory
+        self.slot = 0
+        self.thread = None
+        self.last_pause = None  # time of the last snapshot in ms, the game is stopped only for it
+        self.last_write_time = None  # time of the last background write in ms
+
+    def slot_path(self, slot):
+        """
+        :param slot: int - number of slot
+        :return: string - path to the save file of the slot
+        """
+        return os.path.join(self.directory, "autosave_{}.sav".format(slot))
+
+    def update(self, game):
+        """
+        Starting an autosave if it is due at the current tick of the game
+        If the previous autosave is still being written, the new one is skipped
+        :param game: Gameplay object - running game
+        :return: bool - was an autosave started, then its pause is in last_pause
+        """
+        if game.tick % self.interval != 0 or self.is_writing():
+            return False
+
+        start_time = time.perf_counter()
+        arrays = snapshot(game)
+        self.last_pause = (time.perf_counter() - start_time) * 1000
+        AUTOSAVE_PAUSE.observe(self.last_pause)
+
+        path = self.slot_path(self.slot)
+        self.slot = (self.slot + 1) % self.slots
+        self.thread = threading.Thread(target=self._write, args=(arrays, path))
+        self.thread.start()
+        return True
+
+    def _write(self, arrays, path):
+        """
+        Writing a snapshot, runs in the background thread
+        :param arrays: dict{string: numpy.ndarray} - columns of the save file
+        :param path: string - path to the save file
+        """
+        start_time = time.perf_counter()
+        write(arrays, path)
+        self.last_write_time = (time.perf_counter() - start_time) * 1000
+
+    def is_writing(self):
+        """
+        :return: bool - is the background thread still writing
+        """
+        return self.thread is not None and self.thread.is_alive()
+
+    def finish(self):
+        """
+        Waiting for the background write, e.g. before the game exits
+        """
+        if self.thread is not None:
+            self.thread.join()
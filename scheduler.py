@@ -0,0 +1,148 @@
+import heapq
+import itertools
+
+
+class TickScheduler:
+    """
+    Priority queue of delayed actions keyed by the tick they are due at
+    """
+
+    def __init__(self):
+        """
+        Constructor of empty scheduler
+        """
+        self.queue = []
+        self.counter = itertools.count()  # keeps order of actions scheduled at the same tick
+
+    def __len__(self):
+        """
+        :return: int - number of scheduled actions
+        """
+        return len(self.queue)
+
+    def schedule(self, tick, entity, action):
+        """
+        Planning an action of an entity at a given tick
+        :param tick: int - tick when the action is due
+        :param entity: object - owner of the action
+        :param action: string - name of the entity method to call
+        """
+        heapq.heappush(self.queue, (tick, next(self.counter), entity, action))
+
+    def pop_due(self, tick):
+        """
+        Taking every action that is due at the given tick or earlier
+        :param tick: int - current tick
+        :return: list[tuple(object, string),...] - entities and names of their actions in order of due ticks
+        """
+        due = []
+        while self.queue and self.queue[0][0] <= tick:
+            due_tick, _, entity, action = heapq.heappop(self.queue)
+            due.append((entity, action))
+        return due
+
+    def entries(self):
+        """
+        :return: list[tuple(int, object, string),...] - due ticks, entities and actions in the order they will be taken
+        """
+        return [(tick, entity, action) for tick, _, entity, action in sorted(self.queue, key=lambda item: item[:2])]
+
+
+class TimerWheel:
+    """
+    Hierarchical timer wheel for world timers (ripening, aging, cooldowns)
+    Planning a timer costs O(1) and every tick touches only one slot, so only the timers that fire do any work
+    """
+
+    def __init__(self, tick=0, slots=256, levels=3):
+        """
+        Constructor of empty timer wheel
+        :param tick: int - current tick, timers are counted from it
+        :param slots: int - number of slots in every level of the wheel
+        :param levels: int - number of levels, a slot of level L covers slots ** L ticks
+        """
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.wheels = [[[] for _ in range(slots)] for _ in range(levels)]
+        self.overflow = []  # heap of timers beyond the range of the top level
+        self.ready = []  # timers planned at the current tick or earlier
+        self.counter = itertools.count()
+        self.size = 0
+
+    def __len__(self):
+        """
+        :return: int - number of planned timers
+        """
+        return self.size
+
+    def _place(self, timer):
+        """
+        Putting a timer into the slot that corresponds to its remaining time
+        :param timer: tuple(int, int, object, string) - due tick, sequence number, entity and action
+        """
+        delta = timer[0] - self.tick
+        if delta <= 0:
+            self.ready.append(timer)
+            return
+
+        span = 1
+        for level in range(self.levels):
+            if delta < span * self.slots:
+                self.wheels[level][(timer[0] // span) % self.slots].append(timer)
+                return
+            span *= self.slots
+
+        heapq.heappush(self.overflow, timer)
+
+    def _cascade(self):
+        """
+        Redistributing timers of higher levels to lower ones when the current tick reaches their slots
+        """
+        span = self.slots ** self.levels
+        if self.tick % span == 0:
+            while self.overflow and self.overflow[0][0] - self.tick < span:
+                self._place(heapq.heappop(self.overflow))
+
+        for level in range(self.levels - 1, 0, -1):
+            span = self.slots ** level
+            if self.tick % span == 0:
+                slot = self.wheels[level][(self.tick // span) % self.slots]
+                timers = slot[:]
+                slot.clear()
+                for timer in timers:
+                    self._place(timer)
+
+    def schedule(self, tick, entity, action):
+        """
+        Planning an action of an entity at a given tick
+        :param tick: int - tick when the action is due
+        :param entity: object - owner of the action
+        :param action: string - name of the entity method to call
+        """
+        self._place((tick, next(self.counter), entity, action))
+        self.size += 1
+
+    def pop_due(self, tick):
+        """
+        Turning the wheel to the given tick and taking every timer that fired on the way
+        :param tick: int - current tick
+        :return: list[tuple(object, string),...] - entities and names of their actions in order of due ticks
+        """
+        fired = self.ready
+        self.ready = []
+
+        while self.tick < tick:
+            self.tick += 1
+            self._cascade()
+            slot = self.wheels[0][self.tick % self.slots]
+            if slot:
+                fired.extend(slot)
+                slot.clear()
+            if self.ready:
+                fired.extend(self.ready)
+                self.ready = []
+
+        self.size -= len(fired)
+        fired.sort(key=lambda timer: timer[:2])
+        return [(entity, action) for _, _, entity, action in fired]
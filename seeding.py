@@ -0,0 +1,58 @@
+import argparse
+import random
+
+STREAMS = ("noise", "terrain", "vegetation", "ai", "spawn")
+MAX_SEED = 2 ** 63 - 1  # seeds are written as 64-bit integers into replays and saves
+
+
+def parse_seed(text):
+    """
+    Reading the seed from command line, seeds that do not fit replays and saves are rejected
+    :param text: string - seed given in command line
+    :return: int - seed of the world
+    """
+    seed = int(text)
+    if not 0 <= seed <= MAX_SEED:
+        raise argparse.ArgumentTypeError("seed must be from 0 to {}".format(MAX_SEED))
+    return seed
+
+
+class WorldSeed:
+    """
+    Seed of the world that drives a dedicated random stream for every subsystem
+    Streams are independent, so e.g. more AI decisions do not change the next spawn
+    """
+
+    def __init__(self, seed=None):
+        """
+        Constructor of world seed
+        :param seed: int - seed of the world from 0 to MAX_SEED, None for a random one
+        """
+        self.is_random = seed is None  # random worlds are seldom created again, so they are not cached
+        if seed is None:
+            seed = random.SystemRandom().randrange(2 ** 32)
+        elif not 0 <= seed <= MAX_SEED:
+            raise ValueError("seed {} does not fit a 64-bit replay or save header".format(seed))
+        self.seed = seed
+        self.streams = {name: random.Random("{}:{}".format(seed, name)) for name in STREAMS}
+
+    def __getitem__(self, name):
+        """
+        :param name: string - name of the subsystem, one of STREAMS
+        :return: Random object - random stream of the subsystem
+        """
+        return self.streams[name]
+
+    def get_state(self):
+        """
+        :return: dict{string: tuple} - inner state of every stream
+        """
+        return {name: stream.getstate() for name, stream in self.streams.items()}
+
+    def set_state(self, state):
+        """
+        Restoring streams from the saved state
+        :param state: dict{string: tuple} - inner state of every stream
+        """
+        for name, stream_state in state.items():
+            self.streams[name].setstate(stream_state)
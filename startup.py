@@ -0,0 +1,3 @@
+import time
+
+STARTUP_TIME = time.perf_counter()  # imported first by main.py, so the other imports are a part of the startup
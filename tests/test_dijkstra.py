@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+import constants as const
+import creature as creature
+import dijkstra as dijkstra
+import game_map as game_map
+import map_objects as objects
+import seeding as seeding
+
+MAP_SIZE = (12, 8)
+
+
+@pytest.fixture
+def region_map():
+    """
+    :return: GameMap object - small map of soil without objects
+    """
+    terrain = np.full((MAP_SIZE[1], MAP_SIZE[0]), game_map.SOIL, dtype=np.uint8)
+    return game_map.GameMap(None, (MAP_SIZE[0] * const.TILE_SIZE,
+                                   (MAP_SIZE[1] + const.INTERFACE_AMENDMENT) * const.TILE_SIZE),
+                            seeding.WorldSeed(1), terrain)
+
+
+def test_path_cursor():
+    path = dijkstra.Path([[0, 0], [1, 1], [2, 1]])
+    assert len(path) == 3 and path.target == [0, 0]
+
+    path.advance()
+    assert len(path) == 2 and path.target == [1, 1]
+    assert path.remaining().tolist() == [[1, 1], [2, 1]]
+
+    path.advance()
+    path.advance()
+    assert len(path) == 0 and path.target is None
+
+
+def test_path_prepend_keeps_the_rest():
+    path = dijkstra.Path([[0, 0], [1, 0], [2, 0]])
+    path.advance()
+    prepended = path.prepend([5, 5])
+    assert prepended.remaining().tolist() == [[5, 5], [1, 0], [2, 0]]
+    assert prepended.target == [5, 5]
+    assert path.remaining().tolist() == [[1, 0], [2, 0]]
+
+
+def test_smooth_path_keeps_turns_and_ends():
+    waypoints = np.array([[0, 0], [1, 0], [2, 0], [3, 1], [4, 2], [4, 3], [4, 4]], dtype=np.int16)
+    assert dijkstra.smooth_path(waypoints).tolist() == [[0, 0], [2, 0], [4, 2], [4, 4]]
+
+
+def test_smooth_path_keeps_reversal_and_short_paths():
+    waypoints = np.array([[0, 0], [1, 0], [0, 0]], dtype=np.int16)
+    assert dijkstra.smooth_path(waypoints).tolist() == [[0, 0], [1, 0], [0, 0]]
+    assert dijkstra.smooth_path(waypoints[:2]).tolist() == [[0, 0], [1, 0]]
+
+
+def test_dijkstra_goes_around_blocked_tiles(region_map):
+    with objects.headless_mode():
+        wall = [objects.Cliff(None, [5, y]) for y in range(MAP_SIZE[1] - 1)]
+    grid = dijkstra.make_grid(region_map, wall)
+
+    path = dijkstra.dijkstra_logic([2, 2], [8, 2], region_map, wall, grid)
+    assert path[0] == [2, 2] and path[-1] == [8, 2]
+    assert [5, MAP_SIZE[1] - 1] in path
+    assert all(max(abs(a[0] - b[0]), abs(a[1] - b[1])) == 1 for a, b in zip(path, path[1:]))
+
+
+def test_order_on_a_waypoint_does_not_repeat_the_tile(region_map):
+    grid = dijkstra.make_grid(region_map, [])
+    with objects.headless_mode():
+        settler = creature.Settler(None, [1, 1])
+    settler.task = creature.TileTask("go_to", [10, 6])
+    settler.go_to(region_map, [], grid)
+    while settler.coord != settler.path.waypoints[settler.path.cursor - 1].tolist() or settler.path.cursor == 0:
+        settler.move(region_map)
+    assert len(settler.path) > 0
+
+    for target_tile in ([1, 6], [10, 1]):  # the second order used to fail with a creature without direction
+        settler.task = creature.TileTask("go_to", target_tile)
+        settler.go_to(region_map, [], grid)
+        waypoints = settler.path.remaining().tolist()
+        assert all(a != b for a, b in zip(waypoints, waypoints[1:]))
+        settler.move(region_map)
+        assert settler.direction is not None
@@ -0,0 +1,65 @@
+import pygame as pg
+
+import dirtyrects as dirtyrects
+
+SIZE = (200, 100)
+
+
+def first_frame(dirty_rects):
+    """
+    Collecting the first frame, which is always updated whole
+    :param dirty_rects: DirtyRects object - dirty rects of the screen
+    """
+    dirty_rects.track("tree", pg.Rect(10, 10, 10, 10), "default")
+    dirty_rects.track("deer", pg.Rect(50, 50, 10, 10), "east")
+    assert dirty_rects.collect() == [pg.Rect((0, 0), SIZE)]
+
+
+def test_unchanged_frame_has_no_regions():
+    dirty_rects = dirtyrects.DirtyRects(SIZE, 0.5)
+    first_frame(dirty_rects)
+    dirty_rects.track("tree", pg.Rect(10, 10, 10, 10), "default")
+    dirty_rects.track("deer", pg.Rect(50, 50, 10, 10), "east")
+    assert dirty_rects.collect() == []
+    assert not dirty_rects.is_full_update
+
+
+def test_moved_element_makes_old_and_new_rects_dirty():
+    dirty_rects = dirtyrects.DirtyRects(SIZE, 0.5)
+    first_frame(dirty_rects)
+    dirty_rects.track("tree", pg.Rect(10, 10, 10, 10), "default")
+    dirty_rects.track("deer", pg.Rect(55, 50, 10, 10), "east")
+    assert dirty_rects.collect() == [pg.Rect(50, 50, 15, 10)]  # overlapping rects are merged
+
+    dirty_rects.track("tree", pg.Rect(10, 10, 10, 10), "riped")
+    assert sorted(dirty_rects.collect()) == [pg.Rect(10, 10, 10, 10), pg.Rect(55, 50, 10, 10)]  # the deer is gone
+
+
+def test_rects_are_clipped_to_the_screen():
+    dirty_rects = dirtyrects.DirtyRects(SIZE, 0.5)
+    first_frame(dirty_rects)
+    dirty_rects.add(pg.Rect(190, 95, 20, 20))
+    dirty_rects.add(pg.Rect(300, 300, 5, 5))
+    dirty_rects.track("tree", pg.Rect(10, 10, 10, 10), "default")
+    dirty_rects.track("deer", pg.Rect(50, 50, 10, 10), "east")
+    assert dirty_rects.collect() == [pg.Rect(190, 95, 10, 5)]
+
+
+def test_large_dirty_area_updates_the_whole_screen():
+    dirty_rects = dirtyrects.DirtyRects(SIZE, 0.5)
+    first_frame(dirty_rects)
+    dirty_rects.add(pg.Rect(0, 0, 100, 100))  # exactly the threshold
+    assert dirty_rects.collect() == [pg.Rect(0, 0, 100, 100)]
+    assert not dirty_rects.is_full_update
+
+    dirty_rects.add(pg.Rect(0, 0, 101, 100))
+    assert dirty_rects.collect() == [pg.Rect((0, 0), SIZE)]
+    assert dirty_rects.is_full_update
+
+
+def test_invalidate_updates_the_whole_screen():
+    dirty_rects = dirtyrects.DirtyRects(SIZE, 0.5)
+    first_frame(dirty_rects)
+    dirty_rects.invalidate()
+    assert dirty_rects.collect() == [pg.Rect((0, 0), SIZE)]
+    assert dirty_rects.is_full_update
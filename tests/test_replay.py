@@ -0,0 +1,34 @@
+import pygame as pg
+import pytest
+
+import replay as replay
+
+
+def test_recorded_input_round_trip(tmp_path):
+    path = str(tmp_path / "input.rpl")
+    recorder = replay.InputRecorder(path, 2 ** 63 - 1, (1920, 1080))
+    recorder.record(0, [pg.event.Event(pg.MOUSEMOTION, pos=(10, 20), rel=(1, 1), buttons=(0, 0, 0))])
+    recorder.record(3, [pg.event.Event(pg.KEYDOWN, key=pg.K_F5, mod=0, unicode=""),
+                        pg.event.Event(pg.MOUSEBUTTONDOWN, pos=(300, 400), button=1),
+                        pg.event.Event(pg.KEYUP, key=pg.K_F5, mod=0)])  # not processed by the game, not recorded
+    recorder.record(9, [pg.event.Event(pg.QUIT)])
+    recorder.close()
+
+    replayer = replay.InputReplayer(path)
+    assert replayer.seed == 2 ** 63 - 1 and replayer.size == (1920, 1080)
+    assert replayer.last_tick == 9
+
+    motion, = replayer.events_for(0)
+    assert motion.type == pg.MOUSEMOTION and motion.pos == (10, 20)
+    key, click = replayer.events_for(3)
+    assert key.type == pg.KEYDOWN and key.key == pg.K_F5
+    assert click.type == pg.MOUSEBUTTONDOWN and click.pos == (300, 400) and click.button == 1
+    assert [event.type for event in replayer.events_for(9)] == [pg.QUIT]
+    assert replayer.events_for(5) == []
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "input.rpl"
+    path.write_bytes(replay.HEADER.pack(b"XXXX", replay.VERSION, 1, 960, 720))
+    with pytest.raises(ValueError):
+        replay.InputReplayer(str(path))
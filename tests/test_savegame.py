@@ -0,0 +1,152 @@
+import random
+
+import pytest
+
+import constants as const
+import creature as creature
+import gameplay as gameplay
+import map_objects as objects
+import savegame as savegame
+import seeding as seeding
+
+MAP_SIZE = (80, 42)
+SEED = 5
+
+
+@pytest.fixture
+def game(tmp_path, monkeypatch):
+    """
+    :return: Gameplay object - seeded headless game, its map is cached in a temporary directory
+    """
+    monkeypatch.setattr(const, "MAP_CACHE_DIRECTORY", str(tmp_path / "maps"))
+    with objects.headless_mode():
+        yield gameplay.Gameplay(None, None, (MAP_SIZE[0] * const.TILE_SIZE,
+                                             (MAP_SIZE[1] + const.INTERFACE_AMENDMENT) * const.TILE_SIZE), SEED)
+
+
+def bushes(game):
+    """
+    :param game: Gameplay object - game
+    :return: list[Bush object,...] - bushes in the order of the list of solid objects
+    """
+    return [solid_object for solid_object in game.list_solid_object if solid_object.type == "bush"]
+
+
+def test_harvested_bush_round_trip(game, tmp_path):
+    bush = bushes(game)[0]
+    game.tick += 10
+    game.harvest_bush(bush)
+    path = str(tmp_path / "harvested.sav")
+    savegame.save(game, path)
+
+    loaded = gameplay.Gameplay(None, None, save_path=path)
+    loaded_bush = bushes(loaded)[0]
+    assert loaded_bush.coord == bush.coord
+    assert not loaded_bush.is_riped
+    assert loaded_bush.ripening_tick == bush.ripening_tick == game.tick + bush.ripening_time
+
+    for _ in range(bush.ripening_time):
+        game.simulate()
+        loaded.simulate()
+    assert bush.is_riped and loaded_bush.is_riped
+
+
+def save_and_load(game, tmp_path):
+    """
+    :param game: Gameplay object - running game
+    :param tmp_path: Path object - temporary directory of the test
+    :return: Gameplay object - game loaded from the save of the running one
+    """
+    path = str(tmp_path / "round_trip.sav")
+    savegame.save(game, path)
+    return gameplay.Gameplay(None, None, save_path=path)
+
+
+def creature_state(creature_object):
+    """
+    :param creature_object: Creature object - creature
+    :return: tuple - everything the save keeps about a moving creature
+    """
+    task = creature_object.task
+    return (creature_object.type, creature_object.coord, creature_object.previous_coord, creature_object.direction,
+            creature_object.hit_points, creature_object.path.remaining().tolist(), creature_object.path.target,
+            None if task is None else (task.target_tile, task.is_started))
+
+
+def creatures(game):
+    """
+    :param game: Gameplay object - game
+    :return: list[tuple,...] - states of the animals in the order of the list of solid objects and of the settler
+    """
+    return [creature_state(solid_object) for solid_object in game.list_solid_object
+            if isinstance(solid_object, creature.Creature)] + [creature_state(game.settler)]
+
+
+def test_creatures_mid_path_round_trip(game, tmp_path):
+    deer = creature.Deer(None, gameplay.find_safe_tile(game.list_solid_object, [20, 20], rng=random.Random(1)))
+    game.add_animal(deer)
+    deer.task = creature.TileTask("go_to", gameplay.find_safe_tile(game.list_solid_object, [60, 40],
+                                                                     rng=random.Random(2)))
+    game.settler.task = creature.TileTask("go_to", gameplay.find_safe_tile(game.list_solid_object, [79, 41],
+                                                                             rng=random.Random(3)))
+    for _ in range(5):
+        game.simulate()
+    assert len(game.settler.path) > 0 and len(deer.path) > 0
+
+    loaded = save_and_load(game, tmp_path)
+    assert creatures(loaded) == creatures(game)
+
+    for _ in range(3 * const.TICK_RATE):
+        game.simulate()
+        loaded.simulate()
+    assert creatures(loaded) == creatures(game)
+
+
+def test_scheduled_actions_round_trip(game, tmp_path):
+    bush = min(bushes(game), key=lambda any_bush: any_bush.ripening_tick)
+    while not bush.is_riped:
+        game.simulate()
+    game.harvest_bush(bush)
+    loaded = save_and_load(game, tmp_path)
+
+    def ai_entries(any_game):
+        return [(tick, any_game.list_solid_object.index(animal), action)
+                for tick, animal, action in any_game.ai_scheduler.entries()]
+
+    assert ai_entries(loaded) == ai_entries(game)
+    assert len(loaded.timers) == len(game.timers)
+
+    for _ in range(objects.Bush.ripening_time):
+        game.simulate()
+        loaded.simulate()
+        assert [bush.is_riped for bush in bushes(loaded)] == [bush.is_riped for bush in bushes(game)]
+    assert ai_entries(loaded) == ai_entries(game)
+
+
+def test_random_streams_round_trip(game, tmp_path):
+    for _ in range(20):
+        game.simulate()
+    game.world_seed["ai"].gauss(0, 1)  # the second value of the pair is kept in the state
+
+    loaded = save_and_load(game, tmp_path)
+    assert loaded.world_seed.get_state() == game.world_seed.get_state()
+    for name in seeding.STREAMS:
+        assert loaded.world_seed[name].random() == game.world_seed[name].random()
+
+
+def test_effect_round_trip(game, tmp_path):
+    game.add_effect(objects.Effect(None, [3.5, 4.0], "def_object.png", 30))
+    game.tick += 10
+
+    loaded = save_and_load(game, tmp_path)
+    effect, loaded_effect = game.list_effects[0], loaded.list_effects[0]
+    assert (loaded_effect.coord, loaded_effect.texture_file, loaded_effect.lifetime, loaded_effect.expiration_tick) \
+        == (effect.coord, effect.texture_file, effect.lifetime, effect.expiration_tick)
+
+    for _ in range(effect.expiration_tick - game.tick - 1):
+        game.simulate()
+        loaded.simulate()
+    assert loaded.list_effects and game.list_effects
+    game.simulate()
+    loaded.simulate()
+    assert not loaded.list_effects and not game.list_effects
@@ -0,0 +1,61 @@
+import random
+
+import scheduler as scheduler
+
+
+def test_tick_scheduler_takes_due_actions_in_order():
+    tick_scheduler = scheduler.TickScheduler()
+    tick_scheduler.schedule(5, "wolf", "decide_to_move")
+    tick_scheduler.schedule(3, "deer", "decide_to_move")
+    tick_scheduler.schedule(5, "turtle", "decide_to_move")
+    assert len(tick_scheduler) == 3
+    assert tick_scheduler.entries() == [(3, "deer", "decide_to_move"), (5, "wolf", "decide_to_move"),
+                                        (5, "turtle", "decide_to_move")]
+
+    assert tick_scheduler.pop_due(2) == []
+    assert tick_scheduler.pop_due(4) == [("deer", "decide_to_move")]
+    assert tick_scheduler.pop_due(10) == [("wolf", "decide_to_move"), ("turtle", "decide_to_move")]
+    assert len(tick_scheduler) == 0
+
+
+def test_timer_wheel_fires_every_timer_at_its_tick():
+    rng = random.Random(7)
+    timer_wheel = scheduler.TimerWheel(tick=3, slots=4, levels=2)  # levels cover 16 ticks, later timers overflow
+    planned = {}
+    for number in range(300):
+        due_tick = rng.randint(0, 120)
+        timer_wheel.schedule(due_tick, number, "ripe")
+        planned[number] = due_tick
+    assert len(timer_wheel) == 300
+
+    fired = {}
+    for tick in range(3, 121):
+        if tick == 40:  # timers planned while the wheel is turning
+            for number in range(300, 320):
+                due_tick = rng.randint(40, 120)
+                timer_wheel.schedule(due_tick, number, "ripe")
+                planned[number] = due_tick
+        for number, action in timer_wheel.pop_due(tick):
+            assert action == "ripe" and number not in fired
+            fired[number] = tick
+
+    assert fired == {number: max(due_tick, 3) for number, due_tick in planned.items()}
+    assert len(timer_wheel) == 0
+
+
+def test_timer_wheel_keeps_order_of_timers_at_the_same_tick():
+    timer_wheel = scheduler.TimerWheel(slots=4, levels=2)
+    for number in range(5):
+        timer_wheel.schedule(40, number, "expire")  # every timer goes through the overflow and both levels
+    timer_wheel.schedule(39, "first", "expire")
+
+    assert timer_wheel.pop_due(39) == [("first", "expire")]
+    assert timer_wheel.pop_due(40) == [(number, "expire") for number in range(5)]
+
+
+def test_timer_wheel_skips_ticks():
+    timer_wheel = scheduler.TimerWheel(slots=4, levels=2)
+    timer_wheel.schedule(7, "bush", "ripe")
+    timer_wheel.schedule(70, "effect", "expire")
+    assert timer_wheel.pop_due(50) == [("bush", "ripe")]
+    assert timer_wheel.pop_due(100) == [("effect", "expire")]
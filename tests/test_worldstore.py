@@ -0,0 +1,64 @@
+import numpy as np
+
+import worldstore as worldstore
+
+WIDTH, HEIGHT = 70, 40  # the last row and column of chunks are partial
+
+
+def tiles():
+    """
+    :return: numpy.ndarray - distinct values of every tile of the world, shape (HEIGHT, WIDTH)
+    """
+    return (np.arange(WIDTH * HEIGHT) % 251).astype(np.uint8).reshape(HEIGHT, WIDTH)
+
+
+def test_read_write_across_chunks():
+    store = worldstore.WorldStore(WIDTH, HEIGHT)
+    store.write("terrain", tiles())
+    assert (store.read("terrain") == tiles()).all()
+    assert (store.read("terrain", (30, 20, 67, 38)) == tiles()[20:38, 30:67]).all()
+    assert store.get("terrain", 69, 39) == tiles()[39, 69]
+
+    patch = np.full((5, 6), 250, dtype=np.uint8)
+    store.write("terrain", patch, (29, 30))
+    expected = tiles()
+    expected[30:35, 29:35] = 250
+    assert (store.read("terrain") == expected).all()
+
+
+def test_bands_cover_the_world():
+    store = worldstore.WorldStore(WIDTH, HEIGHT)
+    store.write("terrain", tiles())
+    bands = list(store.bands("terrain"))
+    assert [top for top, _ in bands] == [0, worldstore.CHUNK_SIZE]
+    assert (np.concatenate([band for _, band in bands]) == tiles()).all()
+
+
+def test_layer_reader_copies_only_touched_chunks():
+    store = worldstore.WorldStore(WIDTH, HEIGHT)
+    store.write("cost", tiles().astype(np.float64))
+    reader = worldstore.LayerReader(store, "cost")
+    assert reader.get(1, 2) == tiles()[2, 1]
+    assert reader.get(40, 35) == tiles()[35, 40]
+    assert set(reader.chunks) == {(0, 0), (1, 1)}
+
+
+def test_changed_chunks_are_flushed_to_files(tmp_path):
+    directory = str(tmp_path / "map")
+    store = worldstore.WorldStore(WIDTH, HEIGHT, directory, "w+")
+    store.write("object", tiles())
+    store.flush()
+    assert not store.dirty
+
+    writable = worldstore.WorldStore(WIDTH, HEIGHT, directory, "r+")
+    writable.set("object", 33, 1, 7)
+    assert writable.dirty == {("object", 0, 1)}
+    writable.flush()
+
+    copy_on_write = worldstore.WorldStore(WIDTH, HEIGHT, directory, "c")
+    copy_on_write.set("object", 0, 0, 9)
+    copy_on_write.flush()
+
+    expected = tiles()
+    expected[1, 33] = 7
+    assert (worldstore.WorldStore(WIDTH, HEIGHT, directory).read("object") == expected).all()
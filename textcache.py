@@ -0,0 +1,38 @@
+import pygame as pg
+
+import constants as const
+import metrics as metrics
+
+TEXT_RENDERS = metrics.registry.counter("textcache.text_renders")
+TEXT_CACHE_LIMIT = 512  # rendered texts kept at once, the cache is emptied when it is full
+fonts = {}  # fonts by size, shared by the interface and the map objects
+rendered_texts = {}  # rendered texts by text, size and color
+
+
+def get_font(fontsize):
+    """
+    Getting a font from the shared cache, it is loaded on the first use
+    :param fontsize: int - font height in pixels
+    :return: Pygame Font object - font of the game
+    """
+    if fontsize not in fonts:
+        fonts[fontsize] = pg.font.Font(const.FONT, fontsize)
+    return fonts[fontsize]
+
+
+def render_text(text, fontsize, color=const.COLORS["white"]):
+    """
+    Getting a rendered text from the shared cache, it is rendered on the first use
+    Only texts from a small set should go here, e.g. labels and counters, not values changing every frame
+    :param text: string - rendered text
+    :param fontsize: int - font height in pixels
+    :param color: tuple(int, int, int) - color of text in RGB
+    :return: Pygame Surface object - image of text
+    """
+    key = (text, fontsize, color)
+    if key not in rendered_texts:
+        if len(rendered_texts) >= TEXT_CACHE_LIMIT:
+            rendered_texts.clear()
+        TEXT_RENDERS.value += 1
+        rendered_texts[key] = get_font(fontsize).render(text, True, color)
+    return rendered_texts[key]
@@ -0,0 +1,73 @@
+import time
+
+
+class FixedTimestep:
+    """
+    Clock of the fixed-timestep loop: simulation ticks run at a constant rate independently of rendering
+    """
+
+    def __init__(self, tick_rate, fps, max_ticks_per_frame=8, max_frame_skip=5):
+        """
+        Constructor of fixed-timestep clock
+        :param tick_rate: int - simulation ticks per second at normal speed
+        :param fps: int - desired number of rendered frames per second
+        :param max_ticks_per_frame: int - limit of ticks simulated between two frames at fixed speed
+        :param max_frame_skip: int - how many frames in a row can be skipped while simulation is behind
+        """
+        self.tick_duration = 1 / tick_rate
+        self.frame_duration = 1 / fps
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.max_frame_skip = max_frame_skip
+        self.accumulator = 0.0
+        self.last_time = time.perf_counter()
+        self.skipped_frames = 0
+        self.alpha = 1.0
+
+    def reset(self):
+        """
+        Forgetting the time passed outside the gameplay, e.g. in the main menu
+        """
+        self.accumulator = 0.0
+        self.last_time = time.perf_counter()
+        self.skipped_frames = 0
+
+    def run(self, simulate, speed):
+        """
+        Running the simulation ticks that are due since the last frame
+        :param simulate: callable - one simulation tick
+        :param speed: float or None - game speed multiplier, None for the maximum speed
+        :return: bool - should the frame be rendered
+        """
+        start_time = time.perf_counter()
+        elapsed = min(start_time - self.last_time, self.max_ticks_per_frame * self.tick_duration)
+        self.last_time = start_time
+
+        if speed is None:
+            # maximum speed: simulating as long as one frame lasts, every frame shows the last tick
+            while time.perf_counter() - start_time < self.frame_duration:
+                simulate()
+            self.accumulator = 0.0
+            self.alpha = 1.0
+            self.skipped_frames = 0
+            return True
+
+        self.accumulator += elapsed * speed
+        ticks = 0
+        while self.accumulator >= self.tick_duration and ticks < self.max_ticks_per_frame:
+            simulate()
+            self.accumulator -= self.tick_duration
+            ticks += 1
+
+        is_behind = self.accumulator >= self.tick_duration
+        if is_behind:
+            # backlog beyond one frame of catching up is dropped, otherwise the game never recovers
+            self.accumulator = min(self.accumulator, self.max_ticks_per_frame * self.tick_duration)
+
+        self.alpha = min(self.accumulator / self.tick_duration, 1.0)
+
+        if is_behind and self.skipped_frames < self.max_frame_skip:
+            self.skipped_frames += 1
+            return False
+
+        self.skipped_frames = 0
+        return True
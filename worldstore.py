@@ -0,0 +1,146 @@
+import os
+import tempfile
+
+import numpy as np
+
+CHUNK_SIZE = 32  # side of a square chunk in tiles
+LAYERS = {  # every layer is a file of chunks, a chunk is contiguous on disk
+    "terrain": np.uint8,  # index of landscape
+    "speed_mod": np.float64,  # speed modifier of landscape
+    "object": np.uint8,  # index of the object prescribed for spawn
+    "cost": np.float64  # cost of moving through the tile for pathfinding
+}
+
+
+class WorldStore:
+    """
+    Tile layers of the world split into chunks and kept in memory-mapped files
+    A read or write pages in only the chunks it overlaps, so resident memory follows the part of the world in use
+    """
+
+    def __init__(self, width, height, directory=None, mode="r"):
+        """
+        Constructor of world store
+        :param width: int - width of the world in tiles
+        :param height: int - height of the world in tiles
+        :param directory: string - directory of layer files, None keeps the layers in anonymous temporary files
+        :param mode: string - mode of np.memmap: "w+" creates files, "r+" writes changes back to them,
+                     "c" keeps changes in memory only, "r" is read only
+        """
+        self.width = width
+        self.height = height
+        self.directory = directory
+        self.chunks_x = -(-width // CHUNK_SIZE)
+        self.chunks_y = -(-height // CHUNK_SIZE)
+        shape = (self.chunks_y, self.chunks_x, CHUNK_SIZE, CHUNK_SIZE)
+
+        if directory is None:  # the files are deleted when the layers are closed, their chunks are paged as well
+            self.layers = {name: np.memmap(tempfile.TemporaryFile(), dtype=dtype, mode="w+", shape=shape)
+                           for name, dtype in LAYERS.items()}
+        else:
+            os.makedirs(directory, exist_ok=True)
+            self.layers = {name: np.memmap(os.path.join(directory, name + ".bin"), dtype=dtype, mode=mode, shape=shape)
+                           for name, dtype in LAYERS.items()}
+        self.dirty = set()  # (layer, chunk y, chunk x) changed since the last flush
+
+    def get(self, layer, x, y):
+        """
+        :param layer: string - name of the layer, key of LAYERS
+        :param x: int - x coordinate of tile
+        :param y: int - y coordinate of tile
+        :return: value of the tile in the layer
+        """
+        return self.layers[layer][y // CHUNK_SIZE, x // CHUNK_SIZE, y % CHUNK_SIZE, x % CHUNK_SIZE]
+
+    def set(self, layer, x, y, value):
+        """
+        Changing one tile, its chunk is written back at the next flush
+        :param layer: string - name of the layer, key of LAYERS
+        :param x: int - x coordinate of tile
+        :param y: int - y coordinate of tile
+        :param value: new value of the tile
+        """
+        self.layers[layer][y // CHUNK_SIZE, x // CHUNK_SIZE, y % CHUNK_SIZE, x % CHUNK_SIZE] = value
+        self.dirty.add((layer, y // CHUNK_SIZE, x // CHUNK_SIZE))
+
+    def read(self, layer, box=None):
+        """
+        Reading a rectangle of tiles, only the chunks it overlaps are touched
+        :param layer: string - name of the layer, key of LAYERS
+        :param box: tuple(int, int, int, int) - x and y of the first tile and of the tile after the last one,
+                    the whole world by default
+        :return: numpy.ndarray - copy of the tiles, shape (rows, columns)
+        """
+        x0, y0, x1, y1 = box or (0, 0, self.width, self.height)
+        cx0, cy0 = x0 // CHUNK_SIZE, y0 // CHUNK_SIZE
+        cx1, cy1 = -(-x1 // CHUNK_SIZE), -(-y1 // CHUNK_SIZE)
+        chunks = self.layers[layer][cy0:cy1, cx0:cx1]
+        region = chunks.transpose(0, 2, 1, 3).reshape((cy1 - cy0) * CHUNK_SIZE, (cx1 - cx0) * CHUNK_SIZE)
+        top, left = cy0 * CHUNK_SIZE, cx0 * CHUNK_SIZE
+        return np.array(region[y0 - top:y1 - top, x0 - left:x1 - left])
+
+    def bands(self, layer):
+        """
+        Reading a layer by bands of one chunk row, only one band is held at once
+        :param layer: string - name of the layer, key of LAYERS
+        :return: generator of tuple(int, numpy.ndarray) - y of the first tile of the band and its tiles,
+                 shape (rows, width)
+        """
+        for top in range(0, self.height, CHUNK_SIZE):
+            yield top, self.read(layer, (0, top, self.width, min(top + CHUNK_SIZE, self.height)))
+
+    def write(self, layer, tiles, origin=(0, 0)):
+        """
+        Writing a rectangle of tiles, the changed chunks are written back at the next flush
+        :param layer: string - name of the layer, key of LAYERS
+        :param tiles: numpy.ndarray - new values of tiles, shape (rows, columns)
+        :param origin: tuple(int, int) - x and y of the first tile of the rectangle
+        """
+        x0, y0 = origin
+        y1, x1 = y0 + tiles.shape[0], x0 + tiles.shape[1]
+        for cy in range(y0 // CHUNK_SIZE, -(-y1 // CHUNK_SIZE)):
+            for cx in range(x0 // CHUNK_SIZE, -(-x1 // CHUNK_SIZE)):
+                top, bottom = max(y0, cy * CHUNK_SIZE), min(y1, (cy + 1) * CHUNK_SIZE)
+                left, right = max(x0, cx * CHUNK_SIZE), min(x1, (cx + 1) * CHUNK_SIZE)
+                self.layers[layer][cy, cx, top - cy * CHUNK_SIZE:bottom - cy * CHUNK_SIZE,
+                                   left - cx * CHUNK_SIZE:right - cx * CHUNK_SIZE] = tiles[top - y0:bottom - y0,
+                                                                                           left - x0:right - x0]
+                self.dirty.add((layer, cy, cx))
+
+    def flush(self):
+        """
+        Writing the changed chunks back to the files, in the modes "c" and "r" and in temporary files nothing is written
+        """
+        if self.directory is not None:
+            for layer in {layer for layer, _, _ in self.dirty}:
+                if self.layers[layer].mode in ("w+", "r+"):
+                    self.layers[layer].flush()
+        self.dirty.clear()
+
+
+class LayerReader:
+    """
+    Reader of single tiles of one layer, every chunk is copied into Python lists at its first use
+    It is made for one pass over a part of the world, e.g. one path search, and holds only the chunks it touched
+    """
+
+    def __init__(self, store, layer):
+        """
+        Constructor of layer reader
+        :param store: WorldStore object - store of the world
+        :param layer: string - name of the layer, key of LAYERS
+        """
+        self.layer = store.layers[layer]
+        self.chunks = {}  # rows of tiles by chunk y and x
+
+    def get(self, x, y):
+        """
+        :param x: int - x coordinate of tile
+        :param y: int - y coordinate of tile
+        :return: value of the tile in the layer
+        """
+        key = (y // CHUNK_SIZE, x // CHUNK_SIZE)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = self.layer[key].tolist()
+        return chunk[y % CHUNK_SIZE][x % CHUNK_SIZE]